@@ -1,11 +1,20 @@
-from typing import List, Dict, Optional
-from langchain_community.chat_models import ChatOpenAI
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Optional, Tuple, Iterator, AsyncIterator, Any, TYPE_CHECKING
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import JsonOutputParser, StrOutputParser
 from langchain_core.runnables import RunnablePassthrough
-from langchain.chains import SequentialChain
 from utils.llm_utils import get_qwen_llm
 from tools.NewsTool import entity_search_tool
+from utils.entity_store import canonicalize_entity_name
+from utils.text_utils import estimate_tokens, chunk_text
+from utils.telemetry import get_logger, propagate, span
+if TYPE_CHECKING:
+    from utils.job_journal import JobJournal
+
+logger = get_logger(__name__)
 # ======================== 4. 核心 Chain：新闻内容 → 实体提取 → 知识卡片 ========================
 class EntityQueryAgent:
     """
@@ -14,9 +23,17 @@ class EntityQueryAgent:
     流程：新闻内容 → LLM 提取核心实体 → 调用 LangChain Tool 搜索 → 整理知识卡片
     """
     
-    def __init__(self):
-        self.llm = get_qwen_llm()
+    def __init__(self, max_batch_tokens: int = 6000, max_batch_articles: int = 20, max_concurrency: int = 8):
+        """
+        :param max_batch_tokens: 批量模式下单次实体提取调用打包的新闻 token 上限
+        :param max_batch_articles: 单次实体提取调用最多打包的新闻条数
+        :param max_concurrency: 批量模式下提取调用与实体查询的并发数
+        """
+        self.llm = get_qwen_llm(cache_namespace="entity_query")
         self.tool = entity_search_tool  # 注入 LangChain Tool
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_articles = max_batch_articles
+        self.max_concurrency = max_concurrency
         self._build_chains()
     
     def _build_chains(self):
@@ -39,6 +56,26 @@ class EntityQueryAgent:
             ("human", "新闻内容：\n{news_content}"),
         ])
         self.entity_extract_chain = entity_extract_prompt | self.llm | JsonOutputParser()
+
+        # 批量模式：多篇新闻打包进一次调用，按编号分别返回实体数组
+        batch_extract_prompt = ChatPromptTemplate.from_messages([
+            (
+                "system",
+                """
+                你是专业的实体提取专家。输入是一个 JSON 数组，每个元素是一篇新闻（id + content），
+                请分别从每篇新闻中提取 3-5 个核心实体。
+                实体定义：
+                - 必须是新闻核心要素（公司、人物、政策、事件、机构、技术等）；
+                - 排除通用词汇（如“经济”“市场”）；
+                - 名称准确完整（如“国家统计局”而非“统计局”）；同一实体在不同新闻中使用相同的名称。
+                
+                输出格式：严格返回 JSON 对象，键为新闻 id（字符串），值为该新闻的实体名称数组，无其他文本。
+                示例：{{"0": ["国家统计局", "CPI"], "1": ["美联储", "鲍威尔"]}}
+                """,
+            ),
+            ("human", "新闻列表：\n{news_batch_json}"),
+        ])
+        self.batch_extract_chain = batch_extract_prompt | self.llm | JsonOutputParser()
         
         # 子 Chain 2：实体名称 → 调用 LangChain Tool 获取知识卡片
         # 用 RunnablePassthrough 传递参数，调用 Tool 的 run 方法
@@ -47,51 +84,342 @@ class EntityQueryAgent:
         )
     
     def run(self, news_content: str) -> str:
+        return self._run_one(news_content)[0]
+
+    def _run_one(self, news_content: str) -> Tuple[str, Optional[str]]:
+        """run 的实现，额外返回错误说明（提取异常或有实体查询失败时非空），供可恢复任务判断是否需要重试"""
         if not news_content or len(news_content) < 50:
-            return "错误：新闻内容为空或过短"
+            return "错误：新闻内容为空或过短", None
         
-        print(f"\n===== EntityQuery Agent 开始处理 =====")
-        print(f"新闻内容长度：{len(news_content)} 字符")
+        logger.info(f"\n===== EntityQuery Agent 开始处理 =====")
+        logger.info(f"新闻内容长度：{len(news_content)} 字符")
         
+        with span("agent.entity_query", chars=len(news_content)) as sp:
+            try:
+                # 步骤1：提取核心实体
+                logger.info("\nStep 1: 提取核心实体...")
+                core_entities = self.entity_extract_chain.invoke({"news_content": news_content})
+                if not core_entities or not isinstance(core_entities, list):
+                    return "未提取到有效核心实体", None
+                logger.info(f"提取到 {len(core_entities)} 个核心实体：{core_entities}")
+                sp.set(entities=len(core_entities))
+
+                # 步骤2：调用 LangChain Tool 批量生成知识卡片
+                logger.info("\nStep 2: 调用实体查询 Tool，生成知识卡片...")
+                knowledge_cards, failed = [], []
+                for idx, entity in enumerate(core_entities, 1):
+                    logger.info(f"[{idx}/{len(core_entities)}] 调用 Tool 查询实体：{entity}")
+                    result = self.entity_tool_chain.invoke({"entity": entity})
+                    knowledge_cards.append(f"===== 实体 {idx} =====\n{result['knowledge_card']}")
+                    if self._is_error_card(result["knowledge_card"]):
+                        failed.append(entity)
+
+                # 步骤3：整理输出
+                final_output = "【新闻核心实体知识卡片集合】\n\n" + "\n\n".join(knowledge_cards)
+                logger.info(f"\n===== EntityQuery Agent 处理完成 =====")
+                return final_output, (f"实体查询失败：{'、'.join(failed)}" if failed else None)
+
+            except Exception as e:
+                error_msg = f"EntityQuery Agent 处理异常：{str(e)}"
+                sp.fail(e)
+                logger.error(error_msg)
+                return error_msg, error_msg
+    
+    def extract_entities(self, news_content: str) -> List[str]:
+        """单篇提取核心实体（按规范化名称去重，保持提取顺序）；LLM 调用异常向上抛出"""
+        return self._clean_entities(self.entity_extract_chain.invoke({"news_content": news_content}))
+
+    # ======================== 流式模式：每张知识卡片查询完成即返回 ========================
+    @staticmethod
+    def _card_error(message: str) -> Dict[str, Any]:
+        return {"index": 0, "entity": None, "knowledge_card": message}
+
+    def stream_cards(self, news_content: str) -> Iterator[Dict[str, Any]]:
+        """
+        run 的流式版本：提取核心实体后并发查询，每个实体的知识卡片一查完就产出（按完成顺序），
+        不必等最慢的实体查询结束。
+        产出 {"index": 实体序号（从 1 开始，对应提取顺序）, "entity": 实体名称, "knowledge_card": 卡片文本}；
+        内容过短、未提取到实体或提取异常时只产出一条 index=0、entity=None 的错误信息。
+        用法：for card in agent.stream_cards(news): render(card)
+        """
+        if not news_content or len(news_content) < 50:
+            yield self._card_error("错误：新闻内容为空或过短")
+            return
+
+        with span("agent.entity_query", chars=len(news_content), mode="stream") as sp:
+            start = time.perf_counter()
+            try:
+                entities = self.extract_entities(news_content)
+            except Exception as e:
+                error_msg = f"EntityQuery Agent 处理异常：{str(e)}"
+                sp.fail(e)
+                logger.error(error_msg)
+                yield self._card_error(error_msg)
+                return
+            if not entities:
+                yield self._card_error("未提取到有效核心实体")
+                return
+            logger.info(f"提取到 {len(entities)} 个核心实体：{entities}")
+            sp.set(entities=len(entities))
+
+            # 不用 with：调用方提前停止迭代时不等待剩余查询，直接取消排队中的任务
+            executor = ThreadPoolExecutor(max_workers=max(1, min(self.max_concurrency, len(entities))))
+            try:
+                lookup = propagate(self._lookup_card)
+                futures = {executor.submit(lookup, entity): (idx, entity) for idx, entity in enumerate(entities, 1)}
+                for done, future in enumerate(as_completed(futures)):
+                    idx, entity = futures[future]
+                    if done == 0:
+                        # 首张卡片延迟：用户真正感受到的等待时间
+                        sp.set(first_card_ms=round((time.perf_counter() - start) * 1000, 1))
+                    yield {"index": idx, "entity": entity, "knowledge_card": future.result()}
+            finally:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+    async def astream_cards(self, news_content: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        stream_cards 的异步版本：async for card in agent.astream_cards(news): ...
+        实体查询在线程中执行（工具为同步实现），并发数受 max_concurrency 限制。
+        """
+        if not news_content or len(news_content) < 50:
+            yield self._card_error("错误：新闻内容为空或过短")
+            return
+
+        with span("agent.entity_query", chars=len(news_content), mode="stream") as sp:
+            start = time.perf_counter()
+            try:
+                entities = self._clean_entities(
+                    await self.entity_extract_chain.ainvoke({"news_content": news_content})
+                )
+            except Exception as e:
+                error_msg = f"EntityQuery Agent 处理异常：{str(e)}"
+                sp.fail(e)
+                logger.error(error_msg)
+                yield self._card_error(error_msg)
+                return
+            if not entities:
+                yield self._card_error("未提取到有效核心实体")
+                return
+            logger.info(f"提取到 {len(entities)} 个核心实体：{entities}")
+            sp.set(entities=len(entities))
+
+            semaphore = asyncio.Semaphore(max(1, self.max_concurrency))
+
+            async def _lookup(idx: int, entity: str) -> Tuple[int, str, str]:
+                async with semaphore:
+                    # to_thread 会复制当前上下文，工具 span 仍挂在本 span 之下
+                    return idx, entity, await asyncio.to_thread(self._lookup_card, entity)
+
+            tasks = [asyncio.ensure_future(_lookup(idx, entity)) for idx, entity in enumerate(entities, 1)]
+            try:
+                for done, next_card in enumerate(asyncio.as_completed(tasks)):
+                    idx, entity, card = await next_card
+                    if done == 0:
+                        sp.set(first_card_ms=round((time.perf_counter() - start) * 1000, 1))
+                    yield {"index": idx, "entity": entity, "knowledge_card": card}
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+    # ======================== 批量模式：打包提取 + 实体去重 + 并发查询 ========================
+    def _pack_articles(self, contents: List[Tuple[int, str]]) -> List[List[Tuple[int, str]]]:
+        """按 token 预算把新闻装箱；单篇超出预算时只保留开头一块"""
+        packs, current, current_tokens = [], [], 0
+        for idx, content in contents:
+            if estimate_tokens(content) > self.max_batch_tokens:
+                content = chunk_text(content, self.max_batch_tokens)[0]
+            tokens = estimate_tokens(content) + 10  # JSON 包装的额外开销
+            if current and (current_tokens + tokens > self.max_batch_tokens or len(current) >= self.max_batch_articles):
+                packs.append(current)
+                current, current_tokens = [], 0
+            current.append((idx, content))
+            current_tokens += tokens
+        if current:
+            packs.append(current)
+        return packs
+
+    @staticmethod
+    def _clean_entities(entities) -> List[str]:
+        if not isinstance(entities, list):
+            return []
+        cleaned = {}
+        for entity in entities:
+            if isinstance(entity, str) and canonicalize_entity_name(entity):
+                cleaned.setdefault(canonicalize_entity_name(entity), entity.strip())
+        return list(cleaned.values())
+
+    def extract_entities_batch(self, news_content_list: List[str]) -> List[List[str]]:
+        """
+        打包提取：多篇新闻共用一次 LLM 调用，返回与输入一一对应的实体数组。
+        整包失败或漏掉的新闻退回单篇提取；内容为空或过短、单篇补提仍失败的新闻返回空数组。
+        """
+        return self._extract_batch(news_content_list)[0]
+
+    def _extract_batch(self, news_content_list: List[str]) -> Tuple[List[List[str]], Dict[int, str]]:
+        """extract_entities_batch 的实现，额外返回 下标 → 错误说明（单篇补提仍异常的新闻），与“确实没有实体”区分开"""
+        results: List[List[str]] = [[] for _ in news_content_list]
+        errors: Dict[int, str] = {}
+        valid = [(i, c) for i, c in enumerate(news_content_list) if c and len(c) >= 50]
+        packs = self._pack_articles(valid)
+        with span("agent.entity_query.extract", articles=len(valid), packs=len(packs)) as sp:
+            outputs = self.batch_extract_chain.batch(
+                [{"news_batch_json": json.dumps(
+                    [{"id": str(local), "content": content} for local, (_, content) in enumerate(pack)],
+                    ensure_ascii=False, separators=(",", ":"),
+                )} for pack in packs],
+                config={"max_concurrency": self.max_concurrency},
+                return_exceptions=True,
+            )
+
+            retry = []
+            for pack_no, (pack, output) in enumerate(zip(packs, outputs), 1):
+                if isinstance(output, Exception) or not isinstance(output, dict):
+                    logger.warning(f"错误：第 {pack_no} 包实体提取失败，退回单篇提取：{output}")
+                    retry.extend(pack)
+                    continue
+                for local, (idx, content) in enumerate(pack):
+                    if str(local) in output:
+                        results[idx] = self._clean_entities(output[str(local)])
+                    else:
+                        retry.append((idx, content))
+
+            if retry:
+                sp.set(retries=len(retry))
+                single_outputs = self.entity_extract_chain.batch(
+                    [{"news_content": content} for _, content in retry],
+                    config={"max_concurrency": self.max_concurrency},
+                    return_exceptions=True,
+                )
+                for (idx, _), output in zip(retry, single_outputs):
+                    if isinstance(output, Exception):
+                        errors[idx] = f"EntityQuery Agent 处理异常：{str(output)}"
+                    else:
+                        results[idx] = self._clean_entities(output)
+
+        logger.info(f"实体提取：{len(valid)} 篇新闻 → {len(packs)} 次打包调用 + {len(retry)} 次单篇补提")
+        return results, errors
+
+    def lookup_entities(self, entity_names: List[str]) -> Dict[str, str]:
+        """按规范化名称去重后并发查询，每个实体只查询一次；返回 规范化名称 → 知识卡片"""
+        unique: Dict[str, str] = {}
+        for name in entity_names:
+            unique.setdefault(canonicalize_entity_name(name), name)
+        unique.pop("", None)
+
+        with span("agent.entity_query.lookup", entities=len(unique)):
+            with ThreadPoolExecutor(max_workers=max(1, self.max_concurrency)) as executor:
+                cards = list(executor.map(propagate(self._lookup_card), unique.values()))
+        return dict(zip(unique.keys(), cards))
+
+    def _lookup_card(self, name: str) -> str:
+        """查询单个实体的知识卡片；失败时返回带错误说明的卡片，不抛异常"""
         try:
-            # 步骤1：提取核心实体
-            print("\nStep 1: 提取核心实体...")
-            core_entities = self.entity_extract_chain.invoke({"news_content": news_content})
-            if not core_entities or not isinstance(core_entities, list):
-                return "未提取到有效核心实体"
-            print(f"提取到 {len(core_entities)} 个核心实体：{core_entities}")
-            
-            # 步骤2：调用 LangChain Tool 批量生成知识卡片
-            print("\nStep 2: 调用实体查询 Tool，生成知识卡片...")
-            knowledge_cards = []
-            for idx, entity in enumerate(core_entities, 1):
-                print(f"[{idx}/{len(core_entities)}] 调用 Tool 查询实体：{entity}")
-                result = self.entity_tool_chain.invoke({"entity": entity})
-                knowledge_cards.append(f"===== 实体 {idx} =====\n{result['knowledge_card']}")
-            
-            # 步骤3：整理输出
-            final_output = "【新闻核心实体知识卡片集合】\n\n" + "\n\n".join(knowledge_cards)
-            print(f"\n===== EntityQuery Agent 处理完成 =====")
-            return final_output
-        
+            return self.tool.run(name)
         except Exception as e:
-            error_msg = f"EntityQuery Agent 处理异常：{str(e)}"
-            print(error_msg)
-            return error_msg
-    
-    def batch_run(self, news_content_list: List[str]) -> List[Dict[str, str]]:
+            return f"【实体名称】{name}\n【错误】查询失败：{str(e)[:100]}"
+
+    @staticmethod
+    def _is_error_card(card: str) -> bool:
+        """工具与 _lookup_card 都以【错误】标记查询失败（超时 / 请求失败 / 解析失败），这类卡片不能当作完成结果"""
+        return "【错误】" in card
+
+    def batch_run(
+        self,
+        news_content_list: List[str],
+        packed: bool = False,
+        job_id: Optional[str] = None,
+        journal: Optional["JobJournal"] = None,
+        max_attempts: int = 3,
+    ) -> List[Dict[str, str]]:
+        """
+        批量处理。默认（packed=False）逐篇执行 run，输出格式与之前一致；
+        packed=True 时：多篇打包提取实体 → 全批次实体去重 → 每个实体并发查询一次 → 卡片分发回各篇新闻，
+        实体查询次数从 O(新闻数 × 实体数) 降为 O(去重后的实体数)，每条结果额外带 entities 字段。
+        :param job_id: 指定时以可恢复任务运行：按段（打包模式每段 max_batch_articles 篇）处理，每段完成即写入任务日志；
+                       中断后用同一 job_id 重新运行只处理未完成与失败的新闻
+        :param journal: 任务日志，默认使用进程内共享实例
+        :param max_attempts: 单篇新闻最多尝试次数，超过后不再重试
+        """
         if not news_content_list:
-            print("警告：新闻列表为空")
+            logger.warning("警告：新闻列表为空")
             return []
-        
-        results = []
-        print(f"\n===== 批量处理 {len(news_content_list)} 条新闻 =====")
+        if job_id:
+            return self._journaled_batch_run(news_content_list, packed, job_id, journal, max_attempts)
+        return self._batch(news_content_list, packed)[0]
+
+    def _batch(self, news_content_list: List[str], packed: bool) -> Tuple[List[Dict[str, str]], List[Optional[str]]]:
+        """批量处理的实现，额外返回与输入一一对应的错误说明（None 表示成功）"""
+        if packed:
+            return self._packed_batch_run(news_content_list)
+
+        results, errors = [], []
+        logger.info(f"\n===== 批量处理 {len(news_content_list)} 条新闻 =====")
         for idx, content in enumerate(news_content_list, 1):
-            print(f"\n【批量处理 {idx}/{len(news_content_list)}】")
-            cards = self.run(content)
+            logger.info(f"\n【批量处理 {idx}/{len(news_content_list)}】")
+            cards, error = self._run_one(content)
             results.append({
                 "news_index": idx,
                 "news_content": content[:100] + "..." if len(content) > 100 else content,
                 "entity_knowledge_cards": cards
             })
-        return results
\ No newline at end of file
+            errors.append(error)
+        return results, errors
+
+    def _journaled_batch_run(
+        self,
+        news_content_list: List[str],
+        packed: bool,
+        job_id: str,
+        journal: Optional["JobJournal"],
+        max_attempts: int,
+    ) -> List[Dict[str, str]]:
+        from utils.job_journal import get_job_journal, item_key
+
+        job = (journal or get_job_journal()).open_job(
+            job_id, "entity_query", [item_key(c or "") for c in news_content_list], max_attempts
+        )
+        step = self.max_batch_articles if packed else 1
+        for start in range(0, len(job.todo), step):
+            part = job.todo[start:start + step]
+            outputs, errors = self._batch([news_content_list[idx] for idx in part], packed)
+            for idx, output, error in zip(part, outputs, errors):
+                output["news_index"] = idx + 1
+                # 实体提取异常或有实体查询失败时记为失败，下次运行重试；内容过短属于输入问题，不重试
+                job.record(idx, output, error)
+        job.finish()
+        return job.results
+
+    def _packed_batch_run(self, news_content_list: List[str]) -> Tuple[List[Dict[str, str]], List[Optional[str]]]:
+        logger.info(f"\n===== 批量处理（打包模式）{len(news_content_list)} 条新闻 =====")
+        entities_per_news, extract_errors = self._extract_batch(news_content_list)
+        all_entities = [e for entities in entities_per_news for e in entities]
+        cards = self.lookup_entities(all_entities)
+        logger.info(f"实体查询：{len(all_entities)} 次引用 → {len(cards)} 个去重实体")
+
+        results, errors = [], []
+        for idx, (content, entities) in enumerate(zip(news_content_list, entities_per_news), 1):
+            error = None
+            if not content or len(content) < 50:
+                output = "错误：新闻内容为空或过短"
+            elif idx - 1 in extract_errors:
+                output = error = extract_errors[idx - 1]
+            elif not entities:
+                output = "未提取到有效核心实体"
+            else:
+                keys = [canonicalize_entity_name(entity) for entity in entities]
+                knowledge_cards = [
+                    f"===== 实体 {i} =====\n{cards[key]}" for i, key in enumerate(keys, 1) if key in cards
+                ]
+                output = "【新闻核心实体知识卡片集合】\n\n" + "\n\n".join(knowledge_cards)
+                failed = [entity for entity, key in zip(entities, keys) if key in cards and self._is_error_card(cards[key])]
+                if failed:
+                    error = f"实体查询失败：{'、'.join(failed)}"
+            errors.append(error)
+            results.append({
+                "news_index": idx,
+                "news_content": content[:100] + "..." if content and len(content) > 100 else content,
+                "entities": entities,
+                "entity_knowledge_cards": output,
+            })
+        logger.info(f"\n===== 批量处理完成 =====")
+        return results, errors
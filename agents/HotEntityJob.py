@@ -0,0 +1,195 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+from agents.EntityQueryAgent import EntityQueryAgent
+from agents.KGAgent import LLMEndToEndJsonToPngAgent
+from tools.NewsTool import fetch_entity_record, warm_entity_store
+from utils.entity_store import canonicalize_entity_name, get_entity_store
+from utils.heavy_hitters import SpaceSaving
+from utils.telemetry import get_logger, span
+from utils.timeline_store import TimeLineIndex, get_timeline_index
+
+MANIFEST_NAME = "manifest.json"
+logger = get_logger(__name__)
+
+
+def _default_output_dir() -> str:
+    return os.path.join(os.getcwd(), "data", "hot_cards")
+
+
+class HotEntityJob:
+    """
+    热门实体知识卡片预生成（后台定时任务）：
+    时间线中最近 N 天的新闻 → 分批打包提取实体（流式）→ Space-Saving 有界内存计数 → 取 Top-K
+    → 预取 SerpAPI JSON 进实体库 → 通过 LLMEndToEndJsonToPngAgent 预渲染 PNG → 写入清单。
+    请求时 lookup_hot_card() 只读清单与文件，热门实体无需再走 LLM + 浏览器流程。
+    """
+
+    def __init__(
+        self,
+        timeline: Optional[TimeLineIndex] = None,
+        entity_agent: Optional[EntityQueryAgent] = None,
+        card_agent: Optional[LLMEndToEndJsonToPngAgent] = None,
+        top_k: int = 50,
+        sketch_capacity: int = 2000,
+        window_days: int = 7,
+        batch_size: int = 20,
+        max_card_age: float = 24 * 3600,
+        output_dir: Optional[str] = None,
+    ):
+        """
+        :param top_k: 预生成卡片的实体数
+        :param sketch_capacity: 计数 sketch 同时跟踪的实体数上限（决定内存上限与精度）
+        :param window_days: 统计最近多少天的新闻
+        :param batch_size: 每次送入实体提取的新闻条数
+        :param max_card_age: 已有 PNG 在该时间（秒）内生成的实体不重复渲染
+        """
+        self.timeline = timeline or get_timeline_index()
+        self.entity_agent = entity_agent or EntityQueryAgent()
+        self.card_agent = card_agent
+        self.top_k = top_k
+        self.sketch_capacity = sketch_capacity
+        self.window_days = window_days
+        self.batch_size = batch_size
+        self.max_card_age = max_card_age
+        self.output_dir = output_dir or _default_output_dir()
+
+    # ---------- 1. 流式提取 + 计数 ----------
+    def stream_entities(self) -> Iterator[List[str]]:
+        """逐篇产出最近 window_days 天新闻的实体列表（优先使用入库时的总结，比原文更短）"""
+        start = datetime.now(timezone.utc) - timedelta(days=self.window_days)
+        batch: List[str] = []
+        for article in self.timeline.scan(start=start):
+            batch.append((article.raw_metadata or {}).get("summary") or article.core_content or article.title or "")
+            if len(batch) >= self.batch_size:
+                yield from self.entity_agent.extract_entities_batch(batch)
+                batch = []
+        if batch:
+            yield from self.entity_agent.extract_entities_batch(batch)
+
+    def count_entities(self) -> Tuple[SpaceSaving, Dict[str, str]]:
+        """按"出现该实体的新闻篇数"计数；返回 sketch 与 规范化名称 → 展示名称"""
+        sketch = SpaceSaving(self.sketch_capacity)
+        names: Dict[str, str] = {}
+        articles = 0
+        for entities in self.stream_entities():
+            articles += 1
+            for entity in entities:
+                key = canonicalize_entity_name(entity)
+                if key:
+                    sketch.add(key)
+                    names.setdefault(key, entity)
+            if len(names) > 2 * self.sketch_capacity:
+                names = {k: v for k, v in names.items() if k in sketch}
+        logger.info(f"📊 实体计数：{articles} 篇新闻，{sketch.total} 次实体引用，跟踪 {len(sketch)} 个实体")
+        return sketch, names
+
+    # ---------- 2. 预取 + 预渲染 ----------
+    def _is_fresh(self, entry: Optional[Dict]) -> bool:
+        png = (entry or {}).get("png")
+        return bool(png) and os.path.exists(png) and time.time() - os.path.getmtime(png) < self.max_card_age
+
+    def run(self) -> Dict:
+        """执行一轮预生成，返回 热门实体数 / 新渲染数 / 复用未过期卡片数"""
+        with span("agent.hot_entity_job", top_k=self.top_k, window_days=self.window_days) as sp:
+            stats = self._run()
+            sp.set(**stats)
+            return stats
+
+    def _run(self) -> Dict:
+        sketch, names = self.count_entities()
+        hot = [(names.get(key, key), key, count) for key, count, _ in sketch.top(self.top_k)]
+        if not hot:
+            logger.warning("⚠️ 最近没有可统计的实体")
+            return {"hot": 0, "rendered": 0, "reused": 0}
+
+        previous = _read_manifest(self.output_dir).get("entities", {})
+        warm_entity_store([name for name, _, _ in hot], max_workers=self.entity_agent.max_concurrency)
+
+        entries: Dict[str, Dict] = {}
+        aliases: Dict[str, str] = {}
+        reused = 0
+        to_render: List[Tuple[str, Dict]] = []
+        for name, key, count in hot:
+            entry = {"name": name, "count": count, "png": None}
+            try:
+                record = fetch_entity_record(name)  # 预热后命中实体库，不再请求网络
+            except Exception as e:
+                logger.error(f"❌ 获取实体失败：{name}（{str(e)[:80]}）")
+                continue
+            # 查询名与图谱标题不同时（如"美联储" → "联邦储备系统"）登记别名，两种名称都能命中
+            if record.canonical_name != key:
+                aliases[record.canonical_name] = key
+            if self._is_fresh(previous.get(key)):
+                entry["png"] = previous[key]["png"]
+                reused += 1
+            elif record.knowledge_graph:
+                to_render.append((key, {"knowledge_graph": record.knowledge_graph}))
+            entries[key] = entry
+
+        if to_render:
+            if self.card_agent is None:
+                self.card_agent = LLMEndToEndJsonToPngAgent()
+            pngs = self.card_agent.render_all([serp for _, serp in to_render], output_dir=self.output_dir)
+            for (key, _), png in zip(to_render, pngs):
+                entries[key]["png"] = os.path.abspath(png) if png else None
+
+        _write_manifest(self.output_dir, {
+            "generated_at": time.time(),
+            "window_days": self.window_days,
+            "entities": entries,
+            "aliases": aliases,
+        })
+        stats = {
+            "hot": len(hot),
+            "rendered": sum(1 for key, _ in to_render if entries[key]["png"]),
+            "reused": reused,
+        }
+        logger.info(f"🔥 热门实体卡片预生成完成：{stats}")
+        return stats
+
+
+# ======================== 清单读写与请求时查询 ========================
+_manifest_cache: Dict[str, Tuple[float, Dict]] = {}
+_manifest_lock = threading.Lock()
+
+
+def _read_manifest(output_dir: str) -> Dict:
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return {}
+    with _manifest_lock:
+        cached = _manifest_cache.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        _manifest_cache[path] = (mtime, data)
+        return data
+
+
+def _write_manifest(output_dir: str, data: Dict) -> None:
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)  # 原子替换：读取方不会看到写了一半的清单
+
+
+def lookup_hot_card(entity_name: str, output_dir: Optional[str] = None) -> Optional[str]:
+    """请求时查询：实体已预生成卡片时返回 PNG 路径，否则返回 None（调用方再走 KGAgent 兜底）"""
+    manifest = _read_manifest(output_dir or _default_output_dir())
+    entities, aliases = manifest.get("entities", {}), manifest.get("aliases", {})
+    if not entities:
+        return None
+    for key in (canonicalize_entity_name(entity_name), get_entity_store().resolve(entity_name)):
+        png = (entities.get(aliases.get(key, key)) or {}).get("png")
+        if png and os.path.exists(png):
+            return png
+    return None
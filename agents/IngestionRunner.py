@@ -0,0 +1,186 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from agents.NewsCrawlAgent import NewsSummaryagent
+from agents.NewsFilterAgent import NewsFilterAgent
+from tools.NewsTool import iter_news, extract_news_original_content
+from utils.article_store import ArticleStore, get_article_store
+from utils.content_cache import normalize_url
+from utils.model import NewsArticle
+from utils.telemetry import get_logger, propagate, span
+from utils.timeline_store import TimeLineIndex, get_timeline_index
+
+logger = get_logger(__name__)
+
+
+class IngestionRunner:
+    """
+    增量新闻入库（定时任务入口）：
+    查询水位 → 只请求水位之后的新闻 → 跳过已入库 URL → 仅对新条目执行 过滤 → 提取原文 → 总结
+    → 本轮结果与新水位在同一事务中提交。
+    稳态下每次运行的开销只与新增新闻数量成正比，而不是整个查询时间窗口。
+    """
+
+    def __init__(
+        self,
+        store: Optional[ArticleStore] = None,
+        filter_agent: Optional[NewsFilterAgent] = None,
+        summary_agent: Optional[NewsSummaryagent] = None,
+        concurrency: int = 4,
+        timeline: Optional[TimeLineIndex] = None,
+    ):
+        """
+        :param store: 文章存储，默认使用进程内共享实例
+        :param filter_agent / summary_agent: 可注入已构建的 Agent（共享 LLM 实例）
+        :param concurrency: 原文提取 + 总结的并发数
+        :param timeline: 时间线索引，已总结的文章同时按发布日期写入，供时间范围查询
+        """
+        self.store = store or get_article_store()
+        self.filter_agent = filter_agent or NewsFilterAgent()
+        self.summary_agent = summary_agent or NewsSummaryagent()
+        self.concurrency = concurrency
+        self.timeline = timeline or get_timeline_index()
+
+    @staticmethod
+    def _to_news_api_time(published_at: str) -> str:
+        # NewsAPI 的 from 参数接受不带时区后缀的 ISO 8601 时间（按 UTC 解释），且包含边界
+        return published_at.rstrip("Z")
+
+    def _process(self, article: NewsArticle) -> Tuple[NewsArticle, Optional[str], Optional[str]]:
+        """提取原文并总结：返回 (文章, 总结, 错误信息)"""
+        content = extract_news_original_content(article.url, max_chars=self.summary_agent.max_content_chars)
+        if content.startswith("错误"):
+            return article, None, content
+        try:
+            summary = self.summary_agent.summarize_content(content)
+        except Exception as e:
+            return article, None, f"新闻总结异常：{str(e)}"
+        return article.model_copy(update={"core_content": content}), summary, None
+
+    def run(self, query: str, initial_from: str = "", max_results: Optional[int] = None, **search_kwargs) -> Dict:
+        """
+        执行一轮增量入库。
+        :param query: NewsAPI 查询词（同时作为水位的键）
+        :param initial_from: 该查询首次运行（尚无水位）时的起始时间
+        :param max_results: 本轮最多处理的新文章数（已入库的 URL 不计入）；被截断时水位不前进，
+                            下轮越过已入库的文章继续向更早翻页，直到追上积压
+        :param search_kwargs: 透传给 iter_news 的其他搜索参数（language、domains 等）
+        :return: 本轮统计
+        """
+        with span("agent.ingestion", query=query) as sp:
+            stats = self._run(query, initial_from, max_results, **search_kwargs)
+            sp.set(**{k: stats[k] for k in ("fetched", "new", "rejected", "summarized", "failed")})
+            return stats
+
+    def _fetch_new(
+        self, query: str, from_date: str, max_results: Optional[int], page_size: int = 100, **search_kwargs
+    ) -> Tuple[List[NewsArticle], List[NewsArticle], bool]:
+        """
+        新到旧逐页拉取，按页剔除已入库的 URL，直到凑满 max_results 条新文章或取完。
+        上限只计新文章：上轮被截断后，本轮会越过已处理的最新一批继续向更早翻页，而不是反复拉到同一批。
+        :return: (拉取到的全部文章, 新文章, 是否被截断（可能还有更早的新文章未处理）)
+        """
+        fetched: List[NewsArticle] = []
+        new_articles: List[NewsArticle] = []
+        page: List[NewsArticle] = []
+        exhausted = True
+        articles = iter_news(query, from_date=from_date, sort_by="publishedAt", page_size=page_size, **search_kwargs)
+        try:
+            for article in articles:
+                fetched.append(article)
+                page.append(article)
+                if len(page) < page_size:
+                    continue
+                known = self.store.known_urls(a.url for a in page)
+                new_articles.extend(a for a in page if normalize_url(a.url) not in known)
+                page = []
+                if max_results is not None and len(new_articles) >= max_results:
+                    exhausted = False
+                    break
+        finally:
+            articles.close()
+        if page:
+            known = self.store.known_urls(a.url for a in page)
+            new_articles.extend(a for a in page if normalize_url(a.url) not in known)
+        truncated = not exhausted or (max_results is not None and len(new_articles) > max_results)
+        if max_results is not None:
+            new_articles = new_articles[:max_results]
+        return fetched, new_articles, truncated
+
+    def _run(self, query: str, initial_from: str, max_results: Optional[int], **search_kwargs) -> Dict:
+        watermark = self.store.get_watermark(query)
+        from_date = self._to_news_api_time(watermark) if watermark else initial_from
+        logger.info(f"\n===== 增量入库：{query}（水位 {watermark or '无'}）=====")
+
+        fetched, new_articles, truncated = self._fetch_new(query, from_date, max_results, **search_kwargs)
+        stats = {"query": query, "fetched": len(fetched), "new": len(new_articles),
+                 "rejected": 0, "summarized": 0, "failed": 0, "watermark": watermark}
+        if not new_articles:
+            logger.info(f"✅ 无新增新闻（拉取 {len(fetched)} 条，均已入库）")
+            return stats
+
+        metadata = [
+            {"index": i, "title": a.title, "source": a.source, "published_at": a.published_at, "url": a.url}
+            for i, a in enumerate(new_articles)
+        ]
+        kept_urls = {item["url"] for item in self.filter_agent.run_chunked(metadata)}
+        kept = [a for a in new_articles if a.url in kept_urls]
+        rejected = [a for a in new_articles if a.url not in kept_urls]
+
+        with ThreadPoolExecutor(max_workers=max(1, self.concurrency)) as executor:
+            outcomes = list(executor.map(propagate(self._process), kept))
+        summarized: List[Tuple[NewsArticle, str]] = []
+        failed: List[NewsArticle] = []
+        for article, summary, error in outcomes:
+            if error:
+                logger.error(f"❌ 处理失败，下轮重试：{article.url}（{error[:80]}）")
+                failed.append(article)
+            else:
+                summarized.append((article, summary))
+
+        # 新水位：本轮拉到的最新时间；有失败条目时退回到最早的失败时间，下轮从那里重新拉取（成功的按 URL 跳过）
+        times = [a.published_at for a in fetched if a.published_at]
+        new_watermark = max(times) if times else None
+        failed_times = [a.published_at for a in failed if a.published_at]
+        if failed_times:
+            new_watermark = min(failed_times)
+        if truncated:
+            logger.warning(f"⚠️ 本轮新文章达到上限 {max_results} 条，还有更早的新闻未处理，水位保持不变")
+            new_watermark = None
+
+        self.store.commit(query, summarized, rejected, new_watermark)
+        # 时间线写入按 URL 幂等：若在此之前退出，下次运行会因 URL 已入库而跳过，可用 backfill_timeline 补齐
+        self.timeline.add(
+            [article for article, _ in summarized],
+            extra={article.url: {"summary": summary, "query": query} for article, summary in summarized},
+        )
+        stats.update(
+            rejected=len(rejected), summarized=len(summarized), failed=len(failed),
+            watermark=self.store.get_watermark(query),
+        )
+        logger.info(f"✅ 入库完成：新增 {len(new_articles)} 条，总结 {len(summarized)}，过滤 {len(rejected)}，"
+                    f"失败 {len(failed)}，水位 → {stats['watermark']}")
+        return stats
+
+    def backfill_timeline(self) -> int:
+        """把文章存储中已总结、但尚未写入时间线的文章补写进去，返回补写条数"""
+        added = 0
+        batch: List[NewsArticle] = []
+        extra: Dict[str, Dict] = {}
+        for row in self.store.iter_articles():
+            batch.append(NewsArticle(
+                url=row["url"], title=row["title"], core_content=row["content"] or "",
+                published_at=row["published_at"], source=row["source"],
+            ))
+            extra[row["url"]] = {"summary": row["summary"], "query": row["query"]}
+            if len(batch) >= 500:
+                # add 内部按 URL 去重（每段一次批量二分查找），已写入时间线的文章直接跳过
+                added += self.timeline.add(batch, extra=extra)
+                batch, extra = [], {}
+        if batch:
+            added += self.timeline.add(batch, extra=extra)
+        logger.info(f"✅ 时间线补写完成：{added} 条")
+        return added
+
+    def run_many(self, queries: List[str], **kwargs) -> List[Dict]:
+        """依次对多个查询执行增量入库（各查询水位独立）"""
+        return [self.run(query, **kwargs) for query in queries]
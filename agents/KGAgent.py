@@ -1,18 +1,174 @@
+import base64
+import html
 import json
 import os
-import time
-from typing import List, Dict, Union, Optional
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Union, Optional, TYPE_CHECKING
 from dataclasses import dataclass, field
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
+from urllib.parse import quote
 from langchain_core.prompts import ChatPromptTemplate
 from utils.llm_utils import get_qwen_llm
+from utils.image_cache import ImageAssetCache
+from utils.telemetry import get_logger, propagate, span
+if TYPE_CHECKING:
+    # selenium 仅在真正截图时才导入，只生成 HTML 的进程无需加载
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from utils.job_journal import JobJournal
+
+logger = get_logger(__name__)
+# ======================== 0. 模板渲染 JSON → HTML 工具（确定性，毫秒级） ========================
+def _unwrap_knowledge_graph(json_data) -> Dict:
+    """兼容多种输入结构，取出 knowledge_graph 字典：entities[0].entity_content / knowledge_graph / 顶层"""
+    if not isinstance(json_data, Dict):
+        return {}
+    if json_data.get("entities"):
+        entity_data = json_data["entities"][0]
+        return entity_data.get("entity_content", entity_data) if isinstance(entity_data, Dict) else {}
+    kg = json_data.get("knowledge_graph", json_data)
+    return kg if isinstance(kg, Dict) else {}
+
+
+class TemplateJsonToHtmlTool:
+    """
+    工具0：按固定模板把 SerpAPI knowledge_graph 渲染为知识卡片 HTML。
+    布局与配色与 LLMJsonToHtmlTool 提示词中的规范一致；无法映射的结构返回 None，交由 LLM 兜底。
+    """
+    # 元数据/链接类字段，不作为属性展示
+    SKIP_KEYS = {
+        "title", "type", "description", "header_images", "source", "kgmid", "entity_type",
+        "knowledge_graph_search_link", "serpapi_knowledge_graph_search_link", "image", "images",
+        "website", "people_also_search_for", "people_also_search_for_link",
+        "serpapi_people_also_search_for_link", "profiles", "see_results_about", "list",
+    }
+    # 人员类字段 → 核心人员区
+    PEOPLE_KEYS = {
+        "ceo", "founder", "founders", "key_people", "president", "chairman", "chairperson",
+        "spouse", "children", "parents", "创始人", "首席执行官", "董事长", "总裁", "配偶", "子女", "父母",
+    }
+    LABELS = {
+        "founded": "成立时间", "founding_date": "成立时间", "headquarters": "总部", "ceo": "首席执行官",
+        "founder": "创始人", "founders": "创始人", "key_people": "核心人物", "president": "总裁",
+        "chairman": "董事长", "chairperson": "董事长", "subsidiaries": "子公司", "parent_organization": "母公司",
+        "revenue": "营收", "number_of_employees": "员工人数", "stock_price": "股价", "born": "出生",
+        "died": "逝世", "spouse": "配偶", "children": "子女", "parents": "父母", "education": "教育经历",
+        "nationality": "国籍", "awards": "奖项", "website": "官网",
+    }
+    # 图片加载失败时的占位图（整体 URL 编码，可安全嵌入 onerror 属性）
+    PLACEHOLDER_IMG = "data:image/svg+xml;charset=utf-8," + quote(
+        "<svg xmlns='http://www.w3.org/2000/svg' width='260' height='190'>"
+        "<rect width='100%' height='100%' fill='#f3f4f6'/><text x='50%' y='50%' font-size='16' "
+        "fill='#9ca3af' text-anchor='middle' dominant-baseline='middle'>暂无图片</text></svg>"
+    )
+    STYLE = """
+        body { margin: 0; padding: 30px; background: #f9fafb; font-family: Arial, "Microsoft YaHei", sans-serif; }
+        .card { max-width: 900px; margin: 0 auto; background: #ffffff; border-radius: 16px;
+                box-shadow: 0 4px 16px rgba(0,0,0,0.08); padding: 40px; }
+        .title { color: #111827; font-size: 32px; font-weight: bold; margin: 0; }
+        .subtitle { color: #6b7280; font-size: 15px; margin-top: 8px; }
+        .section { margin-top: 28px; }
+        .section h2 { color: #111827; font-size: 18px; margin: 0 0 12px 0; border-left: 4px solid #111827; padding-left: 10px; }
+        .desc { color: #4b5563; font-size: 15px; line-height: 1.8; margin: 0; }
+        .attrs { display: grid; grid-template-columns: repeat(var(--cols), 1fr); gap: 12px 24px; }
+        .attr-name { color: #1f2937; font-weight: bold; font-size: 14px; }
+        .attr-value { color: #4b5563; font-size: 14px; margin-top: 2px; word-break: break-all; }
+        .images { display: flex; gap: 16px; flex-wrap: wrap; }
+        .images img { width: 260px; height: 190px; object-fit: cover; border-radius: 12px; background: #f3f4f6; }
+        .empty { color: #9ca3af; font-size: 14px; }
+    """
+
+    @staticmethod
+    def _text(value) -> Optional[str]:
+        """把字段值转为展示文本；嵌套结构取 name/title 字段，无法展示的返回 None"""
+        if isinstance(value, (str, int, float)):
+            text = str(value).strip()
+            return text or None
+        if isinstance(value, Dict):
+            return TemplateJsonToHtmlTool._text(value.get("name") or value.get("title"))
+        if isinstance(value, List):
+            parts = [t for t in (TemplateJsonToHtmlTool._text(v) for v in value) if t]
+            return "、".join(parts) if parts else None
+        return None
+
+    def _label(self, key: str) -> str:
+        return self.LABELS.get(key, key.replace("_", " "))
+
+    def _grid(self, pairs: List[tuple]) -> str:
+        if not pairs:
+            return '<p class="empty">暂无数据</p>'
+        cols = 1 if len(pairs) <= 3 else (2 if len(pairs) <= 8 else 3)
+        cells = "".join(
+            f'<div><div class="attr-name">{html.escape(name)}</div>'
+            f'<div class="attr-value">{html.escape(value)}</div></div>'
+            for name, value in pairs
+        )
+        return f'<div class="attrs" style="--cols:{cols}">{cells}</div>'
+
+    def render(self, json_data) -> Optional[str]:
+        """渲染知识卡片 HTML；缺少标题或既无描述也无可展示属性时返回 None"""
+        kg = _unwrap_knowledge_graph(json_data)
+        title = self._text(kg.get("title"))
+        if not title:
+            return None
+
+        attributes, people = [], []
+        for key, value in kg.items():
+            if key in self.SKIP_KEYS or key.endswith("_link") or key.endswith("_links"):
+                continue
+            text = self._text(value)
+            if not text:
+                continue
+            (people if key in self.PEOPLE_KEYS else attributes).append((self._label(key), text))
+        website = self._text(kg.get("website"))
+        if website:
+            attributes.append((self._label("website"), website))
+
+        description = self._text(kg.get("description"))
+        if not description and not attributes and not people:
+            return None
+
+        images = [
+            img.get("image") or img.get("source")
+            for img in (kg.get("header_images") or []) if isinstance(img, Dict)
+        ]
+        images = [src for src in images if isinstance(src, str) and src.startswith(("http://", "https://", "data:", "file:"))][:3]
+        images_html = "".join(
+            f'<img src="{html.escape(src)}" onerror="this.onerror=null;this.src=\'{self.PLACEHOLDER_IMG}\'">'
+            for src in images
+        ) or '<p class="empty">暂无数据</p>'
+
+        subtitle = self._text(kg.get("type")) or "暂无数据"
+        return f"""<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+<meta charset="utf-8">
+<title>{html.escape(title)}</title>
+<style>{self.STYLE}</style>
+</head>
+<body>
+<div class="card" id="card">
+  <div class="header">
+    <h1 class="title">{html.escape(title)}</h1>
+    <div class="subtitle">{html.escape(subtitle)}</div>
+  </div>
+  <div class="section"><h2>简介</h2><p class="desc">{html.escape(description or "暂无数据")}</p></div>
+  <div class="section"><h2>核心属性</h2>{self._grid(attributes)}</div>
+  <div class="section"><h2>核心人员</h2>{self._grid(people)}</div>
+  <div class="section"><h2>相关图片</h2><div class="images">{images_html}</div></div>
+</div>
+</body>
+</html>"""
+
+
 # ======================== 1. LLM 端到端 JSON → HTML 工具（核心） ========================
 class LLMJsonToHtmlTool:
-    """工具1：LLM 直接解析 JSON → 生成完整 HTML（含样式、图片链接）"""
-    def __init__(self, llm_model: str = "qwen-turbo"):
-        self.llm =get_qwen_llm()
+    """工具1：LLM 直接解析 JSON → 生成完整 HTML（含样式、图片链接）；默认先走模板渲染，LLM 仅兜底"""
+    def __init__(self, llm_model: str = "qwen-turbo", use_template: bool = True):
+        self.llm =get_qwen_llm(llm_model, cache_namespace="kg_html")
         self.prompt_template = self._build_prompt()
+        self.template_tool = TemplateJsonToHtmlTool() if use_template else None
 
     def _build_prompt(self) -> ChatPromptTemplate:
         """构建提示词：让 LLM 解析 JSON 并生成完整 HTML"""
@@ -56,24 +212,29 @@ class LLMJsonToHtmlTool:
         else:
             serp_json_str = serp_json
 
-        # 调用 LLM 生成 HTML
-        print("🤖 LLM 正在解析 JSON 并生成 HTML...")
-        response = self.llm.invoke(self.prompt_template.format(serp_json=serp_json_str))
-        html_content = response.content.strip()
-
-        # 提取实体名称（用于文件名）
         try:
-            json_data = json.loads(serp_json_str) if isinstance(serp_json_str, str) else serp_json
-            # 适配你之前提供的 JSON 结构（entities 数组中的 title/entity_content）
-            if "entities" in json_data and len(json_data["entities"]) > 0:
-                entity_data = json_data["entities"][0]
-                # 优先从 entity_content 取名称，无则用 identifier 或默认值
-                entity_name = entity_data.get("entity_content", {}).get("title", 
-                            entity_data.get("identifier", "未知实体"))
+            json_data = json.loads(serp_json_str) if isinstance(serp_json, str) else serp_json
+        except ValueError:
+            json_data = None
+
+        # 优先使用模板渲染（毫秒级、结果可复现），无法映射的结构再调用 LLM 生成 HTML
+        with span("kg.json_to_html") as sp:
+            html_content = self.template_tool.render(json_data) if self.template_tool and json_data else None
+            if html_content:
+                sp.set(renderer="template")
+                logger.info("🧩 模板渲染 HTML 成功")
             else:
-                # 兼容原 SerpJSON 结构（knowledge_graph）
-                entity_name = json_data.get("knowledge_graph", json_data).get("title", "未知实体")
-        except:
+                sp.set(renderer="llm")
+                logger.info("🤖 LLM 正在解析 JSON 并生成 HTML...")
+                response = self.llm.invoke(self.prompt_template.format(serp_json=serp_json_str))
+                html_content = response.content.strip()
+            sp.set(bytes=len(html_content.encode("utf-8")))
+
+        # 提取实体名称（用于文件名）：兼容 entities 数组 / knowledge_graph / 顶层结构
+        entity_name = _unwrap_knowledge_graph(json_data).get("title")
+        if not entity_name and isinstance(json_data, Dict) and json_data.get("entities"):
+            entity_name = json_data["entities"][0].get("identifier")
+        if not entity_name or not isinstance(entity_name, str):
             entity_name = "未知实体"
         
         # 过滤非法文件名字符（避免创建失败）
@@ -83,20 +244,104 @@ class LLMJsonToHtmlTool:
         html_path = os.path.join(target_dir, f"{safe_name}.html")
         with open(html_path, "w", encoding="utf-8") as f:
             f.write(html_content)
-        print(f"🌐 HTML 生成成功（保存到 data/KG）：{html_path}")
+        logger.info(f"🌐 HTML 生成成功（保存到 data/KG）：{html_path}")
         return html_path
 
 # ======================== 2. HTML → PNG 工具 ========================
 class HtmlToPngTool:
-    """工具2：HTML 截图为 PNG"""
-    def __init__(self, chrome_options: Optional[Options] = None):
-        self.options = chrome_options or Options()
-        self.options.add_argument("--headless=new")
-        self.options.add_argument("--disable-gpu")
-        self.options.add_argument("--window-size=1000,1600")  # 适配知识卡片高度
-        self.options.add_argument("--no-sandbox")
-        self.options.add_argument("--disable-dev-shm-usage")
-        self.driver = webdriver.Chrome(options=self.options)
+    """
+    工具2：HTML 截图为 PNG（无头浏览器池）
+    - pool_size 个 Chrome 实例按需创建，run_many 并行渲染多张卡片；
+    - 以页面真实就绪为准（DOM 完成、图片加载成功或失败、字体就绪），超时兜底，不再固定 sleep；
+    - 截图按卡片元素裁剪，而不是固定的窗口尺寸。
+    """
+    # 卡片元素选择器（模板渲染为 #card，LLM 生成的页面依次尝试常见命名，最后退回 body 首个元素）
+    CARD_SELECTORS = "#card, .card, .knowledge-card, .container"
+
+    # 页面就绪检测：轮询 readyState 与 <img>.complete（加载失败同样为 complete），再等待字体
+    READY_SCRIPT = """
+        const timeoutMs = arguments[0];
+        const done = arguments[arguments.length - 1];
+        const deadline = Date.now() + timeoutMs;
+        const imagesSettled = () => Array.from(document.images).every(img => img.complete);
+        (async () => {
+            while (document.readyState !== "complete" || !imagesSettled()) {
+                if (Date.now() > deadline) { done(false); return; }
+                await new Promise(r => setTimeout(r, 50));
+            }
+            if (document.fonts && document.fonts.ready) {
+                const left = Math.max(0, deadline - Date.now());
+                await Promise.race([document.fonts.ready, new Promise(r => setTimeout(r, left))]);
+            }
+            requestAnimationFrame(() => requestAnimationFrame(() => done(true)));
+        })();
+    """
+
+    # 卡片元素在文档坐标系中的位置（用于 CDP 裁剪截图）
+    RECT_SCRIPT = """
+        const el = document.querySelector(arguments[0]) || document.body.firstElementChild || document.body;
+        const r = el.getBoundingClientRect();
+        return {x: r.left + window.scrollX, y: r.top + window.scrollY,
+                width: Math.ceil(r.width), height: Math.ceil(r.height)};
+    """
+
+    def __init__(self, chrome_options: Optional["Options"] = None, pool_size: int = 1, ready_timeout: float = 10.0):
+        self.options = chrome_options  # None 时在首次创建浏览器时构建默认配置
+        self.pool_size = max(1, pool_size)
+        self.ready_timeout = ready_timeout
+        self._idle: "queue.Queue[webdriver.Chrome]" = queue.Queue()
+        self._drivers: List["webdriver.Chrome"] = []
+        self._pool_lock = threading.Lock()
+        self._options_built = False
+
+    def _build_options(self) -> "Options":
+        from selenium.webdriver.chrome.options import Options
+
+        options = self.options or Options()
+        options.add_argument("--headless=new")
+        options.add_argument("--disable-gpu")
+        options.add_argument("--window-size=1000,1600")  # 初始视口；截图按卡片实际尺寸裁剪
+        options.add_argument("--no-sandbox")
+        options.add_argument("--disable-dev-shm-usage")
+        return options
+
+    def _acquire_driver(self) -> "webdriver.Chrome":
+        """从池中取一个空闲浏览器；池未满时新建，已满则等待归还"""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._pool_lock:
+            if len(self._drivers) < self.pool_size:
+                from selenium import webdriver
+
+                if not self._options_built:
+                    self.options = self._build_options()
+                    self._options_built = True
+                driver = webdriver.Chrome(options=self.options)
+                driver.set_script_timeout(self.ready_timeout + 5)
+                self._drivers.append(driver)
+                return driver
+        return self._idle.get()
+
+    def _release_driver(self, driver: "webdriver.Chrome") -> None:
+        self._idle.put(driver)
+
+    def _capture(self, driver: "webdriver.Chrome", html_path: str, png_path: str) -> None:
+        driver.get(f"file://{os.path.abspath(html_path)}")
+        ready = driver.execute_async_script(self.READY_SCRIPT, int(self.ready_timeout * 1000))
+        if not ready:
+            logger.warning(f"⚠️ 页面未在 {self.ready_timeout}s 内完全就绪，按当前状态截图：{html_path}")
+        rect = driver.execute_script(self.RECT_SCRIPT, self.CARD_SELECTORS)
+        # CDP 截图：captureBeyondViewport 允许卡片高于视口时完整截取
+        shot = driver.execute_cdp_cmd("Page.captureScreenshot", {
+            "format": "png",
+            "captureBeyondViewport": True,
+            "clip": {"x": rect["x"], "y": rect["y"], "width": max(1, rect["width"]),
+                     "height": max(1, rect["height"]), "scale": 1},
+        })
+        with open(png_path, "wb") as f:
+            f.write(base64.b64decode(shot["data"]))
 
     def run(self, html_path: str, output_dir: str = "serp_png_results") -> str:
         """执行：输入 HTML 路径 → 输出 PNG 路径"""
@@ -104,20 +349,44 @@ class HtmlToPngTool:
         entity_name = os.path.splitext(os.path.basename(html_path))[0]
         png_path = os.path.join(output_dir, f"{entity_name}_知识图谱.png")
 
-        try:
-            # 加载本地 HTML（确保图片链接加载完成）
-            self.driver.get(f"file://{os.path.abspath(html_path)}")
-            time.sleep(4)  # 关键：等待图片和样式渲染
-            self.driver.save_screenshot(png_path)
-            print(f"📸 PNG 生成成功：{png_path}")
-            return png_path
-        except Exception as e:
-            raise RuntimeError(f"HTML 转 PNG 失败：{str(e)}")
+        with span("kg.html_to_png", entity=entity_name) as sp:
+            driver = self._acquire_driver()
+            try:
+                self._capture(driver, html_path, png_path)
+                sp.set(bytes=os.path.getsize(png_path))
+                logger.info(f"📸 PNG 生成成功：{png_path}")
+                return png_path
+            except Exception as e:
+                raise RuntimeError(f"HTML 转 PNG 失败：{str(e)}")
+            finally:
+                self._release_driver(driver)
+
+    def run_many(self, html_paths: List[str], output_dir: str = "serp_png_results") -> List[Optional[str]]:
+        """并行渲染多张卡片，返回与输入顺序一致的 PNG 路径列表（失败项为 None）"""
+        def _safe_run(html_path: str) -> Optional[str]:
+            try:
+                return self.run(html_path, output_dir=output_dir)
+            except Exception as e:
+                logger.error(f"❌ {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=self.pool_size) as executor:
+            return list(executor.map(propagate(_safe_run), html_paths))
+
+    def close(self) -> None:
+        """关闭池中所有浏览器"""
+        with self._pool_lock:
+            drivers, self._drivers = self._drivers, []
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
 
     def __del__(self):
         """销毁时关闭浏览器"""
-        if hasattr(self, "driver"):
-            self.driver.quit()
+        if hasattr(self, "_drivers"):
+            self.close()
 
 # ======================== 3. 核心 Agent（LLM 端到端 JSON → PNG） ========================
 @dataclass
@@ -125,10 +394,13 @@ class LLMEndToEndJsonToPngAgent:
     """LLM 端到端驱动的 JSON → PNG 知识图谱 Agent"""
     # 工具初始化（懒加载）
     json_to_html_tool: LLMJsonToHtmlTool = field(default_factory=LLMJsonToHtmlTool)
+    browser_pool_size: int = 2  # 并行截图的浏览器数量
+    # 截图前把卡片图片下载到本地缓存并改写 HTML；设为 None 则保留远程图片链接
+    image_cache: Optional[ImageAssetCache] = field(default_factory=ImageAssetCache)
     html_to_png_tool: HtmlToPngTool = field(init=False)
 
     def __post_init__(self):
-        self.html_to_png_tool = HtmlToPngTool()
+        self.html_to_png_tool = HtmlToPngTool(pool_size=self.browser_pool_size)
 
     def _validate_input(self, serp_json: Union[str, Dict, List[Union[str, Dict]]]) -> List[Union[str, Dict]]:
         """验证输入：支持单个/多个 JSON"""
@@ -146,14 +418,22 @@ class LLMEndToEndJsonToPngAgent:
         else:
             raise TypeError(f"输入必须是 JSON 字符串/字典/列表，当前类型：{type(serp_json)}")
 
-    def run(self, serp_json: Union[str, Dict, List[Union[str, Dict]]], output_dir: str = "serp_png_results") -> List[str]:
-        """执行核心流程：输入 SerpJSON → 输出 PNG 路径列表"""
+    def render_all(
+        self, serp_json: Union[str, Dict, List[Union[str, Dict]]], output_dir: str = "serp_png_results"
+    ) -> List[Optional[str]]:
+        """执行核心流程：输入 SerpJSON → 输出与输入一一对应的 PNG 路径列表（失败项为 None）"""
         # Step 1：验证输入
         json_list = self._validate_input(serp_json)
-        print(f"🚀 开始处理 {len(json_list)} 个实体 JSON...")
+        with span("agent.kg_cards", entities=len(json_list)) as sp:
+            pngs = self._render_all(json_list, output_dir)
+            sp.set(rendered=sum(1 for p in pngs if p))
+            return pngs
 
-        # Step 2：批量处理每个 JSON
-        png_paths = []
+    def _render_all(self, json_list: List[Union[str, Dict]], output_dir: str) -> List[Optional[str]]:
+        logger.info(f"🚀 开始处理 {len(json_list)} 个实体 JSON...")
+
+        # Step 2：逐个生成 HTML（模板渲染为毫秒级，LLM 兜底较慢）
+        html_paths = []
         for idx, json_data in enumerate(json_list, 1):
             try:
                 # 提取实体名称（用于日志）
@@ -162,19 +442,66 @@ class LLMEndToEndJsonToPngAgent:
                     entity_name = json.loads(json_str).get("knowledge_graph", {}).get("title", f"实体_{idx}")
                 except:
                     entity_name = f"实体_{idx}"
-                print(f"\n=== 处理实体 [{idx}/{len(json_list)}]：{entity_name} ===")
-                
-                # 工具1：LLM 解析 JSON → HTML（直接嵌入图片链接）
-                html_path = self.json_to_html_tool.run(json_data)
-                
-                # 工具2：HTML → PNG
-                png_path = self.html_to_png_tool.run(html_path, output_dir=output_dir)
+                logger.info(f"\n=== 处理实体 [{idx}/{len(json_list)}]：{entity_name} ===")
                 
-                png_paths.append(png_path)
+                # 工具1：JSON → HTML（直接嵌入图片链接）
+                html_paths.append(self.json_to_html_tool.run(json_data))
             except Exception as e:
-                print(f"❌ 处理实体 [{idx}] 失败：{str(e)}")
-                continue
+                logger.error(f"❌ 处理实体 [{idx}] 失败：{str(e)}")
+                html_paths.append(None)
 
-        print(f"\n🎉 所有实体处理完成！成功生成 {len(png_paths)} 张 PNG 图片，保存至：{output_dir}")
-        return png_paths
+        # Step 3：图片预下载到本地（失败的提前替换为占位图），截图阶段不再有网络 I/O
+        ok_paths = [p for p in html_paths if p]
+        if self.image_cache and ok_paths:
+            logger.info("🖼️ 正在预下载卡片图片到本地缓存...")
+            self.image_cache.localize_html_files(ok_paths, TemplateJsonToHtmlTool.PLACEHOLDER_IMG)
+
+        # Step 4：浏览器池并行截图 HTML → PNG
+        pngs = iter(self.html_to_png_tool.run_many(ok_paths, output_dir=output_dir))
+        return [next(pngs) if p else None for p in html_paths]
 
+    def _journaled_render_all(
+        self,
+        serp_json: Union[str, Dict, List[Union[str, Dict]]],
+        output_dir: str,
+        job_id: str,
+        journal: Optional["JobJournal"],
+        max_attempts: int,
+    ) -> List[Optional[str]]:
+        from utils.job_journal import get_job_journal, item_key
+
+        json_list = self._validate_input(serp_json)
+        job = (journal or get_job_journal()).open_job(
+            job_id, "kg_cards", [item_key(j) for j in json_list], max_attempts
+        )
+        step = max(1, self.browser_pool_size) * 4
+        for start in range(0, len(job.todo), step):
+            part = job.todo[start:start + step]
+            for idx, png in zip(part, self.render_all([json_list[idx] for idx in part], output_dir=output_dir)):
+                job.record(idx, png, None if png else "渲染失败")
+        job.finish()
+        return job.results
+
+    def run(
+        self,
+        serp_json: Union[str, Dict, List[Union[str, Dict]]],
+        output_dir: str = "serp_png_results",
+        job_id: Optional[str] = None,
+        journal: Optional["JobJournal"] = None,
+        max_attempts: int = 3,
+    ) -> List[str]:
+        """
+        执行核心流程：输入 SerpJSON → 输出 PNG 路径列表（仅成功项）
+        :param job_id: 指定时以可恢复任务运行：按批（浏览器池大小的 4 倍）渲染，每批完成即写入任务日志；
+                       中断后用同一 job_id 重新运行只渲染未完成与失败的实体
+        :param journal: 任务日志，默认使用进程内共享实例
+        :param max_attempts: 单个实体最多尝试次数，超过后不再重试
+        """
+        if job_id:
+            pngs = self._journaled_render_all(serp_json, output_dir, job_id, journal, max_attempts)
+        else:
+            pngs = self.render_all(serp_json, output_dir=output_dir)
+        png_paths = [p for p in pngs if p]
+
+        logger.info(f"\n🎉 所有实体处理完成！成功生成 {len(png_paths)} 张 PNG 图片，保存至：{output_dir}")
+        return png_paths
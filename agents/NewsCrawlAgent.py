@@ -1,10 +1,23 @@
-from typing import List, Dict
+import asyncio
+import contextlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Callable, Iterator, AsyncIterator, TYPE_CHECKING
 # 复用你已有的 LLM 获取函数（无需重新定义）
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import RunnablePassthrough
-from tools.NewsTool import news_extract_tool
+from langchain_core.runnables import RunnablePassthrough, RunnableLambda
+from tools.NewsTool import extract_news_original_content, aextract_news_original_content
+from utils.http_client import AsyncHttpClient, new_async_http_client
+from utils.content_cache import normalize_url
 from utils.llm_utils import get_qwen_llm
+from utils.telemetry import get_logger, span
+from utils.text_utils import estimate_tokens, chunk_text
+if TYPE_CHECKING:
+    from utils.dedup import NewsDeduplicator
+    from utils.job_journal import JobJournal
+
+logger = get_logger(__name__)
 # ======================== 3. 核心：新闻总结 Chain（纯串联，无多余代码）========================
 class NewsSummaryagent:
     """
@@ -12,9 +25,28 @@ class NewsSummaryagent:
     流程：URL → 工具提取原文 → LLM 总结 → 直接输出结果
     """
     
-    def __init__(self):
+    def __init__(
+        self,
+        single_call_tokens: int = 6000,
+        map_chunk_tokens: int = 3000,
+        max_content_chars: int = 200000,
+        map_concurrency: int = 4,
+        max_map_rounds: int = 3,
+    ):
+        """
+        :param single_call_tokens: 原文估算 token 不超过该值时单次调用直接总结（快速路径）
+        :param map_chunk_tokens: 长文分块总结时每块的 token 上限
+        :param max_content_chars: 原文最大长度（防止异常页面），远大于旧的 25000 字硬截断
+        :param map_concurrency: 长文分块（map）阶段的并发调用数
+        :param max_map_rounds: 要点合并后仍超限时最多再提炼的轮数，达到上限（或某轮没有变短）后截断要点直接 reduce
+        """
         # 复用你的 LLM 实例（不重复定义）
-        self.llm = get_qwen_llm()
+        self.llm = get_qwen_llm(cache_namespace="news_summary")
+        self.single_call_tokens = single_call_tokens
+        self.map_chunk_tokens = map_chunk_tokens
+        self.max_content_chars = max_content_chars
+        self.map_concurrency = map_concurrency
+        self.max_map_rounds = max_map_rounds
         
         # 总结 Prompt（保持你想要的输出格式）
         self.summary_prompt = ChatPromptTemplate.from_messages([
@@ -36,61 +68,515 @@ class NewsSummaryagent:
             ),
             ("human", "新闻原文：\n{news_content}"),
         ])
+
+        # 长文 map 阶段：逐块提炼要点
+        self.map_prompt = ChatPromptTemplate.from_messages([
+            (
+                "system",
+                """
+                你是专业新闻总结助手。下面是一篇长新闻的第 {chunk_index}/{chunk_total} 部分。
+                请提炼该部分的关键信息（事件主体、时间、核心动作、数据、结果/影响），用 3-6 条要点列出，
+                每条一句话，仅基于该部分原文，不编造、不评论，不要输出其他文本。
+                """,
+            ),
+            ("human", "新闻原文片段：\n{news_content}"),
+        ])
+        # 长文 reduce 阶段：合并各部分要点，输出与单次总结完全相同的格式
+        self.reduce_prompt = ChatPromptTemplate.from_messages([
+            (
+                "system",
+                """
+                你是专业新闻总结助手。以下是同一篇新闻按顺序分段提炼出的要点，请合并为全文总结：
+                1. 核心要点：提炼 3-5 点关键信息，必须包含事件主体、时间、核心动作、结果/影响；
+                2. 核心概括：100-150 字简洁总结全文核心，不添加额外评论或扩展解读；
+                3. 输出格式严格遵循（不要添加任何多余文本）：
+                【核心要点】
+                1. XXXX
+                2. XXXX
+                ...
+                【核心概括】
+                XXXX
+                4. 仅基于提供的要点内容，不编造任何未提及的信息。
+                """,
+            ),
+            ("human", "分段要点：\n{partial_summaries}"),
+        ])
         
         # 构建 Chain：URL → 提取原文 → 总结（纯串联，无 Agent）
         self.chain = self._build_chain()
 
     def _build_chain(self):
-        """构建线性 Chain：URL → 原文 → 总结"""
-        # 第一步：接收 URL，调用工具提取原文
+        """构建线性 Chain：URL → 原文 → 总结（短文单次调用，长文 map-reduce）"""
+        # 第一步：接收 URL，调用工具提取原文（全文，不再按 25000 字硬截断）
         extract_step = RunnablePassthrough.assign(
-            news_content=lambda x: news_extract_tool.run(x["url"])
+            news_content=lambda x: extract_news_original_content(x["url"], max_chars=self.max_content_chars)
         )
         
-        # 第二步：用 LLM 处理原文，生成总结
-        summary_step = self.summary_prompt | self.llm | StrOutputParser()
+        # 第二步：用 LLM 处理原文，生成总结（单独保存，供异步批量模式复用）
+        self.summary_chain = self.summary_prompt | self.llm | StrOutputParser()
+        self.map_chain = self.map_prompt | self.llm | StrOutputParser()
+        self.reduce_chain = self.reduce_prompt | self.llm | StrOutputParser()
+        # 输入 {"news_content": 原文} → 总结，自动选择单次/分块路径（同步与异步）
+        self.summarize_step = RunnableLambda(
+            lambda x: self.summarize_content(x["news_content"]),
+            afunc=lambda x: self.asummarize_content(x["news_content"]),
+        )
         
         # 串联两步：输入 URL → 输出总结
-        return extract_step | (lambda x: x["news_content"]) | summary_step
+        return extract_step | self.summarize_step
+
+    def _map_inputs(self, chunks: List[str]) -> List[Dict]:
+        return [
+            {"news_content": chunk, "chunk_index": idx, "chunk_total": len(chunks)}
+            for idx, chunk in enumerate(chunks, 1)
+        ]
+
+    def _join_partials(self, partials: List[str]) -> str:
+        return "\n\n".join(f"【第 {idx} 部分】\n{p.strip()}" for idx, p in enumerate(partials, 1))
+
+    def summarize_content(self, news_content: str) -> str:
+        """
+        原文 → 结构化总结：
+        - 估算 token 不超过 single_call_tokens：单次调用（快速路径）；
+        - 否则按段落/句子边界分块，各块并发 map 提炼要点，再 reduce 合并为最终格式；
+          合并后的要点仍超限时，分组逐层合并直到可一次 reduce。
+        提取阶段的错误信息原样返回，不调用 LLM。
+        """
+        if news_content.startswith("错误"):
+            return news_content
+        with span("agent.news_summary.summarize", chars=len(news_content)) as sp:
+            if estimate_tokens(news_content) <= self.single_call_tokens:
+                return self.summary_chain.invoke({"news_content": news_content})
+            partials = self._map_partials(news_content, sp)
+            return self.reduce_chain.invoke({"partial_summaries": self._join_partials(partials)})
+
+    async def asummarize_content(self, news_content: str, llm_semaphore: Optional[asyncio.Semaphore] = None) -> str:
+        """
+        summarize_content 的异步版本（map 阶段并发）。
+        :param llm_semaphore: 共享的 LLM 并发名额；传入时每一次 LLM 调用（含 map 的每一块）各占一个名额，
+                              长文分块不会让实际并发超过该上限
+        """
+        if news_content.startswith("错误"):
+            return news_content
+        guard = llm_semaphore if llm_semaphore is not None else contextlib.nullcontext()
+        with span("agent.news_summary.summarize", chars=len(news_content)) as sp:
+            if estimate_tokens(news_content) <= self.single_call_tokens:
+                async with guard:
+                    return await self.summary_chain.ainvoke({"news_content": news_content})
+            partials = await self._amap_partials(news_content, sp, llm_semaphore)
+            async with guard:
+                return await self.reduce_chain.ainvoke({"partial_summaries": self._join_partials(partials)})
+
+    def _map_partials(self, news_content: str, sp) -> List[str]:
+        """长文 map 阶段：分块并发提炼要点，合并后仍超限时逐层再提炼，返回可一次 reduce 的分段要点"""
+        chunks = chunk_text(news_content, self.map_chunk_tokens)
+        sp.set(chunks=len(chunks))
+        logger.info(f"长文分块总结：{len(chunks)} 块")
+        config = {"max_concurrency": self.map_concurrency}
+        partials = self.map_chain.batch(self._map_inputs(chunks), config=config)
+        for _ in range(self.max_map_rounds):
+            tokens = estimate_tokens(self._join_partials(partials))
+            if tokens <= self.single_call_tokens or len(partials) <= 1:
+                return partials
+            groups = chunk_text("\n\n".join(partials), self.map_chunk_tokens)
+            regrouped = self.map_chain.batch(self._map_inputs(groups), config=config)
+            if estimate_tokens(self._join_partials(regrouped)) >= tokens:
+                break  # 再提炼没有变短（模型输出冗长或命中相同缓存），继续循环只会空耗调用
+            partials = regrouped
+        return self._fit_partials(partials)
+
+    async def _amap_batch(self, inputs: List[Dict], llm_semaphore: Optional[asyncio.Semaphore]) -> List[str]:
+        """map 一轮：单篇内最多 map_concurrency 块并发，且每块调用都要先拿到共享的 LLM 名额"""
+        if llm_semaphore is None:
+            return await self.map_chain.abatch(inputs, config={"max_concurrency": self.map_concurrency})
+        local = asyncio.Semaphore(self.map_concurrency)
+
+        async def _one(chunk_input: Dict) -> str:
+            async with local, llm_semaphore:
+                return await self.map_chain.ainvoke(chunk_input)
+
+        return list(await asyncio.gather(*(_one(x) for x in inputs)))
+
+    async def _amap_partials(self, news_content: str, sp, llm_semaphore: Optional[asyncio.Semaphore] = None) -> List[str]:
+        chunks = chunk_text(news_content, self.map_chunk_tokens)
+        sp.set(chunks=len(chunks))
+        partials = await self._amap_batch(self._map_inputs(chunks), llm_semaphore)
+        for _ in range(self.max_map_rounds):
+            tokens = estimate_tokens(self._join_partials(partials))
+            if tokens <= self.single_call_tokens or len(partials) <= 1:
+                return partials
+            groups = chunk_text("\n\n".join(partials), self.map_chunk_tokens)
+            regrouped = await self._amap_batch(self._map_inputs(groups), llm_semaphore)
+            if estimate_tokens(self._join_partials(regrouped)) >= tokens:
+                break
+            partials = regrouped
+        return self._fit_partials(partials)
+
+    def _fit_partials(self, partials: List[str]) -> List[str]:
+        """再提炼轮数用尽后仍超限：每段要点按平均预算截取开头，保证一次 reduce 不超过 single_call_tokens"""
+        if estimate_tokens(self._join_partials(partials)) <= self.single_call_tokens:
+            return partials
+        budget = max(1, self.single_call_tokens // max(1, len(partials)))
+        logger.warning(f"⚠️ 分段要点再提炼后仍超限（上限 {self.max_map_rounds} 轮），按每段 {budget} token 截断后合并")
+        return [(chunk_text(p, budget) or [""])[0] for p in partials]
 
     def run(self, url: str) -> str:
         """核心方法：输入单个新闻 URL，返回结构化总结"""
         if not url:
             return "错误：新闻 URL 不能为空"
         
-        print(f"\n===== 开始处理新闻 =====")
-        print(f"URL：{url}")
-        
-        try:
-            result = self.chain.invoke({"url": url})
-            
-            # 处理工具返回的错误信息
-            if "错误" in result[:10]:
-                return f"新闻处理失败：{result}"
-            
-            print(f"===== 总结完成 =====")
-            return result
+        logger.info(f"\n===== 开始处理新闻 =====")
+        logger.info(f"URL：{url}")
         
-        except Exception as e:
-            error_msg = f"新闻总结异常：{str(e)}"
-            print(error_msg)
-            return error_msg
+        with span("agent.news_summary", url=url) as sp:
+            try:
+                result = self.chain.invoke({"url": url})
+
+                # 处理工具返回的错误信息
+                if "错误" in result[:10]:
+                    sp.fail(result)
+                    return f"新闻处理失败：{result}"
+
+                logger.info(f"===== 总结完成 =====")
+                return result
+
+            except Exception as e:
+                error_msg = f"新闻总结异常：{str(e)}"
+                sp.fail(e)
+                logger.error(error_msg)
+                return error_msg
+
+    # ======================== 流式输出：总结文本边生成边返回 ========================
+    def stream_content(self, news_content: str) -> Iterator[str]:
+        """
+        summarize_content 的流式版本：逐段产出 LLM 生成的总结文本，拼接结果与 summarize_content 相同。
+        长文的 map 阶段无法流式输出，先完成分块提炼，再流式输出 reduce 阶段的最终总结。
+        """
+        if news_content.startswith("错误"):
+            yield news_content
+            return
+        with span("agent.news_summary.summarize", chars=len(news_content), mode="stream") as sp:
+            if estimate_tokens(news_content) <= self.single_call_tokens:
+                yield from self.summary_chain.stream({"news_content": news_content})
+                return
+            partials = self._map_partials(news_content, sp)
+            yield from self.reduce_chain.stream({"partial_summaries": self._join_partials(partials)})
+
+    async def astream_content(self, news_content: str) -> AsyncIterator[str]:
+        """stream_content 的异步版本"""
+        if news_content.startswith("错误"):
+            yield news_content
+            return
+        with span("agent.news_summary.summarize", chars=len(news_content), mode="stream") as sp:
+            if estimate_tokens(news_content) <= self.single_call_tokens:
+                async for token in self.summary_chain.astream({"news_content": news_content}):
+                    yield token
+                return
+            partials = await self._amap_partials(news_content, sp)
+            async for token in self.reduce_chain.astream({"partial_summaries": self._join_partials(partials)}):
+                yield token
+
+    def stream(self, url: str) -> Iterator[str]:
+        """
+        run 的流式版本：输入单个新闻 URL，原文提取完成后逐段产出总结文本（生成一段返回一段），
+        调用方无需等待整篇总结完成即可开始展示。失败时只产出一条错误信息（与 run 的返回值相同）。
+        用法：for token in agent.stream(url): print(token, end="", flush=True)
+        """
+        if not url:
+            yield "错误：新闻 URL 不能为空"
+            return
+
+        with span("agent.news_summary", url=url, mode="stream") as sp:
+            start = time.perf_counter()
+            try:
+                news_content = extract_news_original_content(url, max_chars=self.max_content_chars)
+                if news_content.startswith("错误"):
+                    sp.fail(news_content)
+                    yield f"新闻处理失败：{news_content}"
+                    return
+
+                first = True
+                for token in self.stream_content(news_content):
+                    if first:
+                        # 首段输出延迟：用户真正感受到的等待时间
+                        sp.set(first_token_ms=round((time.perf_counter() - start) * 1000, 1))
+                        first = False
+                    yield token
+
+            except Exception as e:
+                error_msg = f"新闻总结异常：{str(e)}"
+                sp.fail(e)
+                logger.error(error_msg)
+                yield error_msg
+
+    async def astream(self, url: str, client: Optional[AsyncHttpClient] = None) -> AsyncIterator[str]:
+        """
+        stream 的异步版本：async for token in agent.astream(url): ...
+        :param client: 共享的异步 HTTP 连接池（多个流并发时传入）；不传时为本次调用临时创建一个
+        """
+        if not url:
+            yield "错误：新闻 URL 不能为空"
+            return
+        if client is None:
+            async with new_async_http_client() as own_client:
+                async for token in self.astream(url, own_client):
+                    yield token
+            return
+
+        with span("agent.news_summary", url=url, mode="stream") as sp:
+            start = time.perf_counter()
+            try:
+                news_content = await aextract_news_original_content(url, client, max_chars=self.max_content_chars)
+                if news_content.startswith("错误"):
+                    sp.fail(news_content)
+                    yield f"新闻处理失败：{news_content}"
+                    return
+
+                first = True
+                async for token in self.astream_content(news_content):
+                    if first:
+                        sp.set(first_token_ms=round((time.perf_counter() - start) * 1000, 1))
+                        first = False
+                    yield token
+
+            except Exception as e:
+                error_msg = f"新闻总结异常：{str(e)}"
+                sp.fail(e)
+                logger.error(error_msg)
+                yield error_msg
+
+    async def arun(
+        self,
+        url: str,
+        extract_semaphore: asyncio.Semaphore,
+        llm_semaphore: asyncio.Semaphore,
+        client: AsyncHttpClient,
+    ) -> str:
+        """
+        异步处理单个 URL：提取原文与 LLM 总结分别受各自后端的信号量限制。
+        原文提取走共享的异步 HTTP 连接池，LLM 总结走 ainvoke。
+        """
+        if not url:
+            return "错误：新闻 URL 不能为空"
+
+        with span("agent.news_summary", url=url, mode="async") as sp:
+            try:
+                # 阶段1：提取原文（占用 Jina 后端的并发名额）
+                async with extract_semaphore:
+                    news_content = await aextract_news_original_content(url, client, max_chars=self.max_content_chars)
+
+                # 提取失败时直接返回，不再浪费一次 LLM 调用
+                if news_content.startswith("错误"):
+                    sp.fail(news_content)
+                    return f"新闻处理失败：{news_content}"
+
+                # 阶段2：LLM 总结（每次 LLM 调用各占一个 LLM 后端的并发名额，长文 map 的每块也计入）
+                result = await self.asummarize_content(news_content, llm_semaphore)
+
+                if "错误" in result[:10]:
+                    sp.fail(result)
+                    return f"新闻处理失败：{result}"
+                return result
+
+            except Exception as e:
+                sp.fail(e)
+                return f"新闻总结异常：{str(e)}"
+
+    async def abatch_run(
+        self,
+        url_list: List[str],
+        concurrency: int = 8,
+        extract_concurrency: Optional[int] = None,
+        llm_concurrency: Optional[int] = None,
+        timeout: Optional[float] = None,
+        on_result: Optional[Callable[[int, Dict[str, str]], None]] = None,
+    ) -> List[Dict[str, str]]:
+        """
+        异步批量处理：不同 URL 的"提取"与"总结"阶段相互重叠执行。
+        :param concurrency: 默认的每个后端并发上限
+        :param extract_concurrency: Jina 原文提取的并发上限（默认同 concurrency）
+        :param llm_concurrency: 同时进行的 LLM 调用数上限（默认同 concurrency；长文 map 的每块各算一次调用）
+        :param timeout: 单条 URL 的总超时（秒），超时只影响该条，不阻塞其他 URL
+        :param on_result: 每条 URL 完成时立即回调 on_result(输入下标, 结果)（如写入任务日志）
+        :return: 与输入顺序一致的 [{"url", "summary"}] 列表
+        """
+        if not url_list:
+            logger.warning("警告：输入的 URL 列表为空")
+            return []
+
+        extract_limit = max(1, extract_concurrency or concurrency)
+        llm_limit = max(1, llm_concurrency or concurrency)
+        extract_semaphore = asyncio.Semaphore(extract_limit)
+        llm_semaphore = asyncio.Semaphore(llm_limit)
+        total = len(url_list)
+        logger.info(f"\n===== 开始异步批量处理 {total} 条新闻（提取并发 {extract_limit}，LLM 并发 {llm_limit}）=====")
+
+        # 异步连接池：与同步工具共享限流器，批量并发时同样不会超出供应商速率
+        async with new_async_http_client() as client:
+
+            async def _process(idx: int, url: str) -> Dict[str, str]:
+                try:
+                    summary = await asyncio.wait_for(
+                        self.arun(url, extract_semaphore, llm_semaphore, client),
+                        timeout=timeout,
+                    )
+                except asyncio.TimeoutError:
+                    summary = f"新闻处理失败：处理超时（>{timeout}s）"
+                logger.info(f"【{idx}/{total}】完成 URL：{url}")
+                result = {"url": url, "summary": summary}
+                if on_result is not None:
+                    on_result(idx - 1, result)
+                return result
+
+            # gather 按提交顺序返回结果，保证与输入顺序一致
+            results = await asyncio.gather(
+                *(_process(idx, url) for idx, url in enumerate(url_list, 1))
+            )
+
+        logger.info(f"\n===== 异步批量处理完成 =====")
+        return list(results)
+
+    def batch_run(
+        self,
+        url_list: List[str],
+        concurrency: int = 1,
+        job_id: Optional[str] = None,
+        journal: Optional["JobJournal"] = None,
+        max_attempts: int = 3,
+        **kwargs,
+    ) -> List[Dict[str, str]]:
+        """
+        批量处理：输入 URL 列表，返回包含 URL 和总结的字典列表
+        concurrency > 1 时走异步并发模式（abatch_run），其余参数透传给 abatch_run。
+        注意：并发模式内部使用 asyncio.run，已在事件循环中的调用方请直接 await abatch_run。
+        :param job_id: 指定时以可恢复任务运行：每条完成即写入任务日志，中断后用同一 job_id 重新运行
+                       只处理未完成与失败的 URL（已完成的直接取日志中的结果）
+        :param journal: 任务日志，默认使用进程内共享实例
+        :param max_attempts: 单条 URL 最多尝试次数，超过后不再重试
+        """
+        if job_id:
+            return self._journaled_batch_run(url_list, concurrency, job_id, journal, max_attempts, **kwargs)
+        if concurrency and concurrency > 1:
+            return asyncio.run(self.abatch_run(url_list, concurrency=concurrency, **kwargs))
 
-    def batch_run(self, url_list: List[str]) -> List[Dict[str, str]]:
-        """批量处理：输入 URL 列表，返回包含 URL 和总结的字典列表"""
         if not url_list:
-            print("警告：输入的 URL 列表为空")
+            logger.warning("警告：输入的 URL 列表为空")
             return []
         
         results = []
-        print(f"\n===== 开始批量处理 {len(url_list)} 条新闻 =====")
+        logger.info(f"\n===== 开始批量处理 {len(url_list)} 条新闻 =====")
         for idx, url in enumerate(url_list, 1):
-            print(f"\n【{idx}/{len(url_list)}】处理 URL：{url}")
+            logger.info(f"\n【{idx}/{len(url_list)}】处理 URL：{url}")
             summary = self.run(url)
             results.append({
                 "url": url,
                 "summary": summary
             })
         
-        print(f"\n===== 批量处理完成 =====")
-        return results
\ No newline at end of file
+        logger.info(f"\n===== 批量处理完成 =====")
+        return results
+
+    def _journaled_batch_run(
+        self,
+        url_list: List[str],
+        concurrency: int,
+        job_id: str,
+        journal: Optional["JobJournal"],
+        max_attempts: int,
+        **kwargs,
+    ) -> List[Dict[str, str]]:
+        from utils.job_journal import get_job_journal, item_key
+
+        if not url_list:
+            logger.warning("警告：输入的 URL 列表为空")
+            return []
+        job = (journal or get_job_journal()).open_job(
+            job_id, "news_summary", [item_key(normalize_url(u)) for u in url_list], max_attempts
+        )
+        pending = [url_list[idx] for idx in job.todo]
+
+        def _record(pos: int, result: Dict[str, str]) -> None:
+            failed = result["summary"].startswith(("错误", "新闻处理失败", "新闻总结异常"))
+            job.record(job.todo[pos], result, result["summary"] if failed else None)
+
+        if pending and concurrency and concurrency > 1:
+            asyncio.run(self.abatch_run(pending, concurrency=concurrency, on_result=_record, **kwargs))
+        else:
+            for pos, url in enumerate(pending):
+                logger.info(f"\n【{pos + 1}/{len(pending)}】处理 URL：{url}")
+                _record(pos, {"url": url, "summary": self.run(url)})
+        job.finish()
+        return job.results
+
+    def summarize_clusters(
+        self,
+        news_list: List[Dict],
+        deduplicator: Optional["NewsDeduplicator"] = None,
+        max_concurrency: int = 4,
+    ) -> List[Dict]:
+        """
+        去重后批量总结：输入 search_news 返回的新闻元数据列表（需含 url、title）。
+        1. 标题/描述近重复聚类（提取前）；
+        2. 仅对每簇代表提取原文，再按正文近重复聚类（提取后）；
+        3. 每簇只总结一篇代表，其余 URL 作为 sources 附在结果中。
+        同一 URL 或正文命中历史批次簇（去重窗口内）的文章不再总结，但仍会出现在结果中：summary 为 None，
+        duplicate_of 指向历史簇代表的（规范化）URL，调用方可据此复用之前的总结；仅标题与历史批次相似的文章
+        仍会提取正文，由正文去重确认。提取失败的簇会从索引中移除，下次运行可重试。
+        :return: [{"url": 代表 URL, "summary": 总结, "sources": [簇内全部 URL], "duplicate_of": None 或历史代表 URL}]
+        """
+        if not news_list:
+            logger.warning("警告：输入的新闻列表为空")
+            return []
+
+        from utils.dedup import NewsDeduplicator  # 依赖 numpy，仅去重模式需要时再加载
+
+        dedup = deduplicator or NewsDeduplicator()
+        title_clusters, title_seen = dedup.cluster_by_title(news_list)
+        members = {items[0]["url"]: [item["url"] for item in items] for items in title_clusters.values()}
+        recheck = sum(1 for cid, items in title_clusters.items() if cid != normalize_url(items[0]["url"]))
+        logger.info(f"\n===== 标题去重：{len(news_list)} 条 → {len(members)} 簇（{len(title_seen)} 条已处理过，"
+                    f"{recheck} 簇标题与历史批次相似、待正文确认）=====")
+
+        # 仅提取每个标题簇代表的原文
+        rep_urls = list(members)
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            contents = list(executor.map(
+                lambda u: extract_news_original_content(u, max_chars=self.max_content_chars), rep_urls
+            ))
+
+        results = [{"url": url, "summary": None, "sources": [url], "duplicate_of": prior}
+                   for url, prior in title_seen.items()]
+        bodies = {}
+        for url, content in zip(rep_urls, contents):
+            if content.startswith("错误"):
+                dedup.title_index.remove([normalize_url(u) for u in members[url]])
+                results.append({"url": url, "summary": f"新闻处理失败：{content}", "sources": members[url],
+                                "duplicate_of": None})
+            else:
+                bodies[url] = content
+
+        body_clusters, body_seen = dedup.cluster_by_body(bodies)
+        logger.info(f"===== 正文去重：{len(bodies)} 篇 → {len(body_clusters)} 簇（{len(body_seen)} 篇命中历史批次）=====")
+        results.extend({"url": url, "summary": None, "sources": members[url], "duplicate_of": prior}
+                       for url, prior in body_seen.items())
+
+        reps = list(body_clusters)
+        outputs = self.summarize_step.batch(
+            [{"news_content": bodies[url]} for url in reps],
+            config={"max_concurrency": max_concurrency},
+            return_exceptions=True,
+        )
+        for url, output in zip(reps, outputs):
+            sources = [u for rep in body_clusters[url] for u in members[rep]]
+            if isinstance(output, Exception):
+                # 总结失败：移出两个索引，下次运行时整簇重新处理
+                dedup.title_index.remove([normalize_url(u) for u in sources])
+                dedup.body_index.remove([normalize_url(rep) for rep in body_clusters[url]])
+                output = f"新闻总结异常：{str(output)}"
+            results.append({"url": url, "summary": output, "sources": sources, "duplicate_of": None})
+
+        merged = sum(len(members[rep]) for url in reps for rep in body_clusters[url]) - len(reps)
+        prior = len(title_seen) + sum(len(members[url]) for url in body_seen)
+        logger.info(f"\n===== 去重批量处理完成：总结 {len(reps)} 篇，本批簇内合并节省 {merged} 次总结调用，"
+                    f"{prior} 条命中历史批次（结果带 duplicate_of）=====")
+        return results
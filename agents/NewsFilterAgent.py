@@ -1,25 +1,60 @@
 import os
+import re
 import json
-from typing import List, Dict
+from typing import List, Dict, Optional, Iterable, Tuple
+from urllib.parse import urlsplit
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
 from utils.llm_utils import get_qwen_llm
+from utils.telemetry import get_logger, span
+from utils.text_utils import estimate_tokens
 # 加载环境变量
 load_dotenv()
+logger = get_logger(__name__)
+
+# ======================== 规则预筛配置 ========================
+# 新闻通稿/公关稿分发平台：内容均为企业自发的 Press Release
+PRESS_RELEASE_DOMAINS = (
+    "prnewswire.com", "businesswire.com", "globenewswire.com", "accesswire.com",
+    "newswire.com", "einpresswire.com", "prweb.com", "openpr.com",
+)
+# URL 路径命中即判定为非新闻（广告、赞助、教程、公关稿、优惠券等）
+# 注意 /deals/、/guides/ 不在默认列表中：财经媒体的并购报道（如 reuters.com/markets/deals/）
+# 和政策解读栏目也用这些路径，交给 LLM 判断；只针对导购站点时可通过 deny_url_patterns 自行加入
+NON_NEWS_URL_PATTERNS = (
+    r"/sponsored/", r"/sponsor/", r"/partner-content/", r"/paid-post", r"/advertorial",
+    r"/how-to/", r"/howto/", r"/tutorials?/",
+    r"/press-releases?/", r"/pr-newswire/", r"/coupons?/", r"/shopping/",
+)
 class NewsFilterAgent:
     """
     一个由 LLM 驱动的新闻过滤 Agent。
     它接收一个新闻元数据列表，并返回一个经过 LLM 判断为“真实新闻”的列表。
     """
     
-    def __init__(self):
+    def __init__(
+        self,
+        allow_domains: Iterable[str] = (),
+        deny_domains: Iterable[str] = PRESS_RELEASE_DOMAINS,
+        deny_url_patterns: Iterable[str] = NON_NEWS_URL_PATTERNS,
+        max_chunk_tokens: int = 3000,
+        max_concurrency: int = 4,
+    ):
         """
         初始化 Agent。
-        :param model_name: 要使用的 OpenAI 模型名称。
+        :param allow_domains: 白名单域名（含子域名），命中直接判定为新闻，不调用 LLM。
+        :param deny_domains: 黑名单域名（含子域名），命中直接过滤。
+        :param deny_url_patterns: URL 路径正则，命中直接过滤。
+        :param max_chunk_tokens: 分块模式下每次 LLM 调用的元数据 token 上限。
+        :param max_concurrency: 分块模式下并发评估的块数。
         """
-        self.llm = get_qwen_llm()
+        self.llm = get_qwen_llm(cache_namespace="news_filter")
+        self.allow_domains = tuple(d.lower() for d in allow_domains)
+        self.deny_domains = tuple(d.lower() for d in deny_domains)
+        self.deny_url_re = re.compile("|".join(deny_url_patterns), re.IGNORECASE) if deny_url_patterns else None
+        self.max_chunk_tokens = max_chunk_tokens
+        self.max_concurrency = max_concurrency
         
         # 1. 定义 Prompt
         # 清晰地告诉 LLM 任务、判断标准和期望的输出格式。
@@ -59,27 +94,119 @@ class NewsFilterAgent:
         :return: 经过 LLM 过滤后的新闻元数据列表。
         """
         if not raw_news_metadata_list:
-            print("警告：输入的新闻元数据列表为空。")
+            logger.warning("警告：输入的新闻元数据列表为空。")
             return []
 
-        print(f"LLM 过滤 Agent 开始处理 {len(raw_news_metadata_list)} 条新闻...")
+        logger.info(f"LLM 过滤 Agent 开始处理 {len(raw_news_metadata_list)} 条新闻...")
         
         # 将原始数据转换为 JSON 字符串，作为 Prompt 的输入
         news_metadata_json = json.dumps(raw_news_metadata_list, indent=2, ensure_ascii=False)
         
-        try:
-            # 执行链
-            # LLM 将返回一个包含符合条件的新闻条目的索引列表，例如 [0, 2, 3]
-            relevant_indices = self.chain.invoke({"news_metadata_json": news_metadata_json})
-            
-            print(f"LLM 判断出 {len(relevant_indices)} 条有效新闻。")
+        with span("agent.news_filter", items=len(raw_news_metadata_list)) as sp:
+            try:
+                # 执行链
+                # LLM 将返回一个包含符合条件的新闻条目的索引列表，例如 [0, 2, 3]
+                relevant_indices = self.chain.invoke({"news_metadata_json": news_metadata_json})
+
+                logger.info(f"LLM 判断出 {len(relevant_indices)} 条有效新闻。")
+
+                # 根据索引从原始列表中筛选出有效新闻
+                cleaned_news_list = [raw_news_metadata_list[i] for i in relevant_indices]
+                sp.set(kept=len(cleaned_news_list))
+                return cleaned_news_list
+
+            except Exception as e:
+                sp.fail(e)
+                logger.error(f"错误：在调用 LLM 进行过滤时发生异常: {e}")
+                # 在发生错误时，可以选择返回原始列表或空列表，这里选择返回原始列表作为降级策略
+                return raw_news_metadata_list
+
+    # ======================== 分块模式：规则预筛 + 分块 + 并发评估 ========================
+    @staticmethod
+    def _domain_matches(host: str, domains: Tuple[str, ...]) -> bool:
+        return any(host == d or host.endswith("." + d) for d in domains)
+
+    def _prescreen(self, item: Dict) -> Optional[bool]:
+        """规则预筛：True=确定是新闻，False=确定不是新闻，None=交给 LLM 判断"""
+        url = item.get("url") or ""
+        parts = urlsplit(url)
+        host = (parts.hostname or "").lower()
+        if host.startswith("www."):
+            host = host[4:]
+        if host and self._domain_matches(host, self.deny_domains):
+            return False
+        if self.deny_url_re and self.deny_url_re.search(parts.path or ""):
+            return False
+        if host and self._domain_matches(host, self.allow_domains):
+            return True
+        return None
+
+    def _build_chunks(self, candidates: List[Tuple[int, Dict]]) -> List[List[Tuple[int, Dict]]]:
+        """按 token 预算把待判断条目切块；每块内使用从 0 开始的局部索引"""
+        chunks, current, current_tokens = [], [], 0
+        for original_idx, item in candidates:
+            item_tokens = estimate_tokens(json.dumps(item, ensure_ascii=False))
+            if current and current_tokens + item_tokens > self.max_chunk_tokens:
+                chunks.append(current)
+                current, current_tokens = [], 0
+            current.append((original_idx, item))
+            current_tokens += item_tokens
+        if current:
+            chunks.append(current)
+        return chunks
+
+    @staticmethod
+    def _chunk_payload(chunk: List[Tuple[int, Dict]]) -> str:
+        # 紧凑 JSON（无缩进）节省上下文；index 字段改写为块内局部索引
+        payload = [{**item, "index": local_idx} for local_idx, (_, item) in enumerate(chunk)]
+        return json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+
+    def run_chunked(self, raw_news_metadata_list: List[Dict]) -> List[Dict]:
+        """
+        可扩展的过滤模式（适合数百条以上的元数据列表）：
+        1. 域名白/黑名单与 URL 路径规则先行判定，明显的条目不进入 LLM；
+        2. 剩余条目按 token 预算切块，块内索引映射回原始列表；
+        3. 各块并发调用 LLM，单块失败只对该块降级（保留该块全部条目）。
+        返回结果保持原始顺序。
+        """
+        if not raw_news_metadata_list:
+            logger.warning("警告：输入的新闻元数据列表为空。")
+            return []
+
+        keep = [False] * len(raw_news_metadata_list)
+        candidates = []
+        for idx, item in enumerate(raw_news_metadata_list):
+            verdict = self._prescreen(item)
+            if verdict is None:
+                candidates.append((idx, item))
+            else:
+                keep[idx] = verdict
+
+        chunks = self._build_chunks(candidates)
+        logger.info(f"规则预筛：{len(raw_news_metadata_list) - len(candidates)} 条已判定，"
+                    f"{len(candidates)} 条交给 LLM（共 {len(chunks)} 块）")
 
-            # 根据索引从原始列表中筛选出有效新闻
-            cleaned_news_list = [raw_news_metadata_list[i] for i in relevant_indices]
-            
-            return cleaned_news_list
+        with span("agent.news_filter", items=len(raw_news_metadata_list), llm_items=len(candidates),
+                  chunks=len(chunks)) as sp:
+            failed_chunks = 0
+            if chunks:
+                outputs = self.chain.batch(
+                    [{"news_metadata_json": self._chunk_payload(chunk)} for chunk in chunks],
+                    config={"max_concurrency": self.max_concurrency},
+                    return_exceptions=True,
+                )
+                for chunk_no, (chunk, output) in enumerate(zip(chunks, outputs), 1):
+                    if isinstance(output, Exception) or not isinstance(output, list):
+                        failed_chunks += 1
+                        logger.warning(f"错误：第 {chunk_no} 块过滤失败，保留该块全部 {len(chunk)} 条：{output}")
+                        for original_idx, _ in chunk:
+                            keep[original_idx] = True
+                        continue
+                    for local_idx in output:
+                        if isinstance(local_idx, int) and 0 <= local_idx < len(chunk):
+                            keep[chunk[local_idx][0]] = True
 
-        except Exception as e:
-            print(f"错误：在调用 LLM 进行过滤时发生异常: {e}")
-            # 在发生错误时，可以选择返回原始列表或空列表，这里选择返回原始列表作为降级策略
-            return raw_news_metadata_list
\ No newline at end of file
+            cleaned_news_list = [item for item, flag in zip(raw_news_metadata_list, keep) if flag]
+            sp.set(kept=len(cleaned_news_list), failed_chunks=failed_chunks)
+        logger.info(f"分块过滤完成：保留 {len(cleaned_news_list)}/{len(raw_news_metadata_list)} 条。")
+        return cleaned_news_list
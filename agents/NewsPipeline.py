@@ -0,0 +1,360 @@
+import operator
+import queue
+import threading
+import time
+from typing import Annotated, Any, Callable, Dict, Iterator, List, Optional, TypedDict, TYPE_CHECKING
+from langchain_core.runnables import RunnableConfig
+from agents.EntityQueryAgent import EntityQueryAgent
+from agents.NewsCrawlAgent import NewsSummaryagent
+from agents.NewsFilterAgent import NewsFilterAgent
+from tools.NewsTool import iter_news, extract_news_original_content
+from utils.entity_store import canonicalize_entity_name
+from utils.telemetry import get_logger, propagate, span
+if TYPE_CHECKING:
+    from agents.KGAgent import LLMEndToEndJsonToPngAgent
+
+logger = get_logger(__name__)
+
+# 输出回调：每篇新闻 / 每张知识图谱卡片完成时调用一次（在工作线程中调用，已加锁串行）
+PipelineSink = Callable[[Dict[str, Any]], None]
+
+# 各节点默认并发上限：extract 对应 Jina，summarize / entities 对应 LLM（+ SerpAPI），kg 对应浏览器池
+DEFAULT_NODE_CONCURRENCY: Dict[str, int] = {"extract": 8, "summarize": 4, "entities": 4, "kg": 2}
+
+
+# ======================== 1. 图状态 ========================
+class PipelineState(TypedDict, total=False):
+    """主图状态：搜索 → 过滤 → 每篇新闻分发到文章子图"""
+    query: str
+    search: Dict[str, Any]              # 透传给 iter_news 的搜索参数
+    articles: List[Dict]                # 搜索结果元数据
+    kept: List[Dict]                    # 过滤后保留的新闻元数据
+    results: Annotated[List[Dict], operator.add]
+
+
+class ArticleState(TypedDict, total=False):
+    """文章子图状态：提取原文 → (总结 ∥ 实体卡片) → 输出"""
+    article: Dict
+    content: str
+    summary: str
+    entities: List[str]
+    cards: Dict[str, str]
+    errors: Annotated[List[str], operator.add]  # 两个并行分支都可能写入
+    results: Annotated[List[Dict], operator.add]
+
+
+class _PipelineRun:
+    """单次运行的上下文（经 config["configurable"] 传给各节点）：输出回调、KG 队列与收集的结果"""
+
+    def __init__(self, sink: Optional[PipelineSink]):
+        self.sink = sink
+        self.start = time.perf_counter()
+        self.kg_queue: "queue.Queue[Optional[str]]" = queue.Queue()
+        self.articles: List[Dict] = []
+        self.kg_cards: List[Dict] = []
+        self._lock = threading.Lock()
+
+    def elapsed_ms(self) -> float:
+        return round((time.perf_counter() - self.start) * 1000, 1)
+
+    def emit(self, event: Dict[str, Any]) -> None:
+        event["elapsed_ms"] = self.elapsed_ms()
+        with self._lock:
+            (self.articles if event["type"] == "article" else self.kg_cards).append(event)
+            if self.sink is None:
+                return
+            try:
+                self.sink(event)
+            except Exception as e:
+                # 下游展示出错不影响流水线本身
+                logger.warning(f"⚠️ 输出回调异常：{str(e)[:100]}")
+
+
+# ======================== 2. 流水线 ========================
+class NewsPipeline:
+    """
+    端到端新闻流水线（LangGraph 编排）：
+    search_news → NewsFilterAgent → 每篇新闻一个子图：提取原文 → (NewsSummaryagent 总结 ∥ EntityQueryAgent 实体卡片)
+    → 整篇完成即输出到 sink；实体提取完成后立即进入 KG 队列，由后台 worker 攒批调用 LLMEndToEndJsonToPngAgent 渲染。
+    各篇新闻的子图互不等待，单篇关键路径 = 提取 + max(总结, 实体)，而不是所有阶段之和；KG 渲染不在文章关键路径上。
+    每个节点的并发由各自的信号量限制（对应不同后端的速率上限）。
+    """
+
+    def __init__(
+        self,
+        filter_agent: Optional[NewsFilterAgent] = None,
+        summary_agent: Optional[NewsSummaryagent] = None,
+        entity_agent: Optional[EntityQueryAgent] = None,
+        card_agent: Optional["LLMEndToEndJsonToPngAgent"] = None,
+        node_concurrency: Optional[Dict[str, int]] = None,
+        max_in_flight: int = 16,
+        render_kg: bool = True,
+        kg_batch_size: int = 4,
+        kg_output_dir: str = "serp_png_results",
+    ):
+        """
+        :param filter_agent / summary_agent / entity_agent / card_agent: 可注入已构建的 Agent（共享 LLM 实例）；
+               card_agent 默认在第一次渲染时才创建（启动浏览器池）
+        :param node_concurrency: 各节点并发上限，覆盖 DEFAULT_NODE_CONCURRENCY 中的同名项（extract / summarize / entities / kg）
+        :param max_in_flight: 同时处理中的文章子图数
+        :param render_kg: 是否渲染知识图谱 PNG（关闭时不启动 KG worker）
+        :param kg_batch_size: KG worker 每次攒批渲染的实体数上限（批内由浏览器池并行截图）
+        :param kg_output_dir: 知识图谱 PNG 输出目录
+        """
+        self.filter_agent = filter_agent or NewsFilterAgent()
+        self.summary_agent = summary_agent or NewsSummaryagent()
+        self.entity_agent = entity_agent or EntityQueryAgent()
+        self.card_agent = card_agent
+        self.node_concurrency = {**DEFAULT_NODE_CONCURRENCY, **(node_concurrency or {})}
+        self._limits = {name: threading.BoundedSemaphore(max(1, n)) for name, n in self.node_concurrency.items()}
+        self.max_in_flight = max_in_flight
+        self.render_kg = render_kg
+        self.kg_batch_size = max(1, kg_batch_size)
+        self.kg_output_dir = kg_output_dir
+        self._graph = None
+        self._graph_lock = threading.Lock()
+
+    # ---------- 图结构（首次运行时编译，langgraph 在此处才导入） ----------
+    @property
+    def graph(self):
+        if self._graph is None:
+            with self._graph_lock:
+                if self._graph is None:
+                    self._graph = self._build_graph()
+        return self._graph
+
+    def _build_graph(self):
+        from langgraph.graph import StateGraph, START, END
+
+        article = StateGraph(ArticleState)
+        article.add_node("extract", self._extract)
+        article.add_node("summarize", self._summarize)
+        article.add_node("entities", self._entities)
+        article.add_node("emit", self._emit_article)
+        article.add_edge(START, "extract")
+        # 总结与实体两个分支并行，emit 等两者都完成
+        article.add_edge("extract", "summarize")
+        article.add_edge("extract", "entities")
+        article.add_edge(["summarize", "entities"], "emit")
+        article.add_edge("emit", END)
+
+        pipeline = StateGraph(PipelineState)
+        pipeline.add_node("crawl", self._crawl)
+        pipeline.add_node("filter", self._filter)
+        pipeline.add_node("article", article.compile())
+        pipeline.add_edge(START, "crawl")
+        pipeline.add_edge("crawl", "filter")
+        pipeline.add_conditional_edges("filter", self._fan_out, ["article", END])
+        pipeline.add_edge("article", END)
+        return pipeline.compile()
+
+    @staticmethod
+    def _run_context(config: RunnableConfig) -> _PipelineRun:
+        return config["configurable"]["pipeline_run"]
+
+    # ---------- 主图节点 ----------
+    def _crawl(self, state: PipelineState) -> Dict:
+        articles = [
+            {"index": i, "title": a.title, "source": a.source, "published_at": a.published_at, "url": a.url}
+            for i, a in enumerate(iter_news(state["query"], **state.get("search", {})))
+        ]
+        logger.info(f"🔎 搜索到 {len(articles)} 条新闻")
+        return {"articles": articles}
+
+    def _filter(self, state: PipelineState) -> Dict:
+        kept = self.filter_agent.run_chunked(state["articles"]) if state["articles"] else []
+        return {"kept": kept}
+
+    def _fan_out(self, state: PipelineState):
+        from langgraph.graph import END
+        from langgraph.types import Send
+
+        # 每篇新闻一个独立子图任务，互不等待
+        return [Send("article", {"article": item}) for item in state["kept"]] or END
+
+    # ---------- 文章子图节点 ----------
+    def _extract(self, state: ArticleState) -> Dict:
+        with self._limits["extract"]:
+            content = extract_news_original_content(
+                state["article"]["url"], max_chars=self.summary_agent.max_content_chars
+            )
+        if content.startswith("错误"):
+            return {"content": "", "errors": [f"新闻处理失败：{content}"]}
+        return {"content": content}
+
+    def _summarize(self, state: ArticleState) -> Dict:
+        if not state.get("content"):
+            return {}
+        try:
+            with self._limits["summarize"]:
+                return {"summary": self.summary_agent.summarize_content(state["content"])}
+        except Exception as e:
+            return {"errors": [f"新闻总结异常：{str(e)}"]}
+
+    def _entities(self, state: ArticleState, config: RunnableConfig) -> Dict:
+        if not state.get("content"):
+            return {}
+        run = self._run_context(config)
+        try:
+            with self._limits["entities"]:
+                entities = self.entity_agent.extract_entities(state["content"])
+                cards = self.entity_agent.lookup_entities(entities)
+            # 卡片查询完成后再交给 KG worker：实体库已写入，worker 取图谱 JSON 直接命中，不再重复请求 SerpAPI
+            if self.render_kg:
+                for name in entities:
+                    run.kg_queue.put(name)
+        except Exception as e:
+            return {"errors": [f"EntityQuery Agent 处理异常：{str(e)}"]}
+        return {
+            "entities": entities,
+            "cards": {name: cards[canonicalize_entity_name(name)] for name in entities
+                      if canonicalize_entity_name(name) in cards},
+        }
+
+    def _emit_article(self, state: ArticleState, config: RunnableConfig) -> Dict:
+        article = state["article"]
+        result = {
+            "type": "article",
+            "url": article["url"],
+            "title": article.get("title"),
+            "source": article.get("source"),
+            "published_at": article.get("published_at"),
+            "summary": state.get("summary"),
+            "entities": state.get("entities", []),
+            "knowledge_cards": state.get("cards", {}),
+            "errors": state.get("errors", []),
+        }
+        self._run_context(config).emit(result)
+        return {"results": [result]}
+
+    # ---------- KG worker：独立于图运行，由队列驱动 ----------
+    def _kg_worker(self, run: _PipelineRun) -> None:
+        """从队列取实体名（跨文章去重）；热门实体直接复用预生成卡片，其余攒批渲染。收到 None 时处理完剩余实体后退出"""
+        from agents.HotEntityJob import lookup_hot_card
+        from tools.NewsTool import get_serp_json
+
+        seen = set()
+        finished = False
+        while not finished:
+            names = [run.kg_queue.get()]
+            while len(names) < self.kg_batch_size:
+                try:
+                    names.append(run.kg_queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            batch = []
+            for name in names:
+                if name is None:
+                    finished = True
+                    continue
+                key = canonicalize_entity_name(name)
+                if not key or key in seen:
+                    continue
+                seen.add(key)
+                png = lookup_hot_card(name)
+                if png:
+                    run.emit({"type": "kg_card", "entity": name, "png": png, "source": "hot", "error": None})
+                    continue
+                try:
+                    knowledge_graph = get_serp_json(name)
+                except Exception as e:
+                    run.emit({"type": "kg_card", "entity": name, "png": None, "source": None, "error": str(e)[:200]})
+                    continue
+                if not knowledge_graph:
+                    run.emit({"type": "kg_card", "entity": name, "png": None, "source": None,
+                              "error": "未找到知识图谱数据"})
+                    continue
+                batch.append((name, {"knowledge_graph": knowledge_graph}))
+
+            if batch:
+                self._render_batch(run, batch)
+
+    def _render_batch(self, run: _PipelineRun, batch: List) -> None:
+        try:
+            with self._limits["kg"]:
+                if self.card_agent is None:
+                    from agents.KGAgent import LLMEndToEndJsonToPngAgent
+                    self.card_agent = LLMEndToEndJsonToPngAgent(browser_pool_size=self.node_concurrency["kg"])
+                pngs = self.card_agent.render_all([serp for _, serp in batch], output_dir=self.kg_output_dir)
+        except Exception as e:
+            logger.error(f"❌ 知识图谱渲染失败：{str(e)[:100]}")
+            pngs = [None] * len(batch)
+        for (name, _), png in zip(batch, pngs):
+            run.emit({"type": "kg_card", "entity": name, "png": png, "source": "rendered" if png else None,
+                      "error": None if png else "渲染失败"})
+
+    # ---------- 入口 ----------
+    def run(
+        self,
+        query: str,
+        from_date: str = "",
+        max_results: Optional[int] = 20,
+        sink: Optional[PipelineSink] = None,
+        **search_kwargs,
+    ) -> Dict:
+        """
+        执行一次端到端处理。
+        :param query: 新闻查询词
+        :param from_date / max_results: 透传给 iter_news（其余搜索参数经 search_kwargs 透传）
+        :param sink: 输出回调，每篇新闻（type="article"）与每张知识图谱卡片（type="kg_card"）完成时各调用一次
+        :return: 统计与全部结果：{"query", "fetched", "kept", "failed", "kg_rendered", "elapsed_ms", "articles", "kg_cards"}
+        """
+        run = _PipelineRun(sink)
+        search = {"from_date": from_date, "max_results": max_results, "sort_by": "publishedAt", **search_kwargs}
+        with span("agent.news_pipeline", query=query) as sp:
+            worker = None
+            if self.render_kg:
+                worker = threading.Thread(target=propagate(self._kg_worker), args=(run,), daemon=True)
+                worker.start()
+            try:
+                state = self.graph.invoke(
+                    {"query": query, "search": search},
+                    config={"configurable": {"pipeline_run": run}, "max_concurrency": self.max_in_flight},
+                )
+            finally:
+                if worker is not None:
+                    run.kg_queue.put(None)
+                    worker.join()
+
+            stats = {
+                "query": query,
+                "fetched": len(state.get("articles", [])),
+                "kept": len(state.get("kept", [])),
+                "failed": sum(1 for a in run.articles if a["errors"]),
+                "kg_rendered": sum(1 for c in run.kg_cards if c["png"]),
+                "elapsed_ms": run.elapsed_ms(),
+            }
+            sp.set(**{k: stats[k] for k in ("fetched", "kept", "failed", "kg_rendered")})
+        logger.info(f"✅ 流水线完成：{stats}")
+        return {**stats, "articles": run.articles, "kg_cards": run.kg_cards}
+
+    def stream(self, query: str, **kwargs) -> Iterator[Dict[str, Any]]:
+        """
+        run 的流式版本：每篇新闻 / 每张知识图谱卡片完成即产出一个事件（与 sink 收到的相同），
+        最后产出 {"type": "done", ...统计}。参数同 run（sink 除外）。
+        """
+        events: "queue.Queue" = queue.Queue()
+        done = object()
+        outcome: Dict[str, Any] = {}
+
+        def _worker():
+            try:
+                outcome["stats"] = self.run(query, sink=events.put, **kwargs)
+            except Exception as e:
+                outcome["error"] = e
+            finally:
+                events.put(done)
+
+        thread = threading.Thread(target=propagate(_worker), daemon=True)
+        thread.start()
+        while True:
+            event = events.get()
+            if event is done:
+                break
+            yield event
+        thread.join()
+        if "error" in outcome:
+            raise outcome["error"]
+        stats = outcome["stats"]
+        yield {"type": "done", **{k: v for k, v in stats.items() if k not in ("articles", "kg_cards")}}
@@ -0,0 +1,88 @@
+from typing import List, Optional, Sequence
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.output_parsers import StrOutputParser
+from utils.llm_utils import get_qwen_llm
+from utils.model import NewsArticle
+from utils.retrieval import HybridRetriever, RetrievedChunk, EmbedFn
+from utils.telemetry import get_logger, span
+
+logger = get_logger(__name__)
+
+
+class NewsQAAgent:
+    """
+    输入：用户问题 → 输出：基于已入库新闻的回答（附参考来源）
+    流程：问题 → 本地混合检索（BM25 + 向量，RRF 融合）→ 拼接上下文 → LLM 作答
+    """
+
+    def __init__(
+        self,
+        retriever: Optional[HybridRetriever] = None,
+        embed_fn: Optional[EmbedFn] = None,
+        top_k: int = 5,
+        candidates: int = 50,
+    ):
+        """
+        :param retriever: 外部构建好的检索引擎（多个 Agent 共享同一索引时传入）
+        :param embed_fn: 嵌入函数（文本列表 → 向量矩阵），默认使用本地确定性哈希嵌入
+        :param top_k: 送入 LLM 的上下文块数
+        :param candidates: BM25 / 向量两路各自召回的候选数
+        """
+        self.llm = get_qwen_llm(cache_namespace="news_qa")
+        self.retriever = retriever or HybridRetriever(embed_fn=embed_fn)
+        self.top_k = top_k
+        self.candidates = candidates
+
+        self.qa_prompt = ChatPromptTemplate.from_messages([
+            (
+                "system",
+                """
+                你是专业新闻问答助手，只能依据下面编号的新闻片段回答用户问题：
+                1. 回答简洁准确，关键事实后用 [编号] 标注出处；
+                2. 片段之间有冲突时，以发布时间较新的为准并说明；
+                3. 片段中没有相关信息时，直接回答"根据已有新闻无法回答该问题"，不编造任何内容。
+                """,
+            ),
+            ("human", "新闻片段：\n{context}\n\n问题：{question}"),
+        ])
+        self.chain = self.qa_prompt | self.llm | StrOutputParser()
+
+    def add_articles(self, articles: Sequence[NewsArticle]) -> int:
+        """新闻入库（按 URL 去重），返回新增文本块数"""
+        added = self.retriever.add_articles(articles)
+        logger.info(f"📚 新闻入库：新增 {added} 个文本块，当前共 {len(self.retriever)} 块")
+        return added
+
+    def retrieve(self, question: str) -> List[RetrievedChunk]:
+        return self.retriever.search(question, top_k=self.top_k, candidates=self.candidates)
+
+    @staticmethod
+    def _format_context(hits: List[RetrievedChunk]) -> str:
+        blocks = []
+        for i, hit in enumerate(hits, 1):
+            header = f"[{i}] {hit.title or ''}（{hit.published_at or '时间未知'}）"
+            blocks.append(f"{header}\n{hit.text}")
+        return "\n\n".join(blocks)
+
+    def run(self, question: str) -> str:
+        """核心方法：输入问题，返回回答及参考来源"""
+        if not question or not question.strip():
+            return "错误：问题不能为空"
+        with span("agent.news_qa") as sp:
+            with span("retrieval.hybrid", top_k=self.top_k) as retrieval_sp:
+                hits = self.retrieve(question)
+                retrieval_sp.set(hits=len(hits))
+            if not hits:
+                sp.fail("no hits")
+                return "错误：知识库中没有检索到相关新闻"
+
+            try:
+                answer = self.chain.invoke({"context": self._format_context(hits), "question": question})
+            except Exception as e:
+                error_msg = f"新闻问答异常：{str(e)}"
+                sp.fail(e)
+                logger.error(error_msg)
+                return error_msg
+
+        sources = "\n".join(f"[{i}] {hit.title or ''} {hit.url}" for i, hit in enumerate(hits, 1))
+        return f"{answer}\n\n【参考来源】\n{sources}"
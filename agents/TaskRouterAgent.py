@@ -0,0 +1,459 @@
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from utils.retrieval import HashingEmbedding
+from utils.telemetry import count, get_logger, span
+
+logger = get_logger(__name__)
+
+# ======================== 1. 意图定义 ========================
+# 意图 → 处理它的 Agent
+INTENT_SUMMARIZE = "summarize"          # 新闻 URL / 长文 → NewsSummaryagent
+INTENT_ENTITY_CARD = "entity_card"      # "X 是谁 / 什么是 X" → EntityQueryAgent 查询实体卡片
+INTENT_ENTITY_EXTRACT = "entity_extract"  # 一段新闻 + "提取实体" → EntityQueryAgent.run
+INTENT_KG_CARD = "kg_card"              # "X 的知识图谱 / 卡片图" → 热门卡片 / LLMEndToEndJsonToPngAgent
+INTENT_NEWS_SEARCH = "news_search"      # 带时间范围的新闻查询 → NewsAPI + NewsFilterAgent
+INTENT_UNKNOWN = "unknown"
+INTENTS = (INTENT_SUMMARIZE, INTENT_ENTITY_CARD, INTENT_ENTITY_EXTRACT, INTENT_KG_CARD, INTENT_NEWS_SEARCH)
+
+# 路由层级（按开销从低到高）
+TIER_RULE = "rule"
+TIER_CLASSIFIER = "classifier"
+TIER_LLM = "llm"
+TIER_FALLBACK = "fallback"  # LLM 不可用或无法判断时，退回分类器的最优结果
+TIERS = (TIER_RULE, TIER_CLASSIFIER, TIER_LLM, TIER_FALLBACK)
+
+# ======================== 2. 规则层：预编译正则 ========================
+URL_RE = re.compile(r"https?://[^\s<>\"'，。；）)]+", re.IGNORECASE)
+_PUNCT = "？?。.!！，,；;：:\"'“”‘’ "
+# 实体问句：X 是谁 / X 是什么 / 什么是 X / 谁是 X / 介绍一下 X / who is X / what is X
+ENTITY_QUESTION_RES = [
+    re.compile(r"^(?:请|帮我)?(?:介绍一下|介绍|查一下|查查|说说)?\s*(?P<name>.{1,40}?)\s*"
+               r"(?:到底)?(?:是谁|是什么人|是什么意思|是什么|是干什么的|是做什么的|是哪家公司)\s*[？?。!！]*$"),
+    re.compile(r"^(?:请问)?(?:谁是|什么是|何为)\s*(?P<name>.{1,40}?)\s*[？?。!！]*$"),
+    re.compile(r"^(?:请|帮我)?(?:介绍一下|简单介绍一下|介绍下)\s*(?P<name>.{1,40}?)\s*[？?。!！]*$"),
+    re.compile(r"^(?:who|what)\s+(?:is|are|was)\s+(?P<name>.{1,60}?)\s*\??$", re.IGNORECASE),
+]
+KG_CARD_RE = re.compile(
+    r"^(?:请|帮我)?(?:生成|画|做|给我|展示|看看)?(?:一张|一个|一下)?\s*(?P<name>.{1,40}?)\s*的?"
+    r"(?:知识图谱|知识卡片|实体卡片|卡片图|图谱)(?:图片|图)?\s*[？?。!！]*$"
+)
+ENTITY_EXTRACT_RE = re.compile(r"(?:提取|抽取|找出|列出|识别).{0,8}(?:实体|人物|公司|机构)")
+# 时间短语：命中即视为新闻查询（结合时间范围调用新闻搜索）；天数 / 周数支持阿拉伯数字与中文数字（“最近三天”）
+_NUMBER = r"(?:\d+|[一二两三四五六七八九十]+)"
+DATE_PHRASE_RE = re.compile(
+    rf"今天|今日|昨天|昨日|前天|本周|这周|这一周|上周|本月|这个月|上个月|最近(?:\s*{_NUMBER}\s*(?:天|日|周))?|"
+    rf"近\s*{_NUMBER}\s*(?:天|日|周)|过去\s*{_NUMBER}\s*(?:天|日|周)|\d{{4}}\s*年\s*\d{{1,2}}\s*月(?:\s*\d{{1,2}}\s*日)?|"
+    r"\d{4}-\d{1,2}-\d{1,2}|\d{1,2}\s*月\s*\d{1,2}\s*日"
+)
+_CN_DIGITS = {"一": 1, "二": 2, "两": 2, "三": 3, "四": 4, "五": 5, "六": 6, "七": 7, "八": 8, "九": 9}
+# 从新闻查询中去掉的虚词，剩余部分作为搜索关键词
+_QUERY_FILLER_RE = re.compile(
+    r"请|帮我|给我|搜索|搜一下|查一下|查询|看看|找一下|关于|有关|有哪些|有什么|相关的?|最新的?|的|一下|"
+    r"新闻|消息|动态|报道|资讯|头条|发生了什么|有什么事|[？?。!！，,]"
+)
+# 实体请求（“给我讲讲马斯克”“把英伟达的信息做成卡片图”）首尾的说法，逐层去掉后剩余部分作为实体名称；
+# 只去首尾，名称中间的同形词（“中国信息通信研究院”）不受影响
+_ENTITY_PREFIX_RE = re.compile(
+    r"^(?:请问|请|帮我|给我|麻烦|讲讲|讲一讲|说说|说一说|简单介绍一下|介绍一下|介绍下|介绍|查一下|查查|查询|搜一下|"
+    r"了解一下|了解|生成|画一张|画|做一张|一张|可视化展示|展示|把|tell me about|show me(?: the)? knowledge graph(?: of)?)\s*",
+    re.IGNORECASE,
+)
+_ENTITY_SUFFIX_RE = re.compile(
+    r"\s*(?:的?(?:背景资料|背景|基本情况|信息|资料|知识图谱|知识卡片|实体关系图|卡片图|图片)|做成|"
+    r"是做什么的|是干什么的|[？?。!！，,])$"
+)
+# 只剩指代词时视为没有给出实体名称
+_ENTITY_PRONOUNS = {"这个人", "这家公司", "这个公司", "这个机构", "这个组织", "这个实体", "他", "她", "它", "this company"}
+LONG_TEXT_CHARS = 200  # 无 URL 的长文本视为粘贴的新闻正文
+
+
+@dataclass
+class RouteDecision:
+    """路由结果：意图、命中的层级、置信度与传给下游 Agent 的参数"""
+    intent: str
+    tier: str
+    confidence: float
+    argument: str = ""
+    params: Dict = field(default_factory=dict)
+
+
+def _strip(text: str) -> str:
+    return text.strip(_PUNCT)
+
+
+def _parse_number(text: str) -> int:
+    """阿拉伯数字或一百以内的中文数字（三、十、十五、二十、两）→ 整数"""
+    if text.isdigit():
+        return int(text)
+    if "十" not in text:
+        return _CN_DIGITS.get(text, 0)
+    tens, _, ones = text.rpartition("十")
+    return (_CN_DIGITS.get(tens, 0) if tens else 1) * 10 + _CN_DIGITS.get(ones, 0)
+
+
+def parse_date_phrase(text: str, now: Optional[datetime] = None) -> Tuple[str, str]:
+    """从文本中解析时间短语，返回 (from_date YYYY-MM-DD, 命中的短语)；没有时间短语返回 ("", "")"""
+    match = DATE_PHRASE_RE.search(text)
+    if not match:
+        return "", ""
+    phrase = match.group(0)
+    today = (now or datetime.now()).replace(hour=0, minute=0, second=0, microsecond=0)
+    compact = re.sub(r"\s+", "", phrase)
+    days = None
+    if compact in ("今天", "今日"):
+        days = 0
+    elif compact in ("昨天", "昨日"):
+        days = 1
+    elif compact == "前天":
+        days = 2
+    elif compact in ("本周", "这周", "这一周"):
+        days = today.weekday()
+    elif compact == "上周":
+        days = today.weekday() + 7
+    elif compact in ("本月", "这个月"):
+        days = today.day - 1
+    elif compact == "上个月":
+        first_of_month = today.replace(day=1)
+        return (first_of_month - timedelta(days=1)).replace(day=1).strftime("%Y-%m-%d"), phrase
+    elif compact == "最近":
+        days = 7
+    elif compact.startswith(("最近", "近", "过去")):
+        number = re.search(rf"({_NUMBER})(天|日|周)", compact)
+        days = _parse_number(number.group(1)) * (7 if number.group(2) == "周" else 1)
+    if days is not None:
+        return (today - timedelta(days=days)).strftime("%Y-%m-%d"), phrase
+
+    numbers = [int(n) for n in re.findall(r"\d+", compact)]
+    try:
+        if "年" in compact or "-" in compact:
+            year, month, day = (numbers + [1])[:3]
+        else:
+            year, (month, day) = today.year, numbers[:2]
+            if datetime(year, month, day) > today:  # 未写年份且日期还没到，指去年
+                year -= 1
+        return datetime(year, month, day).strftime("%Y-%m-%d"), phrase
+    except (ValueError, TypeError):
+        return "", phrase
+
+
+def _news_query(text: str, phrase: str) -> str:
+    """去掉时间短语与虚词后的搜索关键词；全部被去掉时（如“今天有什么新闻”）返回空串，表示取头条"""
+    query = _QUERY_FILLER_RE.sub(" ", text.replace(phrase, " ") if phrase else text)
+    return re.sub(r"\s+", " ", query).strip()
+
+
+def _entity_name(text: str) -> str:
+    """实体参数：逐层去掉首尾的请求说法；没有剩下实体名称（或只剩指代词）时返回空串"""
+    name, previous = _strip(text), None
+    while name != previous:
+        previous = name
+        name = _strip(_ENTITY_SUFFIX_RE.sub("", _ENTITY_PREFIX_RE.sub("", name)))
+    return "" if name.lower() in _ENTITY_PRONOUNS else name
+
+
+def rule_route(text: str) -> Optional[RouteDecision]:
+    """规则层：URL、实体问句、知识图谱请求、时间短语，命中即返回，不做任何模型计算"""
+    urls = URL_RE.findall(text)
+    if urls:
+        return RouteDecision(INTENT_SUMMARIZE, TIER_RULE, 1.0, urls[0], {"urls": list(dict.fromkeys(urls))})
+
+    stripped = _strip(text)
+    if len(stripped) >= LONG_TEXT_CHARS:
+        intent = INTENT_ENTITY_EXTRACT if ENTITY_EXTRACT_RE.search(stripped[:80]) else INTENT_SUMMARIZE
+        return RouteDecision(intent, TIER_RULE, 1.0, stripped)
+
+    match = KG_CARD_RE.match(stripped)
+    if match and _strip(match.group("name")):
+        return RouteDecision(INTENT_KG_CARD, TIER_RULE, 1.0, _entity_name(match.group("name")))
+
+    for pattern in ENTITY_QUESTION_RES:
+        match = pattern.match(stripped)
+        if match and _strip(match.group("name")):
+            return RouteDecision(INTENT_ENTITY_CARD, TIER_RULE, 1.0, _entity_name(match.group("name")))
+
+    from_date, phrase = parse_date_phrase(stripped)
+    if phrase:
+        return RouteDecision(INTENT_NEWS_SEARCH, TIER_RULE, 1.0, _news_query(stripped, phrase),
+                             {"from_date": from_date})
+    return None
+
+
+# ======================== 3. 本地分类层：意图样例向量相似度 ========================
+# 每个意图的典型说法；分类时取与输入最相似的样例（最近邻），完全在本地计算
+INTENT_EXEMPLARS: Dict[str, List[str]] = {
+    INTENT_SUMMARIZE: [
+        "帮我总结这篇新闻", "概括一下这篇文章的要点", "这篇报道讲了什么", "给我新闻摘要",
+        "summarize this article", "总结下面的内容", "提炼核心要点",
+    ],
+    INTENT_ENTITY_CARD: [
+        "给我讲讲这个人", "这家公司是做什么的", "介绍一下这个机构的背景", "这个人的背景资料",
+        "查一下这家公司的信息", "这个组织的基本情况", "tell me about this company",
+    ],
+    INTENT_ENTITY_EXTRACT: [
+        "这段新闻里提到了哪些公司和人物", "提取新闻中的关键实体", "新闻里有哪些重要人物",
+        "列出文中出现的机构", "extract entities from this news",
+    ],
+    INTENT_KG_CARD: [
+        "生成知识图谱图片", "画一张实体关系图", "做一张知识卡片", "可视化展示这个实体",
+        "把这家公司的信息做成卡片图", "show me the knowledge graph",
+    ],
+    INTENT_NEWS_SEARCH: [
+        "有什么最新的新闻", "搜索相关新闻报道", "最近发生了什么大事", "帮我找一下相关的新闻",
+        "查一下这件事的最新进展", "科技行业的最新动态", "latest news about",
+    ],
+}
+
+
+class ExemplarClassifier:
+    """
+    意图样例最近邻分类：样例与输入用同一本地哈希嵌入（中文 bigram + 英文单词），余弦相似度取各意图的最大值。
+    置信度 = 最佳意图的相似度；与第二名的差距不足 margin 时视为不确定。
+    """
+
+    def __init__(self, exemplars: Optional[Dict[str, List[str]]] = None, dim: int = 512):
+        self.embed = HashingEmbedding(dim)
+        exemplars = exemplars or INTENT_EXEMPLARS
+        self.labels = [intent for intent, texts in exemplars.items() for _ in texts]
+        self.intents = list(exemplars)
+        self.matrix = self.embed([text for texts in exemplars.values() for text in texts])
+        self._label_ids = np.array([self.intents.index(label) for label in self.labels])
+
+    def scores(self, text: str) -> Dict[str, float]:
+        sims = self.matrix @ self.embed([text])[0]
+        best = np.full(len(self.intents), -1.0, dtype=np.float32)
+        np.maximum.at(best, self._label_ids, sims)
+        return dict(zip(self.intents, best.tolist()))
+
+    def classify(self, text: str) -> Tuple[str, float, float]:
+        """返回 (最佳意图, 相似度, 与第二名的差距)"""
+        ranked = sorted(self.scores(text).items(), key=lambda x: x[1], reverse=True)
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        return ranked[0][0], ranked[0][1], ranked[0][1] - runner_up
+
+
+# ======================== 4. 路由 Agent ========================
+class TaskRouterAgent:
+    """
+    分层任务路由（所有用户请求的入口）：
+    1. 规则层：预编译正则识别 URL / 实体问句 / 知识图谱请求 / 时间短语，微秒级；
+    2. 分类层：意图样例的本地向量相似度，毫秒级，无网络；
+    3. LLM 层：仅在前两层都不确定时调用一次 LLM 判断意图。
+    路由后分发给 NewsSummaryagent / EntityQueryAgent / NewsFilterAgent / LLMEndToEndJsonToPngAgent，
+    下游 Agent 在首次用到时才创建。tier_hits 记录各层命中次数。
+    """
+
+    def __init__(
+        self,
+        classifier: Optional[ExemplarClassifier] = None,
+        min_confidence: float = 0.35,
+        min_margin: float = 0.05,
+        use_llm: bool = True,
+        max_news: int = 20,
+        agent_factories: Optional[Dict[str, Callable]] = None,
+    ):
+        """
+        :param min_confidence: 分类层最佳意图的相似度下限，低于该值交给 LLM
+        :param min_margin: 最佳意图与第二名的相似度差距下限，低于该值交给 LLM
+        :param use_llm: 为 False 时不确定的输入直接采用分类层结果（tier 记为 fallback）
+        :param max_news: 新闻查询时最多拉取的条数（过滤前）
+        :param agent_factories: 覆盖下游 Agent 的创建函数（键：summary / entity / filter / kg）
+        """
+        self.classifier = classifier or ExemplarClassifier()
+        self.min_confidence = min_confidence
+        self.min_margin = min_margin
+        self.use_llm = use_llm
+        self.max_news = max_news
+        self.tier_hits: Counter = Counter({tier: 0 for tier in TIERS})
+        self.intent_hits: Counter = Counter()
+        self._factories = dict(agent_factories or {})
+        self._agents: Dict[str, object] = {}
+        self._lock = threading.Lock()
+        self._llm_chain = None
+
+    # ---------- 1. 路由 ----------
+    def _llm_route(self, text: str) -> Optional[RouteDecision]:
+        """LLM 层：返回 JSON {"intent", "argument"}；解析失败或意图未知时返回 None"""
+        if self._llm_chain is None:
+            from langchain_core.output_parsers import JsonOutputParser
+            from langchain_core.prompts import ChatPromptTemplate
+            from utils.llm_utils import get_qwen_llm
+
+            prompt = ChatPromptTemplate.from_messages([
+                (
+                    "system",
+                    """
+                    你是新闻助手的任务路由器，判断用户请求属于哪一类任务，并给出下游需要的参数：
+                    - summarize：总结一篇新闻（argument 为新闻 URL 或正文）
+                    - entity_card：查询某个实体（人物、公司、机构、概念）的背景信息（argument 为实体名称）
+                    - entity_extract：从一段新闻中提取核心实体（argument 为新闻正文）
+                    - kg_card：生成某个实体的知识图谱 / 卡片图片（argument 为实体名称）
+                    - news_search：搜索某个话题的新闻（argument 为搜索关键词）
+                    - unknown：不属于以上任何一类
+                    只返回 JSON 对象，例如：{{"intent": "entity_card", "argument": "英伟达"}}
+                    """,
+                ),
+                ("human", "{request}"),
+            ])
+            self._llm_chain = prompt | get_qwen_llm(cache_namespace="task_router") | JsonOutputParser()
+        try:
+            output = self._llm_chain.invoke({"request": text})
+        except Exception as e:
+            logger.warning(f"⚠️ LLM 路由失败，使用分类层结果：{str(e)[:100]}")
+            return None
+        if not isinstance(output, dict) or output.get("intent") not in INTENTS:
+            return None
+        intent = output["intent"]
+        argument = _strip(str(output.get("argument") or "")) or _strip(text)
+        params = {}
+        if intent == INTENT_NEWS_SEARCH:
+            params["from_date"] = parse_date_phrase(text)[0]
+        return RouteDecision(intent, TIER_LLM, 1.0, argument, params)
+
+    def _argument_for(self, intent: str, text: str) -> Tuple[str, Dict]:
+        """分类层只判断意图，参数按意图从原文中取"""
+        stripped = _strip(text)
+        if intent == INTENT_NEWS_SEARCH:
+            from_date, phrase = parse_date_phrase(stripped)
+            return _news_query(stripped, phrase), {"from_date": from_date}
+        if intent in (INTENT_ENTITY_CARD, INTENT_KG_CARD):
+            return _entity_name(stripped), {}
+        return stripped, {}
+
+    def route(self, text: str) -> RouteDecision:
+        """只做路由判断（不执行），按 规则 → 分类 → LLM 的顺序逐层尝试"""
+        decision = rule_route(text)
+        if decision is None:
+            intent, confidence, margin = self.classifier.classify(text)
+            argument, params = self._argument_for(intent, text)
+            decision = RouteDecision(intent, TIER_CLASSIFIER, confidence, argument, params)
+            if confidence < self.min_confidence or margin < self.min_margin:
+                llm_decision = self._llm_route(text) if self.use_llm else None
+                if llm_decision is not None:
+                    decision = llm_decision
+                else:
+                    decision.tier = TIER_FALLBACK
+                    if confidence < self.min_confidence / 2:  # 与所有意图都不相似时不猜测
+                        decision.intent = INTENT_UNKNOWN
+        with self._lock:
+            self.tier_hits[decision.tier] += 1
+            self.intent_hits[decision.intent] += 1
+        count("news_agents_router_total", tier=decision.tier, intent=decision.intent)
+        return decision
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """各层命中次数与各意图次数"""
+        with self._lock:
+            return {"tiers": dict(self.tier_hits), "intents": dict(self.intent_hits)}
+
+    # ---------- 2. 下游 Agent（首次使用时创建） ----------
+    def _agent(self, key: str):
+        if key not in self._agents:
+            with self._lock:
+                if key not in self._agents:
+                    factory = self._factories.get(key) or self._default_factory(key)
+                    self._agents[key] = factory()
+        return self._agents[key]
+
+    @staticmethod
+    def _default_factory(key: str) -> Callable:
+        if key == "summary":
+            from agents.NewsCrawlAgent import NewsSummaryagent
+            return NewsSummaryagent
+        if key == "entity":
+            from agents.EntityQueryAgent import EntityQueryAgent
+            return EntityQueryAgent
+        if key == "filter":
+            from agents.NewsFilterAgent import NewsFilterAgent
+            return NewsFilterAgent
+        if key == "kg":
+            from agents.KGAgent import LLMEndToEndJsonToPngAgent
+            return LLMEndToEndJsonToPngAgent
+        raise KeyError(key)
+
+    # ---------- 3. 分发 ----------
+    def _summarize(self, decision: RouteDecision) -> str:
+        urls = decision.params.get("urls")
+        if not urls:
+            if len(decision.argument) < LONG_TEXT_CHARS:
+                return "错误：请提供新闻 URL 或完整的新闻正文"
+            return self._agent("summary").summarize_content(decision.argument)
+        agent = self._agent("summary")
+        if len(urls) == 1:
+            return agent.run(urls[0])
+        results = agent.batch_run(urls, concurrency=min(len(urls), 4))
+        return "\n\n".join(f"【{item['url']}】\n{item['summary']}" for item in results)
+
+    def _entity_card(self, decision: RouteDecision) -> str:
+        if not decision.argument:
+            return "错误：请提供要查询的实体名称"
+        cards = self._agent("entity").lookup_entities([decision.argument])
+        return next(iter(cards.values()), f"错误：实体名称无效：{decision.argument}")
+
+    def _kg_card(self, decision: RouteDecision) -> str:
+        from agents.HotEntityJob import lookup_hot_card
+        from tools.NewsTool import get_serp_json
+
+        if not decision.argument:
+            return "错误：请提供要生成知识图谱的实体名称"
+        png = lookup_hot_card(decision.argument)  # 热门实体已预生成，直接返回
+        if png:
+            return png
+        paths = self._agent("kg").run({"knowledge_graph": get_serp_json(decision.argument)})
+        return paths[0] if paths else f"错误：知识图谱生成失败：{decision.argument}"
+
+    def _news_search(self, decision: RouteDecision) -> str:
+        from tools.NewsTool import iter_news, top_headlines
+
+        from_date = decision.params.get("from_date", "")
+        if decision.argument:
+            articles = iter_news(decision.argument, from_date=from_date, sort_by="publishedAt", max_results=self.max_news)
+        else:
+            # 没有关键词（“今天有什么新闻”）：取头条，再按时间范围过滤
+            articles = [a for a in top_headlines(page_size=self.max_news) if (a.published_at or "") >= from_date]
+        metadata = [
+            {"index": i, "title": a.title, "source": a.source, "published_at": a.published_at, "url": a.url}
+            for i, a in enumerate(articles)
+        ]
+        if not metadata:
+            return "未找到相关新闻。"
+        kept = self._agent("filter").run_chunked(metadata)
+        return "\n".join(
+            f"[{i}] {item['title']}（{item['source']}，{item['published_at']}）{item['url']}"
+            for i, item in enumerate(kept, 1)
+        ) or "未找到相关新闻。"
+
+    def run(self, user_input: str) -> str:
+        """核心方法：路由并执行，返回下游 Agent 的结果"""
+        if not user_input or not user_input.strip():
+            return "错误：输入不能为空"
+
+        with span("agent.task_router") as sp:
+            decision = self.route(user_input)
+            sp.set(intent=decision.intent, tier=decision.tier, confidence=round(decision.confidence, 3))
+            logger.info(f"🧭 路由：{decision.intent}（{decision.tier}，置信度 {decision.confidence:.2f}）"
+                        f"参数：{decision.argument[:50]}")
+            handlers = {
+                INTENT_SUMMARIZE: self._summarize,
+                INTENT_ENTITY_CARD: self._entity_card,
+                INTENT_ENTITY_EXTRACT: lambda d: self._agent("entity").run(d.argument),
+                INTENT_KG_CARD: self._kg_card,
+                INTENT_NEWS_SEARCH: self._news_search,
+            }
+            handler = handlers.get(decision.intent)
+            if handler is None:
+                sp.fail("unknown intent")
+                return "错误：无法识别的请求，请提供新闻 URL、实体名称或新闻查询"
+            try:
+                return handler(decision)
+            except Exception as e:
+                error_msg = f"任务处理异常：{str(e)}"
+                sp.fail(e)
+                logger.error(error_msg)
+                return error_msg
@@ -0,0 +1,306 @@
+"""
+离线 Agent 吞吐基准：启动本地 mock 服务（见 benchmarks/mock_services.py），每个场景在独立子进程、
+独立临时工作目录（缓存/实体库均为空）中运行，统计 items/s、单项延迟 p50/p95/p99 与峰值 RSS。
+用法（在项目根目录）：
+    python -m benchmarks.agent_bench [--profile fast --items 100 --scenarios news_filter,news_summary]
+    python -m benchmarks.agent_bench --compare data/bench/agent_bench-<旧提交>.json
+结果写入 JSON（默认 data/bench/agent_bench-<提交号>.json），不同提交的结果可直接对比。
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_QUERY = "benchmark"
+
+
+# ======================== 1. 子进程内的场景 ========================
+def _timed_map(fn: Callable, items: List, concurrency: int) -> Dict:
+    """
+    并发执行 fn(item)，返回计时阶段的结果：每次调用耗时（秒，失败记为负值）、墙钟时间、处理的条目数
+    （items 为批次列表时按批内条目计数）。准备阶段（拉取元数据、正文）不计入。
+    """
+    def _run(item):
+        start = time.perf_counter()
+        try:
+            ok = fn(item)
+        except Exception:
+            ok = False
+        elapsed = time.perf_counter() - start
+        return elapsed if ok is not False else -elapsed
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        latencies = list(executor.map(_run, items))
+    return {
+        "latencies": latencies,
+        "wall_s": time.perf_counter() - start,
+        "items": sum(len(i) if isinstance(i, list) else 1 for i in items),
+    }
+
+
+def _batches(items: List, size: int) -> List[List]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _metadata(n: int) -> List[Dict]:
+    from tools.NewsTool import iter_news
+    return [
+        {"index": i, "title": a.title, "source": a.source, "published_at": a.published_at, "url": a.url}
+        for i, a in enumerate(iter_news(BENCH_QUERY, max_results=n))
+    ]
+
+
+def _contents(n: int) -> List[str]:
+    """场景准备阶段（不计时）：通过 mock Jina 取得正文"""
+    from tools.NewsTool import extract_news_original_content
+    urls = [item["url"] for item in _metadata(n)]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        return [c for c in executor.map(extract_news_original_content, urls) if not c.startswith("错误")]
+
+
+def scenario_news_filter(args) -> Dict:
+    from agents.NewsFilterAgent import NewsFilterAgent
+    agent = NewsFilterAgent()
+    batches = _batches(_metadata(args.items), args.batch_size)
+    return _timed_map(lambda batch: bool(agent.run_chunked(batch)) or True, batches, 1)
+
+
+def scenario_news_summary(args) -> Dict:
+    from agents.NewsCrawlAgent import NewsSummaryagent
+    agent = NewsSummaryagent()
+    urls = [item["url"] for item in _metadata(args.items)]
+    return _timed_map(lambda url: not agent.run(url).startswith(("新闻处理失败", "新闻总结异常")), urls, args.concurrency)
+
+
+def scenario_entity_query(args) -> Dict:
+    from agents.EntityQueryAgent import EntityQueryAgent
+    agent = EntityQueryAgent()
+    contents = _contents(args.items)
+    return _timed_map(lambda c: not agent.run(c).startswith(("错误", "EntityQuery Agent 处理异常")), contents, args.concurrency)
+
+
+def scenario_entity_query_packed(args) -> Dict:
+    from agents.EntityQueryAgent import EntityQueryAgent
+    agent = EntityQueryAgent(max_concurrency=args.concurrency)
+    batches = _batches(_contents(args.items), args.batch_size)
+    return _timed_map(lambda batch: bool(agent.batch_run(batch, packed=True)) or True, batches, 1)
+
+
+def scenario_kg_cards(args) -> Dict:
+    from agents.KGAgent import LLMEndToEndJsonToPngAgent
+    from benchmarks.mock_services import ENTITY_POOL
+    from tools.NewsTool import get_serp_json
+    if not any(shutil.which(b) for b in ("chromedriver", "google-chrome", "chromium", "chromium-browser")):
+        raise RuntimeError("未找到 Chrome / chromedriver，跳过截图场景")
+    names = [f"{ENTITY_POOL[i % len(ENTITY_POOL)]}{i}" for i in range(args.items)]
+    serps = [{"knowledge_graph": get_serp_json(name)} for name in names]
+    agent = LLMEndToEndJsonToPngAgent()
+    try:
+        return _timed_map(lambda batch: all(agent.render_all(batch, output_dir="bench_png")), _batches(serps, args.batch_size), 1)
+    finally:
+        agent.html_to_png_tool.close()
+
+
+ROUTER_QUERIES = [
+    "https://news.example.com/a/1", "英伟达是谁", "什么是CPI", "生成特斯拉的知识图谱", "今天有什么科技新闻",
+    "最近3天关于美联储的报道", "给我讲讲黄仁勋这个人", "英伟达最新动态", "帮我概括这篇文章", "随便聊聊",
+]
+
+
+def scenario_task_router(args) -> Dict:
+    """只测路由判断（不执行下游 Agent）：规则 / 分类层本地完成，不确定的输入走一次 LLM"""
+    from agents.TaskRouterAgent import TaskRouterAgent
+    router = TaskRouterAgent()
+    queries = [ROUTER_QUERIES[i % len(ROUTER_QUERIES)] for i in range(args.items)]
+    result = _timed_map(router.route, queries, 1)
+    result["tiers"] = router.stats()["tiers"]
+    return result
+
+
+def scenario_news_pipeline(args) -> Dict:
+    """端到端流水线（不渲染 PNG）：单项延迟为每篇新闻从启动到输出的时间，体现逐篇流式输出"""
+    from agents.NewsPipeline import NewsPipeline
+    pipeline = NewsPipeline(
+        render_kg=False,
+        node_concurrency={"extract": args.concurrency, "summarize": args.concurrency, "entities": args.concurrency},
+    )
+    start = time.perf_counter()
+    result = pipeline.run(BENCH_QUERY, max_results=args.items)
+    return {
+        "latencies": [a["elapsed_ms"] / 1000 * (-1 if a["errors"] else 1) for a in result["articles"]],
+        "wall_s": time.perf_counter() - start,
+        "items": len(result["articles"]),
+    }
+
+
+# 场景名 → 执行函数（返回 _timed_map 的计时结果）
+SCENARIOS: Dict[str, Callable] = {
+    "news_filter": scenario_news_filter,
+    "news_summary": scenario_news_summary,
+    "entity_query": scenario_entity_query,
+    "entity_query_packed": scenario_entity_query_packed,
+    "kg_cards": scenario_kg_cards,
+    "task_router": scenario_task_router,
+    "news_pipeline": scenario_news_pipeline,
+}
+# 按批计时的场景：延迟为单批耗时
+BATCHED = {"news_filter", "entity_query_packed", "kg_cards"}
+
+
+def run_child(args) -> None:
+    if args.no_rate_limit:
+        from utils.http_client import DEFAULT_RATE_LIMITS
+        for api in DEFAULT_RATE_LIMITS:
+            DEFAULT_RATE_LIMITS[api] = (1e6, 10 ** 6)
+    sys.stdout = open(os.devnull, "w")  # Agent 的进度输出不混入结果
+    try:
+        result = SCENARIOS[args.child](args)
+    except Exception as e:
+        result = {"error": str(e)}
+    result["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Linux 下单位为 KB
+    sys.stdout = sys.__stdout__
+    print(json.dumps(result))
+
+
+# ======================== 2. 父进程：调度 + 汇总 ========================
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    if not samples:
+        return {"p50": None, "p95": None, "p99": None}
+    ordered = sorted(samples)
+
+    def pick(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))] * 1000, 1)
+
+    return {"p50": pick(50), "p95": pick(95), "p99": pick(99)}
+
+
+def _git_commit() -> str:
+    proc = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+    return proc.stdout.strip() or "unknown"
+
+
+def run_scenario(name: str, args, env: Dict[str, str]) -> Dict:
+    workdir = tempfile.mkdtemp(prefix=f"bench_{name}_")
+    cmd = [
+        sys.executable, "-m", "benchmarks.agent_bench", "--child", name,
+        "--items", str(args.items), "--batch-size", str(args.batch_size), "--concurrency", str(args.concurrency),
+    ] + (["--no-rate-limit"] if args.no_rate_limit else [])
+    child_env = dict(os.environ, **env, PYTHONPATH=ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    try:
+        proc = subprocess.run(cmd, cwd=workdir, env=child_env, capture_output=True, text=True,
+                              stdin=subprocess.DEVNULL, timeout=args.timeout)
+    except subprocess.TimeoutExpired:
+        return {"error": f"超时（{args.timeout}s）"}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    lines = proc.stdout.strip().splitlines()
+    if proc.returncode != 0 or not lines:
+        return {"error": (proc.stderr.strip().splitlines() or ["子进程异常退出"])[-1]}
+    raw = json.loads(lines[-1])
+    if "error" in raw:
+        return {"error": raw["error"], "peak_rss_mb": round(raw["peak_rss_mb"], 1)}
+
+    latencies = raw["latencies"]
+    ok = [t for t in latencies if t >= 0]
+    summary = {
+        "items": raw["items"],
+        "calls": len(latencies),
+        "failed": len(latencies) - len(ok),
+        "wall_s": round(raw["wall_s"], 3),
+        "items_per_s": round(raw["items"] / raw["wall_s"], 2) if raw["wall_s"] else None,
+        "latency_ms": _percentiles(ok),
+        "latency_unit": "batch" if name in BATCHED else "item",
+        "peak_rss_mb": round(raw["peak_rss_mb"], 1),
+    }
+    if "tiers" in raw:
+        summary["tiers"] = raw["tiers"]
+    return summary
+
+
+def compare(current: Dict, baseline_path: str) -> None:
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"\n对比基线 {baseline.get('commit')} → {current.get('commit')}")
+    for name, result in current["scenarios"].items():
+        old = baseline.get("scenarios", {}).get(name)
+        if not old or "error" in old or "error" in result:
+            continue
+
+        def delta(new_value, old_value) -> str:
+            if not new_value or not old_value:
+                return "n/a"
+            return f"{(new_value - old_value) / old_value * 100:+.1f}%"
+
+        print(f"  {name:<22} items/s {delta(result['items_per_s'], old['items_per_s']):>8}   "
+              f"p95 {delta(result['latency_ms']['p95'], old['latency_ms']['p95']):>8}   "
+              f"RSS {delta(result['peak_rss_mb'], old['peak_rss_mb']):>8}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="基于本地 mock 服务的 Agent 吞吐 / 延迟基准")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="逗号分隔的场景名")
+    parser.add_argument("--profile", default="fast", help="mock 延迟配置：zero / fast / realistic")
+    parser.add_argument("--items", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--article-chars", type=int, default=3000)
+    parser.add_argument("--no-rate-limit", action="store_true", help="关闭客户端限流（只测处理能力）")
+    parser.add_argument("--timeout", type=float, default=900)
+    parser.add_argument("--output", help="结果 JSON 路径，默认 data/bench/agent_bench-<提交号>.json")
+    parser.add_argument("--compare", help="与之前的结果 JSON 对比")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args)
+        return 0
+
+    from benchmarks.mock_services import MockServices
+
+    report = {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "profile": args.profile,
+        "params": {k: getattr(args, k) for k in ("items", "batch_size", "concurrency", "article_chars", "no_rate_limit")},
+        "scenarios": {},
+    }
+    with MockServices(profile=args.profile, article_chars=args.article_chars, total_results=max(args.items, 100)) as mock:
+        print(f"✅ mock 服务：{mock.base_url}（profile={args.profile}）")
+        for name in [s.strip() for s in args.scenarios.split(",") if s.strip()]:
+            if name not in SCENARIOS:
+                print(f"❌ 未知场景：{name}")
+                continue
+            result = run_scenario(name, args, mock.env())
+            report["scenarios"][name] = result
+            if "error" in result:
+                print(f"⚠️ {name:<22} {result['error']}")
+            else:
+                lat = result["latency_ms"]
+                print(f"📊 {name:<22} {result['items_per_s']:>8} items/s  p50 {lat['p50']} / p95 {lat['p95']} / "
+                      f"p99 {lat['p99']} ms（每{result['latency_unit']}）  RSS {result['peak_rss_mb']} MB  "
+                      f"失败 {result['failed']}/{result['calls']}")
+                if "tiers" in result:
+                    print(f"   {'':<22} 路由层级命中：{result['tiers']}")
+        report["mock_requests"] = dict(mock.counts)
+
+    output = args.output or os.path.join(ROOT, "data", "bench", f"agent_bench-{report['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"💾 结果已保存：{output}")
+    if args.compare:
+        compare(report, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""
+冷启动导入耗时预算检查：
+每个模块在独立子进程中导入（非交互模式），测量导入耗时，并确认重量级依赖没有被提前加载。
+用法（在项目根目录）：python -m benchmarks.import_budget [--repeat 3]
+任一模块超出预算或提前加载了禁止的依赖时，以退出码 1 结束，可直接用于 CI / cron 部署前检查。
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 模块 → (导入耗时预算 ms, 导入后不应出现在 sys.modules 中的依赖)
+BUDGETS: Dict[str, Tuple[float, List[str]]] = {
+    "config.load_key": (50, []),
+    "utils.llm_utils": (100, ["langchain_community", "openai"]),
+    "tools.NewsTool": (600, ["langchain_community", "selenium", "numpy"]),
+    "agents.NewsCrawlAgent": (800, ["langchain_community", "selenium", "numpy"]),
+    "agents.NewsFilterAgent": (800, ["langchain_community", "selenium"]),
+    "agents.EntityQueryAgent": (800, ["langchain_community", "selenium", "langchain.chains"]),
+    "agents.KGAgent": (800, ["langchain_community", "selenium"]),
+    "agents.NewsQAAgent": (800, ["langchain_community", "selenium"]),
+    "agents.IngestionRunner": (900, ["langchain_community", "selenium"]),
+    "agents.HotEntityJob": (900, ["langchain_community", "selenium"]),
+    # LangGraph 在首次运行时才导入并编译图
+    "agents.NewsPipeline": (900, ["langchain_community", "selenium", "langgraph"]),
+    # 路由层只做本地判断，下游 Agent 与 LangChain 在分发时才导入
+    "agents.TaskRouterAgent": (300, ["langchain_core", "agents.NewsCrawlAgent", "agents.KGAgent", "selenium"]),
+}
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = (time.perf_counter() - start) * 1000
+print(json.dumps({{"ms": elapsed, "loaded": [m for m in {forbidden!r} if m in sys.modules]}}))
+"""
+
+
+def measure(module: str, forbidden: List[str]) -> Dict:
+    env = dict(os.environ, NEWS_AGENTS_NONINTERACTIVE="1", PYTHONDONTWRITEBYTECODE="1")
+    proc = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module, forbidden=forbidden)],
+        cwd=ROOT, env=env, capture_output=True, text=True, stdin=subprocess.DEVNULL,
+    )
+    if proc.returncode != 0:
+        return {"error": proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "导入失败"}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="检查各模块冷启动导入耗时是否在预算内")
+    parser.add_argument("--repeat", type=int, default=3, help="每个模块重复测量次数，取最小值")
+    args = parser.parse_args()
+
+    failed = False
+    for module, (budget_ms, forbidden) in BUDGETS.items():
+        runs = [measure(module, forbidden) for _ in range(args.repeat)]
+        errors = [r["error"] for r in runs if "error" in r]
+        if errors:
+            print(f"❌ {module:<26} 导入失败：{errors[0]}")
+            failed = True
+            continue
+        best = min(r["ms"] for r in runs)
+        loaded = sorted({m for r in runs for m in r["loaded"]})
+        ok = best <= budget_ms and not loaded
+        failed = failed or not ok
+        extra = f"  提前加载：{', '.join(loaded)}" if loaded else ""
+        print(f"{'✅' if ok else '❌'} {module:<26} {best:8.1f} ms / 预算 {budget_ms:.0f} ms{extra}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,373 @@
+"""
+本地 mock 服务：模拟 NewsAPI（/v2/everything）、Jina Reader、SerpAPI（/search）与 DashScope OpenAI 兼容接口
+（/chat/completions）的响应结构，支持按服务配置延迟分布与错误率。所有响应由请求内容确定性生成。
+单独启动（在项目根目录）：python -m benchmarks.mock_services [--port 8765 --profile realistic]
+启动后按打印出的环境变量覆盖各服务地址，即可离线运行任意 Agent。
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+# 1x1 透明 PNG（卡片图片下载用）
+TINY_PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6360000002000154a24f5d0000000049454e44ae426082"
+)
+ENTITY_POOL = [
+    "美联储", "鲍威尔", "国家统计局", "CPI", "特斯拉", "比亚迪", "华为", "苹果公司", "英伟达", "OpenAI",
+    "欧洲央行", "中国人民银行", "宁德时代", "小米集团", "阿里巴巴", "腾讯", "台积电", "微软", "谷歌", "亚马逊",
+    "马斯克", "黄仁勋", "雷军", "新能源汽车", "人工智能", "半导体", "光伏", "房地产", "原油", "黄金",
+]
+SOURCES = ["Mock Daily", "Example Times", "Test Post", "Sample Wire", "Fake Herald"]
+PR_DOMAINS = ["prnewswire.com", "businesswire.com"]
+
+
+# ======================== 1. 延迟与错误配置 ========================
+@dataclass
+class LatencyProfile:
+    """
+    单个服务的延迟分布与错误注入：
+    dist 取 fixed / uniform / lognormal；LLM 额外按输出 token 数叠加 per_token_ms（模拟生成耗时）。
+    """
+    dist: str = "lognormal"
+    median_ms: float = 50.0
+    sigma: float = 0.5          # lognormal 形状参数
+    spread_ms: float = 20.0     # uniform 时为 ±spread_ms
+    per_token_ms: float = 0.0
+    error_rate: float = 0.0     # 注入错误的概率：一半返回 500，一半返回 429 + Retry-After
+
+    def sample_ms(self, rng: random.Random, out_tokens: int = 0) -> float:
+        if self.dist == "fixed":
+            base = self.median_ms
+        elif self.dist == "uniform":
+            base = rng.uniform(self.median_ms - self.spread_ms, self.median_ms + self.spread_ms)
+        else:
+            base = rng.lognormvariate(0.0, self.sigma) * self.median_ms
+        return max(0.0, base + out_tokens * self.per_token_ms)
+
+
+PROFILES: Dict[str, Dict[str, LatencyProfile]] = {
+    # 只测本地开销：没有网络延迟与错误
+    "zero": {name: LatencyProfile(dist="fixed", median_ms=0.0) for name in ("newsapi", "jina", "serpapi", "llm")},
+    # 快速回归：小延迟，适合 CI
+    "fast": {
+        "newsapi": LatencyProfile(median_ms=20), "jina": LatencyProfile(median_ms=40),
+        "serpapi": LatencyProfile(median_ms=30), "llm": LatencyProfile(median_ms=50, per_token_ms=0.2),
+    },
+    # 接近线上：Jina / LLM 为秒级且长尾明显，带少量错误
+    "realistic": {
+        "newsapi": LatencyProfile(median_ms=300, sigma=0.4, error_rate=0.01),
+        "jina": LatencyProfile(median_ms=2500, sigma=0.7, error_rate=0.03),
+        "serpapi": LatencyProfile(median_ms=800, sigma=0.5, error_rate=0.02),
+        "llm": LatencyProfile(median_ms=400, sigma=0.4, per_token_ms=15, error_rate=0.01),
+    },
+}
+
+
+# ======================== 2. 确定性响应生成 ========================
+def _seed(*parts: str) -> int:
+    return int.from_bytes(hashlib.md5("|".join(parts).encode("utf-8")).digest()[:8], "little")
+
+
+def _entities_for(text: str, n: int = 4) -> List[str]:
+    """按内容哈希从实体池中挑选实体，池头部概率更高（模拟热门实体）"""
+    rng = random.Random(_seed(text))
+    picked = []
+    while len(picked) < n:
+        entity = ENTITY_POOL[min(int(rng.paretovariate(1.2)) - 1, len(ENTITY_POOL) - 1)]
+        if entity not in picked:
+            picked.append(entity)
+    return picked
+
+
+def news_page(query: str, page: int, page_size: int, total: int) -> Dict:
+    now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    articles = []
+    for i in range((page - 1) * page_size, min(total, page * page_size)):
+        rng = random.Random(_seed(query, str(i)))
+        domain = rng.choice(PR_DOMAINS) if rng.random() < 0.1 else f"news{i % 7}.example.com"
+        title = f"{query} 相关报道 #{i}：{'、'.join(_entities_for(f'{query}{i}', 2))}最新动态"
+        articles.append({
+            "source": {"id": None, "name": rng.choice(SOURCES)},
+            "author": "Mock Author",
+            "title": title,
+            "description": f"{title}。这是用于离线基准的模拟摘要。",
+            "url": f"https://{domain}/{query}/{i}",
+            "urlToImage": None,
+            "publishedAt": (now - timedelta(minutes=7 * i)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "content": f"{title}……[+1200 chars]",
+        })
+    return {"status": "ok", "totalResults": total, "articles": articles}
+
+
+def article_body(url: str, chars: int) -> str:
+    entities = _entities_for(url, 5)
+    sentence = "{0}方面表示，{1}与{2}的合作将在本季度继续推进，市场对{3}的预期有所上升。"
+    paragraphs, length, i = [], 0, 0
+    while length < chars:
+        rng = random.Random(_seed(url, str(i)))
+        para = "".join(sentence.format(*rng.sample(entities, 4)) for _ in range(4))
+        paragraphs.append(para)
+        length += len(para)
+        i += 1
+    return "\n\n".join(paragraphs)
+
+
+def serp_result(query: str, image_base: str) -> Dict:
+    rng = random.Random(_seed(query))
+    return {
+        "search_metadata": {"status": "Success"},
+        "knowledge_graph": {
+            "title": query,
+            "type": rng.choice(["公司", "人物", "机构", "指标"]),
+            "description": f"{query}是用于离线基准的模拟实体，相关描述由 mock 服务生成。",
+            "founded": f"{rng.randint(1950, 2020)}年",
+            "headquarters": rng.choice(["北京", "上海", "深圳", "华盛顿", "加利福尼亚"]),
+            "header_images": [{"image": f"{image_base}/{_seed(query, str(k)) % 10 ** 8}.png"} for k in range(2)],
+        },
+        "organic_results": [
+            {"position": k + 1, "title": f"{query} - 结果 {k + 1}", "link": f"https://example.com/{k}",
+             "snippet": f"关于{query}的模拟搜索摘要 {k + 1}。"}
+            for k in range(3)
+        ],
+    }
+
+
+def llm_reply(messages: List[Dict]) -> str:
+    """根据系统提示词识别调用方，返回结构正确的模拟输出"""
+    system = " ".join(m.get("content", "") for m in messages if m.get("role") == "system")
+    human = "\n".join(m.get("content", "") for m in messages if m.get("role") != "system")
+    if "新闻内容审核员" in system:
+        items = _json_after(human, "新闻元数据列表：") or []
+        keep = [item.get("index", i) for i, item in enumerate(items) if _seed(str(item.get("url"))) % 5]
+        return json.dumps(keep)
+    if "每个元素是一篇新闻" in system:
+        items = _json_after(human, "新闻列表：") or []
+        return json.dumps({item["id"]: _entities_for(item.get("content", "")) for item in items}, ensure_ascii=False)
+    if "实体提取专家" in system:
+        return json.dumps(_entities_for(human), ensure_ascii=False)
+    if "第 " in system and "部分" in system and "新闻总结助手" in system:
+        return "\n".join(f"- 要点 {k}：{e}相关进展" for k, e in enumerate(_entities_for(human, 3), 1))
+    if "新闻总结助手" in system:
+        entities = _entities_for(human, 3)
+        points = "\n".join(f"{k}. {e}相关事件的关键信息与影响。" for k, e in enumerate(entities, 1))
+        return f"【核心要点】\n{points}\n【核心概括】\n本文报道了{'、'.join(entities)}的最新动态（mock 生成）。"
+    if "HTML" in system or "html" in system:
+        return "<!DOCTYPE html><html><body><div class=\"card\" id=\"card\"><h1>Mock</h1></div></body></html>"
+    if "任务路由器" in system:
+        return json.dumps({"intent": "news_search", "argument": human.strip()[:20]}, ensure_ascii=False)
+    if "问答助手" in system:
+        return "根据已有新闻，相关事件正在推进 [1]。"
+    return "OK"
+
+
+def _json_after(text: str, marker: str):
+    _, _, tail = text.partition(marker)
+    try:
+        return json.loads(tail.strip())
+    except ValueError:
+        return None
+
+
+def _estimate_tokens(text: str) -> int:
+    cjk = len(re.findall(r"[一-鿿]", text))
+    return cjk + (len(text) - cjk) // 4
+
+
+# ======================== 3. HTTP 服务 ========================
+class MockServices:
+    """
+    所有 mock 服务共用一个端口，按路径前缀区分：
+    /newsapi/v2/everything、/jina/<url>、/serpapi/search、/dashscope/chat/completions、/img/<id>.png
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        profile: str = "fast",
+        article_chars: int = 3000,
+        total_results: int = 500,
+        seed: int = 0,
+        overrides: Optional[Dict[str, LatencyProfile]] = None,
+    ):
+        self.latency = {**PROFILES[profile], **(overrides or {})}
+        self.article_chars = article_chars
+        self.total_results = total_results
+        self.counts: Dict[str, int] = {}
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def env(self) -> Dict[str, str]:
+        """覆盖各服务地址与密钥的环境变量"""
+        return {
+            "NEWS_API_URL": f"{self.base_url}/newsapi/v2/everything",
+            "JINA_READER_URL": f"{self.base_url}/jina/",
+            "SEARCH_ENGINE_URL": f"{self.base_url}/serpapi/search",
+            "DASHSCOPE_API_BASE": f"{self.base_url}/dashscope",
+            "NEWS_API_KEY": "mock", "JINA_API_KEY": "mock", "SERP_API_KEY": "mock", "DASHSCOPE_API_KEY": "mock",
+            "NEWS_AGENTS_NONINTERACTIVE": "1",
+        }
+
+    def start(self) -> "MockServices":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "MockServices":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _delay_and_fault(self, service: str, out_tokens: int = 0) -> Optional[Tuple[int, Dict]]:
+        """按配置休眠；命中错误注入时返回 (状态码, 额外响应头)"""
+        profile = self.latency[service]
+        with self._rng_lock:
+            delay = profile.sample_ms(self._rng, out_tokens) / 1000
+            fault = self._rng.random() < profile.error_rate
+            throttle = self._rng.random() < 0.5
+            self.counts[service] = self.counts.get(service, 0) + 1
+        time.sleep(delay)
+        if fault:
+            return (429, {"Retry-After": "0"}) if throttle else (500, {})
+        return None
+
+    def _handler_class(self):
+        services = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):  # 压测时不刷屏
+                pass
+
+            def _send(self, status: int, body: bytes, content_type: str = "application/json", headers=None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _json(self, data: Dict, status: int = 200):
+                self._send(status, json.dumps(data, ensure_ascii=False).encode("utf-8"))
+
+            def _fault(self, service: str, out_tokens: int = 0) -> bool:
+                fault = services._delay_and_fault(service, out_tokens)
+                if fault:
+                    status, headers = fault
+                    body = {"status": "error", "code": "mockError", "message": f"mock injected error ({status})"}
+                    self._send(status, json.dumps(body).encode("utf-8"), headers=headers)
+                return bool(fault)
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+                if parts.path.startswith("/newsapi/"):
+                    if self._fault("newsapi"):
+                        return
+                    self._json(news_page(
+                        query.get("q", ""), int(query.get("page", 1)), int(query.get("pageSize", 20)),
+                        services.total_results,
+                    ))
+                elif parts.path.startswith("/jina/"):
+                    if self._fault("jina"):
+                        return
+                    url = unquote(self.path[len("/jina/"):])
+                    self._json({"code": 200, "status": 20000, "data": {
+                        "title": url, "url": url, "content": article_body(url, services.article_chars),
+                    }})
+                elif parts.path.startswith("/serpapi/"):
+                    if self._fault("serpapi"):
+                        return
+                    self._json(serp_result(query.get("q", ""), f"{services.base_url}/img"))
+                elif parts.path.startswith("/img/"):
+                    self._send(200, TINY_PNG, "image/png")
+                else:
+                    self._json({"error": "not found"}, 404)
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                if not urlsplit(self.path).path.endswith("/chat/completions"):
+                    self._json({"error": "not found"}, 404)
+                    return
+                request = json.loads(body or b"{}")
+                content = llm_reply(request.get("messages", []))
+                prompt_tokens = sum(_estimate_tokens(m.get("content", "")) for m in request.get("messages", []))
+                completion_tokens = _estimate_tokens(content)
+                if self._fault("llm", completion_tokens):
+                    return
+                created = int(time.time())
+                if request.get("stream"):
+                    self._stream(content, request.get("model", "mock"), created)
+                    return
+                self._json({
+                    "id": f"chatcmpl-mock-{created}", "object": "chat.completion", "created": created,
+                    "model": request.get("model", "mock"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                                 "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                              "total_tokens": prompt_tokens + completion_tokens},
+                })
+
+            def _stream(self, content: str, model: str, created: int):
+                """SSE 流式响应：按小段切分输出"""
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                for start in range(0, len(content), 8):
+                    chunk = {"id": f"chatcmpl-mock-{created}", "object": "chat.completion.chunk", "created": created,
+                             "model": model, "choices": [{"index": 0, "delta": {"content": content[start:start + 8]},
+                                                          "finish_reason": None}]}
+                    self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+                self.close_connection = True
+
+        return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="启动 NewsAPI / Jina / SerpAPI / DashScope 本地 mock 服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="fast")
+    parser.add_argument("--article-chars", type=int, default=3000)
+    args = parser.parse_args()
+
+    services = MockServices(args.host, args.port, args.profile, args.article_chars).start()
+    print(f"✅ mock 服务已启动：{services.base_url}（profile={args.profile}）")
+    for key, value in services.env().items():
+        print(f"export {key}={value}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        services.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+本地混合检索延迟基准：
+合成约 100 万个文本块（Zipf 分布词表 + 随机单位向量），分别测量 BM25、向量检索与 RRF 融合的单查询延迟。
+用法（在项目根目录）：python -m benchmarks.retrieval_bench [--chunks 1000000 --dim 128 --queries 200]
+输出 JSON：构建耗时、各路 p50/p95/p99（ms）；融合检索 p95 超过 --budget-ms 时以退出码 1 结束。
+"""
+import argparse
+import json
+import sys
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from utils.retrieval import BM25Index, DenseIndex, reciprocal_rank_fusion
+
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    arr = np.asarray(samples) * 1000
+    return {f"p{p}": round(float(np.percentile(arr, p)), 2) for p in (50, 95, 99)}
+
+
+def build_bm25(num_chunks: int, vocab: int, doc_len: int, rng: np.random.Generator, batch: int = 200000) -> BM25Index:
+    index = BM25Index()
+    for start in range(0, num_chunks, batch):
+        n = min(batch, num_chunks - start)
+        terms = np.minimum(rng.zipf(1.2, size=(n, doc_len)) - 1, vocab - 1)
+        for row in terms:
+            index.add_token_ids(row)
+        index.build()  # 分批合并，同时覆盖增量合并路径
+    return index
+
+
+def build_dense(num_chunks: int, dim: int, rng: np.random.Generator, batch: int = 200000) -> DenseIndex:
+    index = DenseIndex(dim)
+    for start in range(0, num_chunks, batch):
+        n = min(batch, num_chunks - start)
+        index.add(rng.standard_normal((n, dim), dtype=np.float32))
+    return index
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="混合检索（BM25 + 向量 + RRF）延迟基准")
+    parser.add_argument("--chunks", type=int, default=1000000)
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--vocab", type=int, default=200000)
+    parser.add_argument("--doc-len", type=int, default=40, help="每块 token 数")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--candidates", type=int, default=50)
+    parser.add_argument("--budget-ms", type=float, default=100.0, help="融合检索 p95 预算")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    t0 = time.perf_counter()
+    bm25 = build_bm25(args.chunks, args.vocab, args.doc_len, rng)
+    t1 = time.perf_counter()
+    dense = build_dense(args.chunks, args.dim, rng)
+    t2 = time.perf_counter()
+
+    # 查询词取自中频区间（跳过最高频的停用词级别词项），更接近真实查询
+    query_terms = [rng.integers(10, 5000, size=rng.integers(2, 6)) for _ in range(args.queries)]
+    query_vecs = rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+    bm25.search(query_terms[0], args.candidates)
+    dense.search(query_vecs[:1], args.candidates)  # 预热
+
+    bm25_lat, dense_lat, hybrid_lat = [], [], []
+    for terms, vec in zip(query_terms, query_vecs):
+        s = time.perf_counter()
+        bm25_ids, _ = bm25.search(terms, args.candidates)
+        m = time.perf_counter()
+        (dense_ids, _), = dense.search(vec[None, :], args.candidates)
+        e = time.perf_counter()
+        reciprocal_rank_fusion([bm25_ids, dense_ids])
+        f = time.perf_counter()
+        bm25_lat.append(m - s)
+        dense_lat.append(e - m)
+        hybrid_lat.append(f - s)
+
+    # 批量查询：一次矩阵乘处理 32 个查询，报告摊销到单个查询的耗时
+    batch = query_vecs[:32]
+    s = time.perf_counter()
+    dense.search(batch, args.candidates)
+    batched_ms = (time.perf_counter() - s) * 1000 / len(batch)
+
+    report = {
+        "chunks": args.chunks,
+        "dim": args.dim,
+        "build_s": {"bm25": round(t1 - t0, 2), "dense": round(t2 - t1, 2)},
+        "bm25_ms": _percentiles(bm25_lat),
+        "dense_ms": _percentiles(dense_lat),
+        "dense_batched_ms_per_query": round(batched_ms, 2),
+        "hybrid_ms": _percentiles(hybrid_lat),
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0 if report["hybrid_ms"]["p95"] <= args.budget_ms else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
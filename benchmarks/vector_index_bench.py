@@ -0,0 +1,117 @@
+"""
+量化向量索引（IVF + int8 + 内存映射）召回率 / 延迟基准：
+合成带主题簇结构的单位向量（更接近真实新闻嵌入），分批追加写入 QuantizedVectorIndex，
+以 float32 精确检索（DenseIndex）为基准，测量不同 nprobe 下的 recall@k 与单查询延迟，并验证墓碑删除后不再召回。
+用法（在项目根目录）：python -m benchmarks.vector_index_bench [--vectors 1000000 --dim 128 --nprobe 4,8,16,32]
+输出 JSON：构建耗时、磁盘占用、各 nprobe 的 recall@k 与 p50/p95/p99（ms）；--target-nprobe 下 recall 低于 --min-recall 时以退出码 1 结束。
+"""
+import argparse
+import json
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from utils.retrieval import DenseIndex
+from utils.vector_index import QuantizedVectorIndex
+
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    arr = np.asarray(samples) * 1000
+    return {f"p{p}": round(float(np.percentile(arr, p)), 2) for p in (50, 95, 99)}
+
+
+def clustered_vectors(n: int, centers: np.ndarray, spread: float, rng: np.random.Generator) -> np.ndarray:
+    """每个向量 = 随机主题中心 + 高斯噪声"""
+    topics = rng.integers(0, len(centers), size=n)
+    return centers[topics] + spread * rng.standard_normal((n, centers.shape[1]), dtype=np.float32)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="量化向量索引召回率 / 延迟基准（对比 float32 精确检索）")
+    parser.add_argument("--vectors", type=int, default=1000000)
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--topics", type=int, default=2000, help="合成数据的主题簇数")
+    parser.add_argument("--spread", type=float, default=0.08, help="簇内噪声标准差（每维）")
+    parser.add_argument("--batch", type=int, default=100000, help="每次追加的向量数")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=None)
+    parser.add_argument("--nprobe", default="1,4,8,16,32,64")
+    parser.add_argument("--target-nprobe", type=int, default=16)
+    parser.add_argument("--min-recall", type=float, default=0.9)
+    parser.add_argument("--delete-frac", type=float, default=0.01, help="删除（墓碑）比例")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    centers = rng.standard_normal((args.topics, args.dim), dtype=np.float32)
+    centers /= np.linalg.norm(centers, axis=1, keepdims=True)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = QuantizedVectorIndex(tmp, dim=args.dim, nlist=args.nlist)
+        exact = DenseIndex(args.dim)
+        append_s = []
+        for start in range(0, args.vectors, args.batch):
+            n = min(args.batch, args.vectors - start)
+            vectors = clustered_vectors(n, centers, args.spread, rng)
+            urls = [f"https://news.example.com/{i}" for i in range(start, start + n)]
+            s = time.perf_counter()
+            index.add(urls, vectors)
+            append_s.append(time.perf_counter() - s)
+            exact.add(vectors)
+
+        queries = clustered_vectors(args.queries, centers, args.spread, rng)
+        truth = [set(ids.tolist()) for ids, _ in exact.search(queries, args.k)]
+
+        sweep = {}
+        for nprobe in [int(p) for p in args.nprobe.split(",")]:
+            index.search(queries[:1], args.k, nprobe=nprobe)  # 预热（页缓存）
+            latencies, hits = [], 0
+            for query, expected in zip(queries, truth):
+                s = time.perf_counter()
+                (ids, _), = index.search(query[None, :], args.k, nprobe=nprobe)
+                latencies.append(time.perf_counter() - s)
+                hits += len(expected & set(ids.tolist()))
+            s = time.perf_counter()
+            index.search(queries[:32], args.k, nprobe=nprobe)
+            batched_ms = (time.perf_counter() - s) * 1000 / min(32, len(queries))
+            sweep[nprobe] = {
+                f"recall@{args.k}": round(hits / (args.k * len(queries)), 4),
+                "ms": _percentiles(latencies),
+                "batched_ms_per_query": round(batched_ms, 2),
+            }
+
+        # 墓碑删除：被删除的 URL 立即不再被召回
+        doomed = rng.choice(args.vectors, size=max(1, int(args.vectors * args.delete_frac)), replace=False)
+        s = time.perf_counter()
+        index.delete([f"https://news.example.com/{i}" for i in doomed])
+        delete_s = time.perf_counter() - s
+        doomed_ids = set(doomed.tolist())  # URL 序号与向量 ID 同序分配
+        leaked = sum(len(doomed_ids & set(ids.tolist()))
+                     for ids, _ in index.search(queries, args.k, nprobe=args.target_nprobe))
+        s = time.perf_counter()
+        purged = index.compact()
+        compact_s = time.perf_counter() - s
+
+        stats = index.stats()
+        report = {
+            "vectors": args.vectors,
+            "dim": args.dim,
+            "nlist": stats["nlist"],
+            "build_s": {"append_total": round(sum(append_s), 2), "append_max_batch": round(max(append_s), 2)},
+            "disk_mb": round(stats["disk_bytes"] / 2 ** 20, 1),
+            "float32_mb": round(args.vectors * args.dim * 4 / 2 ** 20, 1),
+            "nprobe": sweep,
+            "delete": {"deleted": len(doomed), "delete_s": round(delete_s, 3), "leaked_in_results": leaked,
+                       "compact_purged": purged, "compact_s": round(compact_s, 2)},
+        }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    target = sweep.get(args.target_nprobe, {}).get(f"recall@{args.k}", 1.0)
+    return 0 if target >= args.min_recall and leaked == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,46 +1,111 @@
 import json
 import os
-def load_api_key(key_name="DASHSCOPE_API_KEY"):
-    """
-    加载 API Key：
-    - key.json 永远存储在本 py 文件同一目录下
-    - 若不存在则要求用户输入并写入
-    """
+import sys
+import threading
+from typing import Optional, Dict
+
+from utils.telemetry import get_logger
+
+logger = get_logger(__name__)
 
-    # 当前 py 文件所在目录
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    key_path = os.path.join(base_dir, "key.json")
+# 代码中使用的键名 → 同样可接受的环境变量名（.env 中使用的是 NEWS_API_KEY）
+KEY_ALIASES = {
+    "NEW_API_KEY": ("NEWS_API_KEY",),
+}
+# 设为 1/true 时禁止交互式输入（cron / worker 进程）
+NON_INTERACTIVE_ENV = "NEWS_AGENTS_NONINTERACTIVE"
+# 交互输入为空时最多重新提示的次数，仍为空则按未配置处理（不写入 key.json）
+MAX_PROMPT_ATTEMPTS = 3
 
-    api_key = None
+_resolved_keys: Dict[str, str] = {}
+_file_data: Optional[Dict] = None
+_warned_missing = set()
+_lock = threading.Lock()
 
-    # 1. 如果 key.json 存在则读取
-    if os.path.exists(key_path):
-        try:
-            with open(key_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                api_key = data.get(key_name)
-        except Exception:
-            pass
 
-    # 2. 没找到 key，需要用户输入
-    if not api_key:
-        print(f"[需要] 请输入 {key_name}:")
-        api_key = input(">>> ").strip()
+def _key_path() -> str:
+    # key.json 永远存储在本 py 文件同一目录下
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "key.json")
 
-        # 准备写入数据
+
+def _read_key_file() -> Dict:
+    """key.json 在进程内只读取一次"""
+    global _file_data
+    if _file_data is None:
         data = {}
-        if os.path.exists(key_path):
+        if os.path.exists(_key_path()):
             try:
-                with open(key_path, "r", encoding="utf-8") as f:
+                with open(_key_path(), "r", encoding="utf-8") as f:
                     data = json.load(f)
             except Exception:
                 data = {}
+        _file_data = data
+    return _file_data
+
+
+def is_interactive() -> bool:
+    """仅当标准输入是终端且未设置非交互开关时，才允许提示用户输入"""
+    if os.getenv(NON_INTERACTIVE_ENV, "").strip().lower() in ("1", "true", "yes", "on"):
+        return False
+    return sys.stdin is not None and sys.stdin.isatty()
+
+
+def load_api_key(key_name="DASHSCOPE_API_KEY"):
+    """
+    加载 API Key（按需调用，结果在进程内缓存）：
+    1. 环境变量（含 KEY_ALIASES 中的别名）；
+    2. 与本文件同目录的 key.json（只读一次）；
+    3. 仍未找到时：交互式终端下要求用户输入并写入 key.json，
+       非交互环境（无终端或 NEWS_AGENTS_NONINTERACTIVE=1）直接返回 None，不阻塞进程；
+       输入为空时重新提示，多次为空则返回 None，空值不会写入 key.json。
+    """
+    if key_name in _resolved_keys:
+        return _resolved_keys[key_name]
+
+    with _lock:
+        if key_name in _resolved_keys:
+            return _resolved_keys[key_name]
+
+        # 1. 环境变量
+        api_key = None
+        for env_name in (key_name,) + KEY_ALIASES.get(key_name, ()):
+            api_key = os.getenv(env_name)
+            if api_key:
+                break
+
+        # 2. key.json
+        if not api_key:
+            api_key = _read_key_file().get(key_name)
+
+        # 3. 没找到 key
+        if not api_key:
+            if not is_interactive():
+                if key_name not in _warned_missing:
+                    _warned_missing.add(key_name)
+                    logger.warning(f"[缺失] 未配置 {key_name}（环境变量或 key.json），非交互模式下跳过输入")
+                return None
 
-        data[key_name] = api_key
+            for _ in range(MAX_PROMPT_ATTEMPTS):
+                print(f"[需要] 请输入 {key_name}:")
+                try:
+                    api_key = input(">>> ").strip()
+                except EOFError:
+                    break
+                if api_key:
+                    break
+                print("[无效] 输入为空，请重新输入")
+            if not api_key:
+                logger.warning(f"[缺失] 未输入 {key_name}，本次不保存")
+                return None
 
-        with open(key_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
+            # 准备写入数据
+            data = dict(_read_key_file())
+            data[key_name] = api_key
+            with open(_key_path(), "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=4)
+            _file_data.update(data)
 
-        print(f"[已保存] API Key 已写入: {key_path}")
+            print(f"[已保存] API Key 已写入: {_key_path()}")
 
-    return api_key
\ No newline at end of file
+        _resolved_keys[key_name] = api_key
+        return api_key
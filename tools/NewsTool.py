@@ -1,14 +1,74 @@
+import os
+import threading
 import requests
-from langchain.tools import Tool
-from langchain_openai import ChatOpenAI
+from concurrent.futures import Future, ThreadPoolExecutor
+from langchain_core.tools import Tool
 from config.load_key import load_api_key
-from typing import Dict
+from utils.content_cache import get_content_cache, normalize_url
+from utils.entity_store import get_entity_store, canonicalize_entity_name, EntityRecord, EMPTY_RESULT_TTL
+from utils.http_client import get_http_client, AsyncHttpClient
+from utils.model import NewsArticle
+from utils.telemetry import get_logger, propagate, span
+from typing import Dict, List, Iterator, Optional
 # --- 1. 定义新闻搜索函数 ---
-firecrawl_api_key=load_api_key("FIRECRAWL_API_KEY")
-NEW_API_KEY = load_api_key("NEW_API_KEY")
-JINA_API_KEY=load_api_key("JINA_API_KEY")
-SERP_API_KEY =  load_api_key("SERP_API_KEY")
-SEARCH_ENGINE_URL = "https://serpapi.com/search"  # SerpAPI 接口（免费版足够测试）
+# API Key 在首次使用时才加载（load_api_key 内部缓存），导入本模块不读文件、不阻塞输入
+# 各服务地址均可用同名环境变量覆盖（本地压测 / 离线基准指向 mock 服务）
+SEARCH_ENGINE_URL = os.getenv("SEARCH_ENGINE_URL", "https://serpapi.com/search")  # SerpAPI 接口（免费版足够测试）
+NEWS_API_URL = os.getenv("NEWS_API_URL", "https://newsapi.org/v2/everything")
+# 头条接口默认与 NEWS_API_URL 同一服务（替换最后一段路径），便于 mock / 代理时一并切换
+NEWS_TOP_HEADLINES_URL = os.getenv("NEWS_TOP_HEADLINES_URL", NEWS_API_URL.rsplit("/", 1)[0] + "/top-headlines")
+NEWS_HEADLINES_COUNTRY = os.getenv("NEWS_HEADLINES_COUNTRY", "us")
+logger = get_logger(__name__)
+
+
+def _build_news_params(
+    query: str,
+    search_in: str,
+    sources: str,
+    domains: str,
+    exclude_domains: str,
+    from_date: str,
+    to_date: str,
+    language: str,
+    sort_by: str,
+    page_size: int,
+    page: int,
+) -> Dict:
+    """构建 NewsAPI 请求参数字典（仅当参数有值时才添加，避免发送空字符串）"""
+    params = {
+        "q": query,
+        "searchIn": search_in,
+        "sortBy": sort_by,
+        "pageSize": page_size,
+        "page": page,
+    }
+    if sources:
+        params["sources"] = sources
+    if domains:
+        params["domains"] = domains
+    if exclude_domains:
+        params["excludeDomains"] = exclude_domains
+    if from_date:
+        params["from"] = from_date
+    if to_date:
+        params["to"] = to_date
+    if language:
+        params["language"] = language
+    return params
+
+
+def _request_news_page(params: Dict, url: str = NEWS_API_URL) -> Dict:
+    """请求一页 NewsAPI 结果，返回原始 JSON；HTTP 失败时抛出 requests 异常"""
+    headers = {
+        "X-Api-Key": load_api_key("NEW_API_KEY")
+    }
+    with span("tool.news_page", query=params.get("q"), page=params.get("page")) as sp:
+        response = get_http_client().get("newsapi", url, params=params, headers=headers, timeout=10)
+        response.raise_for_status()  # 如果请求失败则抛出异常
+        sp.set(bytes=len(response.content))
+        return response.json()
+
+
 def search_news(
     query: str,
     search_in: str = "title,description,content",
@@ -42,42 +102,25 @@ def search_news(
     """
     # 从环境变量获取 API Key，这是更安全的方式
 
-    if not NEW_API_KEY:
+    if not load_api_key("NEW_API_KEY"):
         return "错误：未设置 NEWS_API_KEY 环境变量。"
 
-    base_url = "https://newsapi.org/v2/everything"
-    
-    # 构建请求参数字典
-    params = {
-        "q": query,
-        "searchIn": search_in,
-        "sortBy": sort_by,
-        "pageSize": page_size,
-        "page": page,
-    }
+    with span("tool.search_news", query=query) as sp:
+        result = _search_news(_build_news_params(
+            query, search_in, sources, domains, exclude_domains,
+            from_date, to_date, language, sort_by, page_size, page,
+        ))
+        if isinstance(result, str):
+            sp.fail(result)
+        else:
+            sp.set(results=len(result))
+        return result
 
-    # 仅当参数有值时才添加到请求中，避免发送空字符串
-    if sources:
-        params["sources"] = sources
-    if domains:
-        params["domains"] = domains
-    if exclude_domains:
-        params["excludeDomains"] = exclude_domains
-    if from_date:
-        params["from"] = from_date
-    if to_date:
-        params["to"] = to_date
-    if language:
-        params["language"] = language
 
-    # 构建请求头
-    headers = {
-        "X-Api-Key": NEW_API_KEY
-    }
+def _search_news(params: Dict):
+    """请求一页结果并整理为字典列表；失败时返回错误说明字符串"""
     try:
-        response = requests.get(base_url, params=params, headers=headers, timeout=10)
-        response.raise_for_status()  # 如果请求失败则抛出异常
-        data = response.json()
+        data = _request_news_page(params)
 
         if data.get("status") != "ok":
             return f"API 请求失败: {data.get('message', '未知错误')}"
@@ -106,6 +149,128 @@ def search_news(
     except requests.exceptions.RequestException as e:
         return f"请求新闻 API 时发生错误: {str(e)}"
 
+
+def _article_to_model(article: Dict) -> NewsArticle:
+    """NewsAPI 原始文章 → 标准 NewsArticle 模型"""
+    return NewsArticle(
+        url=article.get("url", ""),
+        title=article.get("title"),
+        published_at=article.get("publishedAt"),
+        source=(article.get("source") or {}).get("name"),
+        raw_metadata=article,
+    )
+
+
+def iter_news(
+    query: str,
+    search_in: str = "title,description,content",
+    sources: str = "",
+    domains: str = "",
+    exclude_domains: str = "",
+    from_date: str = "",
+    to_date: str = "",
+    language: str = "",
+    sort_by: str = "publishedAt",
+    page_size: int = 100,
+    max_results: Optional[int] = None,
+    prefetch: bool = True,
+) -> Iterator[NewsArticle]:
+    """
+    流式分页搜索新闻：逐页懒加载，按 URL 跨页去重，逐条产出 NewsArticle。
+    参数与 search_news 相同，另外：
+        max_results (int): 最多产出的文章数，None 表示取完为止。
+        prefetch (bool): 消费当前页时，在后台线程中并发请求下一页。
+    当 sort_by="publishedAt"（新到旧）且文章时间早于 from_date 时提前结束。
+    请求失败时打印错误并结束迭代（已产出的文章不受影响）。
+    """
+    if not load_api_key("NEW_API_KEY"):
+        logger.error("错误：未设置 NEWS_API_KEY 环境变量。")
+        return
+
+    def _fetch(page: int) -> Dict:
+        return _request_news_page(_build_news_params(
+            query, search_in, sources, domains, exclude_domains,
+            from_date, to_date, language, sort_by, page_size, page,
+        ))
+
+    seen = set()
+    produced = 0
+    fetched = 0
+    page = 1
+    executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+    try:
+        pending = executor.submit(propagate(_fetch), page) if executor else None
+        while True:
+            try:
+                data = pending.result() if executor else _fetch(page)
+            except (requests.exceptions.RequestException, ValueError) as e:
+                logger.error(f"请求新闻 API 时发生错误（第 {page} 页）: {str(e)}")
+                return
+            if data.get("status") != "ok":
+                logger.error(f"API 请求失败: {data.get('message', '未知错误')}")
+                return
+
+            articles = data.get("articles", [])
+            fetched += len(articles)
+            total_results = data.get("totalResults", 0)
+            has_next = len(articles) == page_size and fetched < total_results
+            # 先把下一页请求发出去，再处理当前页；当前页大概率已够数时不预取，避免浪费配额
+            prefetched = bool(executor and has_next and (
+                max_results is None or produced + len(articles) < max_results
+            ))
+            if prefetched:
+                pending = executor.submit(propagate(_fetch), page + 1)
+
+            for article in articles:
+                published_at = article.get("publishedAt") or ""
+                if sort_by == "publishedAt" and from_date and published_at and published_at[:len(from_date)] < from_date:
+                    return
+                url = article.get("url")
+                if not url:
+                    continue
+                key = normalize_url(url)
+                if key in seen:
+                    continue
+                seen.add(key)
+                yield _article_to_model(article)
+                produced += 1
+                if max_results is not None and produced >= max_results:
+                    return
+
+            if not has_next:
+                return
+            page += 1
+            if executor and not prefetched:
+                pending = executor.submit(propagate(_fetch), page)
+    finally:
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def top_headlines(country: str = NEWS_HEADLINES_COUNTRY, category: str = "", page_size: int = 20) -> List[NewsArticle]:
+    """
+    NewsAPI 头条（/v2/top-headlines）：没有搜索关键词时使用（例如“今天有什么新闻”）。
+    请求失败时打印错误并返回空列表。
+    """
+    if not load_api_key("NEW_API_KEY"):
+        logger.error("错误：未设置 NEWS_API_KEY 环境变量。")
+        return []
+    params = {"pageSize": page_size, "page": 1}
+    if country:
+        params["country"] = country
+    if category:
+        params["category"] = category
+    try:
+        data = _request_news_page(params, NEWS_TOP_HEADLINES_URL)
+    except (requests.exceptions.RequestException, ValueError) as e:
+        logger.error(f"请求新闻头条时发生错误: {str(e)}")
+        return []
+    if data.get("status") != "ok":
+        logger.error(f"API 请求失败: {data.get('message', '未知错误')}")
+        return []
+    return [_article_to_model(a) for a in data.get("articles", []) if a.get("url")]
+
+
 # --- 2. 创建 LangChain Tool 对象 ---
 # 注意：这里的 description 非常关键，它需要清晰地告诉 LLM 这个工具的作用和各个参数的含义。
 # LLM 会根据这个描述来决定是否调用工具，以及如何构造参数。
@@ -129,40 +294,112 @@ news_search_tool = Tool(
     """
 )
 # ======================== 3. 你的工具函数（封装为 LangChain Tool）========================
-def extract_news_original_content(url: str) -> str:
-    """提取新闻原文（已过滤广告/导航）"""
-    if not url.startswith(("http://", "https://")):
-        return "错误：请输入有效的新闻 URL（需以 http:// 或 https:// 开头）"
-    
-    jina_url = f"https://r.jina.ai/{url}"
-    headers = {
-        "Authorization": f"Bearer {JINA_API_KEY}",
+JINA_READER_URL = os.getenv("JINA_READER_URL", "https://r.jina.ai/")
+MAX_CONTENT_CHARS = 25000  # 作为 Tool 直接交给 LLM 时的默认截断长度
+
+
+def _jina_headers() -> Dict[str, str]:
+    return {
+        "Authorization": f"Bearer {load_api_key('JINA_API_KEY')}",
         "X-Respond-With": "readerlm-v2",
         "X-Retain-Images": "none",
         "Accept": "application/json"
     }
 
-    try:
-        response = requests.get(jina_url, headers=headers, timeout=90)
-        response.raise_for_status()
-        result = response.json()
-        
-        original_content = result.get("data", {}).get("content", "") or result.get("content", "")
-        if not original_content:
-            return "错误：未提取到新闻原文"
-        
-        max_chars = 25000
-        if len(original_content) > max_chars:
-            original_content = original_content[:max_chars] + "\n\n...（内容过长，已保留核心部分）..."
-        
-        return original_content.strip()
-
-    except requests.exceptions.Timeout:
-        return f"错误：请求超时，无法访问网页 {url}"
-    except requests.exceptions.RequestException as e:
-        return f"错误：提取原文失败，原因：{str(e)}"
-    except ValueError:
-        return "错误：Jina 返回格式异常，无法解析"
+
+def _parse_jina_result(result: Dict) -> str:
+    return result.get("data", {}).get("content", "") or result.get("content", "")
+
+
+def _truncate_content(original_content: str, max_chars: Optional[int] = MAX_CONTENT_CHARS) -> str:
+    if max_chars and len(original_content) > max_chars:
+        original_content = original_content[:max_chars] + "\n\n...（内容过长，已保留核心部分）..."
+    return original_content.strip()
+
+
+def extract_news_original_content(url: str, use_cache: bool = True, max_chars: Optional[int] = MAX_CONTENT_CHARS) -> str:
+    """
+    提取新闻原文（已过滤广告/导航），优先读取本地原文缓存。
+    max_chars 为返回内容的截断长度，None 表示返回全文（供分块总结使用）。
+    """
+    if not url.startswith(("http://", "https://")):
+        return "错误：请输入有效的新闻 URL（需以 http:// 或 https:// 开头）"
+
+    with span("tool.extract_news_original_content", url=url) as sp:
+        cache = get_content_cache() if use_cache else None
+        original_content = cache.get(url) if cache else None
+        if cache:
+            sp.set(cache="hit" if original_content is not None else "miss")
+
+        if original_content is None:
+            try:
+                response = get_http_client().get("jina", f"{JINA_READER_URL}{url}", headers=_jina_headers(), timeout=90)
+                response.raise_for_status()
+                sp.set(bytes=len(response.content))
+                original_content = _parse_jina_result(response.json())
+                if not original_content:
+                    sp.fail("empty content")
+                    return "错误：未提取到新闻原文"
+                # 缓存完整原文（截断在读取后进行，便于后续调整长度策略）
+                if cache:
+                    cache.set(url, original_content)
+
+            except requests.exceptions.Timeout:
+                sp.fail("timeout")
+                return f"错误：请求超时，无法访问网页 {url}"
+            except requests.exceptions.RequestException as e:
+                sp.fail(e)
+                return f"错误：提取原文失败，原因：{str(e)}"
+            except ValueError:
+                sp.fail("invalid json")
+                return "错误：Jina 返回格式异常，无法解析"
+
+        sp.set(chars=len(original_content))
+        return _truncate_content(original_content, max_chars)
+
+
+async def aextract_news_original_content(
+    url: str,
+    client: AsyncHttpClient,
+    use_cache: bool = True,
+    max_chars: Optional[int] = MAX_CONTENT_CHARS,
+) -> str:
+    """extract_news_original_content 的异步版本：通过共享的异步连接池请求 Jina"""
+    import httpx
+
+    if not url.startswith(("http://", "https://")):
+        return "错误：请输入有效的新闻 URL（需以 http:// 或 https:// 开头）"
+
+    with span("tool.extract_news_original_content", url=url, mode="async") as sp:
+        cache = get_content_cache() if use_cache else None
+        original_content = cache.get(url) if cache else None
+        if cache:
+            sp.set(cache="hit" if original_content is not None else "miss")
+
+        if original_content is None:
+            try:
+                response = await client.get("jina", f"{JINA_READER_URL}{url}", headers=_jina_headers(), timeout=90)
+                response.raise_for_status()
+                sp.set(bytes=len(response.content))
+                original_content = _parse_jina_result(response.json())
+                if not original_content:
+                    sp.fail("empty content")
+                    return "错误：未提取到新闻原文"
+                if cache:
+                    cache.set(url, original_content)
+
+            except httpx.TimeoutException:
+                sp.fail("timeout")
+                return f"错误：请求超时，无法访问网页 {url}"
+            except httpx.HTTPError as e:
+                sp.fail(e)
+                return f"错误：提取原文失败，原因：{str(e)}"
+            except ValueError:
+                sp.fail("invalid json")
+                return "错误：Jina 返回格式异常，无法解析"
+
+        sp.set(chars=len(original_content))
+        return _truncate_content(original_content, max_chars)
 
 # 封装为 LangChain Tool（便于 Agent 管理，不影响核心逻辑）
 news_extract_tool = Tool(
@@ -171,69 +408,156 @@ news_extract_tool = Tool(
     description="提取新闻网页的纯净原文，自动过滤广告、导航栏等冗余内容，仅支持新闻类 URL"
 )
 # ======================== 2. 工具函数：搜索引擎调用 ========================
+def _render_knowledge_card(entity_name: str, search_result: Dict) -> str:
+    """将 SerpAPI 搜索结果整理为知识卡片文本（优先知识图谱，无则取前3条搜索结果摘要）"""
+    knowledge_card = ""
+
+    # 1. 提取知识图谱（结构化信息）
+    if "knowledge_graph" in search_result:
+        kg = search_result["knowledge_graph"]
+        knowledge_card += f"【实体名称】{kg.get('title', entity_name)}\n"
+        if "type" in kg:
+            knowledge_card += f"【实体类型】{kg['type']}\n"
+        if "description" in kg:
+            knowledge_card += f"【核心描述】{kg['description'][:500]}...\n"
+        if "website" in kg:
+            knowledge_card += f"【官方链接】{kg['website']}\n"
+        if "founding_date" in kg:
+            knowledge_card += f"【成立时间】{kg['founding_date']}\n"
+        if "headquarters" in kg:
+            knowledge_card += f"【总部/所在地】{kg['headquarters']}\n"
+
+    # 2. 若无知识图谱，提取有机结果摘要
+    elif "organic_results" in search_result and len(search_result["organic_results"]) > 0:
+        knowledge_card += f"【实体名称】{entity_name}\n"
+        knowledge_card += f"【核心描述】\n"
+        for i, res in enumerate(search_result["organic_results"][:3], 1):
+            snippet = res.get("snippet", "无摘要")
+            knowledge_card += f"{i}. {snippet[:200]}...\n"
+        knowledge_card += f"【搜索提示】未找到结构化知识图谱，以上为相关搜索摘要\n"
+
+    else:
+        knowledge_card = f"【实体名称】{entity_name}\n【核心描述】未搜索到相关有效信息"
+
+    return knowledge_card.strip()
+
+
+# 正在请求中的实体（规范化名称 → Future）：同一实体的并发未命中只发一次 SerpAPI 请求，其余调用等待同一结果
+_entity_inflight: Dict[str, Future] = {}
+_entity_inflight_lock = threading.Lock()
+
+
+def fetch_entity_record(entity_name: str, use_store: bool = True) -> EntityRecord:
+    """
+    获取实体记录：先查本地实体库（内存命中，无网络），未命中再调用 SerpAPI，
+    并把原始 knowledge_graph 与渲染好的卡片文本一起写回实体库。
+    同一实体的并发未命中合并为一次请求（例如流水线中实体查询分支与 KG worker 同时查询同一实体）。
+    网络/解析异常直接抛出，由调用方决定如何降级。
+    """
+    store = get_entity_store()
+    with span("tool.fetch_entity_record", entity=entity_name) as sp:
+        if not use_store:
+            return _request_entity_record(entity_name, sp)
+
+        record = store.get(entity_name)
+        sp.set(cache="hit" if record is not None else "miss")
+        if record is not None:
+            return record
+
+        key = canonicalize_entity_name(entity_name)
+        with _entity_inflight_lock:
+            future = _entity_inflight.get(key)
+            leader = future is None
+            if leader:
+                future = _entity_inflight[key] = Future()
+        if not leader:
+            sp.set(cache="coalesced")
+            return future.result()
+        try:
+            # 上一个请求可能恰好在本次查库之后完成，成为请求方后再查一次
+            record = store.get(entity_name) or _request_entity_record(entity_name, sp)
+            future.set_result(record)
+            return record
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with _entity_inflight_lock:
+                _entity_inflight.pop(key, None)
+
+
+def _request_entity_record(entity_name: str, sp) -> EntityRecord:
+    """调用 SerpAPI 获取实体并写回实体库（只有实体库未命中时才需要 SERP_API_KEY）"""
+    api_key = load_api_key("SERP_API_KEY")
+    if not api_key:
+        raise EnvironmentError("请在 .env 中设置 SERP_API_KEY")
+    # SerpAPI 搜索（可替换为百度搜索 API、必应 API 等）
+    params = {
+        "q": entity_name,
+        "api_key": api_key,
+        "engine": "google",  # 可选：baidu（需配置对应 engine）
+        "hl": "zh-CN",
+        "gl": "cn",
+        "fields": "knowledge_graph,organic_results"  # 一次请求同时满足卡片文本与图谱 JSON
+    }
+    response = get_http_client().get("serpapi", SEARCH_ENGINE_URL, params=params, timeout=30)
+    response.raise_for_status()
+    sp.set(bytes=len(response.content))
+    search_result = response.json()
+
+    knowledge_graph = search_result.get("knowledge_graph", {})
+    card_text = _render_knowledge_card(entity_name, search_result)
+    ttl = None if knowledge_graph or search_result.get("organic_results") else EMPTY_RESULT_TTL
+    return get_entity_store().put(entity_name, knowledge_graph, card_text, ttl=ttl)
+
+
+def warm_entity_store(entity_names: List[str], max_workers: int = 4) -> Dict[str, int]:
+    """批量预热实体库：只请求库中缺失或已过期的实体，返回成功/失败计数"""
+    store = get_entity_store()
+    pending = list(dict.fromkeys(store.missing(entity_names)))
+    stats = {"requested": len(entity_names), "fetched": 0, "failed": 0}
+    if not pending:
+        return stats
+
+    logger.info(f"正在预热实体库：{len(pending)} 个实体待获取")
+
+    def _fetch(name: str) -> bool:
+        try:
+            fetch_entity_record(name, use_store=False)
+            return True
+        except Exception as e:
+            logger.warning(f"预热实体失败：{name}，原因：{str(e)[:100]}")
+            return False
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for ok in executor.map(propagate(_fetch), pending):
+            stats["fetched" if ok else "failed"] += 1
+    return stats
+
+
 def search_entity_info(entity_name: str) -> str:
     """
     调用搜索引擎获取实体的核心信息（用于生成知识卡片）
-    支持：公司、人物、政策、事件等实体
+    支持：公司、人物、政策、事件等实体；已知实体直接从本地实体库返回
     """
     if not entity_name or len(entity_name) < 2:
         return "错误：实体名称无效"
     
-    print(f"正在搜索实体：{entity_name}")
+    logger.info(f"正在搜索实体：{entity_name}")
     
-    try:
-        # SerpAPI 搜索（可替换为百度搜索 API、必应 API 等）
-        params = {
-            "q": entity_name,
-            "api_key": SERP_API_KEY,
-            "engine": "google",  # 可选：baidu（需配置对应 engine）
-            "hl": "zh-CN",
-            "gl": "cn",
-            "fields": "knowledge_graph,organic_results"  # 优先获取知识图谱
-        }
-        
-        response = requests.get(SEARCH_ENGINE_URL, params=params, timeout=30)
-        response.raise_for_status()
-        search_result = response.json()
-        
-        # 提取核心信息（优先知识图谱，无则取前3条搜索结果摘要）
-        knowledge_card = ""
-        
-        # 1. 提取知识图谱（结构化信息）
-        if "knowledge_graph" in search_result:
-            kg = search_result["knowledge_graph"]
-            knowledge_card += f"【实体名称】{kg.get('title', entity_name)}\n"
-            if "type" in kg:
-                knowledge_card += f"【实体类型】{kg['type']}\n"
-            if "description" in kg:
-                knowledge_card += f"【核心描述】{kg['description'][:500]}...\n"
-            if "website" in kg:
-                knowledge_card += f"【官方链接】{kg['website']}\n"
-            if "founding_date" in kg:
-                knowledge_card += f"【成立时间】{kg['founding_date']}\n"
-            if "headquarters" in kg:
-                knowledge_card += f"【总部/所在地】{kg['headquarters']}\n"
-        
-        # 2. 若无知识图谱，提取有机结果摘要
-        elif "organic_results" in search_result and len(search_result["organic_results"]) > 0:
-            knowledge_card += f"【实体名称】{entity_name}\n"
-            knowledge_card += f"【核心描述】\n"
-            for i, res in enumerate(search_result["organic_results"][:3], 1):
-                snippet = res.get("snippet", "无摘要")
-                knowledge_card += f"{i}. {snippet[:200]}...\n"
-            knowledge_card += f"【搜索提示】未找到结构化知识图谱，以上为相关搜索摘要\n"
-        
-        else:
-            knowledge_card = f"【实体名称】{entity_name}\n【核心描述】未搜索到相关有效信息"
-        
-        return knowledge_card.strip()
-    
-    except requests.exceptions.Timeout:
-        return f"【实体名称】{entity_name}\n【错误】搜索超时，未获取到信息"
-    except requests.exceptions.RequestException as e:
-        return f"【实体名称】{entity_name}\n【错误】搜索失败：{str(e)[:100]}"
-    except Exception as e:
-        return f"【实体名称】{entity_name}\n【错误】解析搜索结果失败：{str(e)[:100]}"
+    with span("tool.search_entity_info", entity=entity_name) as sp:
+        try:
+            return fetch_entity_record(entity_name).card_text
+
+        except requests.exceptions.Timeout:
+            sp.fail("timeout")
+            return f"【实体名称】{entity_name}\n【错误】搜索超时，未获取到信息"
+        except requests.exceptions.RequestException as e:
+            sp.fail(e)
+            return f"【实体名称】{entity_name}\n【错误】搜索失败：{str(e)[:100]}"
+        except Exception as e:
+            sp.fail(e)
+            return f"【实体名称】{entity_name}\n【错误】解析搜索结果失败：{str(e)[:100]}"
 # ======================== 3. 封装为 LangChain 标准 Tool ========================
 entity_search_tool = Tool(
     name="search_entity_info",  # Tool 名称（必须唯一）
@@ -245,21 +569,9 @@ entity_search_tool = Tool(
     return_direct=False  # 是否直接返回结果（默认 False，可在 Chain 中进一步处理）
 )
 def get_serp_json(entity_name: str) -> Dict:
-    """调用 SerpAPI 获取实体知识图谱 JSON"""
-    if not SERP_API_KEY:
-        raise EnvironmentError("请在 .env 中设置 SERP_API_KEY")
-    
-    params = {
-        "api_key": SERP_API_KEY,
-        "engine": "google",
-        "q": entity_name,
-        "hl": "zh-CN",
-        "gl": "cn",
-        "fields": "knowledge_graph"
-    }
-    response = requests.get("https://serpapi.com/search", params=params, timeout=30)
-    response.raise_for_status()
-    return response.json().get("knowledge_graph", {})
+    """调用 SerpAPI 获取实体知识图谱 JSON（已知实体直接从本地实体库返回，无需 SERP_API_KEY）"""
+    with span("tool.get_serp_json", entity=entity_name):
+        return fetch_entity_record(entity_name).knowledge_graph
 entity_json_tool=Tool(
     name="entity_json_tool",
     func=get_serp_json,
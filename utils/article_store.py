@@ -0,0 +1,145 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from utils.content_cache import normalize_url
+from utils.model import NewsArticle
+
+# 文章状态：summarized=已完成总结；rejected=被过滤为非新闻（同样记录，避免下次重复判断）
+STATUS_SUMMARIZED = "summarized"
+STATUS_REJECTED = "rejected"
+
+
+class ArticleStore:
+    """
+    已处理新闻的持久化存储（SQLite）：
+    - articles：以规范化 URL 为主键，保存元数据、原文与总结；
+    - watermarks：每个查询已处理到的 publishedAt 水位；
+    - commit() 在同一事务中写入本轮结果与新水位，进程中途退出不会出现"水位前进但结果丢失"。
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or os.path.join(os.getcwd(), "data", "store", "news_articles.sqlite")
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS articles (
+                url_key      TEXT PRIMARY KEY,
+                url          TEXT NOT NULL,
+                title        TEXT,
+                source       TEXT,
+                published_at TEXT,
+                content      TEXT,
+                summary      TEXT,
+                status       TEXT NOT NULL,
+                query        TEXT,
+                ingested_at  REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_articles_published ON articles(published_at);
+            CREATE TABLE IF NOT EXISTS watermarks (
+                query        TEXT PRIMARY KEY,
+                published_at TEXT NOT NULL,
+                updated_at   REAL NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+
+    def get_watermark(self, query: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT published_at FROM watermarks WHERE query = ?", (query,)).fetchone()
+        return row[0] if row else None
+
+    def known_urls(self, urls: Iterable[str]) -> Set[str]:
+        """返回已入库（含被过滤）的规范化 URL 集合"""
+        keys = list({normalize_url(u) for u in urls if u})
+        found = set()
+        with self._lock:
+            for start in range(0, len(keys), 500):  # SQLite 单条语句参数个数有限制
+                batch = keys[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT url_key FROM articles WHERE url_key IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                found.update(r[0] for r in rows)
+        return found
+
+    def get(self, url: str) -> Optional[Dict]:
+        with self._lock:
+            cursor = self._conn.execute("SELECT * FROM articles WHERE url_key = ?", (normalize_url(url),))
+            row = cursor.fetchone()
+            columns = [c[0] for c in cursor.description]
+        return dict(zip(columns, row)) if row else None
+
+    def iter_articles(self, status: str = STATUS_SUMMARIZED, batch_size: int = 1000) -> Iterator[Dict]:
+        """按主键分批遍历指定状态的文章（不会一次性载入全部记录）"""
+        last_key = ""
+        while True:
+            with self._lock:
+                cursor = self._conn.execute(
+                    "SELECT * FROM articles WHERE status = ? AND url_key > ? ORDER BY url_key LIMIT ?",
+                    (status, last_key, batch_size),
+                )
+                rows = cursor.fetchall()
+                columns = [c[0] for c in cursor.description]
+            if not rows:
+                return
+            for row in rows:
+                yield dict(zip(columns, row))
+            last_key = rows[-1][0]
+
+    def commit(
+        self,
+        query: str,
+        summarized: List[Tuple[NewsArticle, str]],
+        rejected: List[NewsArticle],
+        watermark: Optional[str],
+    ) -> None:
+        """单个事务写入：已总结文章、被过滤文章、新水位（水位只前进不后退）"""
+        now = time.time()
+        rows = [
+            (normalize_url(a.url), a.url, a.title, a.source, a.published_at, a.core_content, summary,
+             STATUS_SUMMARIZED, query, now)
+            for a, summary in summarized
+        ] + [
+            (normalize_url(a.url), a.url, a.title, a.source, a.published_at, None, None, STATUS_REJECTED, query, now)
+            for a in rejected
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO articles (url_key, url, title, source, published_at, content, summary, "
+                "status, query, ingested_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            if watermark:
+                self._conn.execute(
+                    "INSERT INTO watermarks (query, published_at, updated_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(query) DO UPDATE SET published_at = excluded.published_at, "
+                    "updated_at = excluded.updated_at WHERE excluded.published_at > watermarks.published_at",
+                    (query, watermark, now),
+                )
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM articles GROUP BY status").fetchall())
+            queries = self._conn.execute("SELECT COUNT(*) FROM watermarks").fetchone()[0]
+        return {"articles": counts, "queries": queries}
+
+
+# ======================== 进程级共享实例 ========================
+_default_store: Optional[ArticleStore] = None
+_default_store_lock = threading.Lock()
+
+
+def get_article_store() -> ArticleStore:
+    """获取进程内共享的文章存储实例（首次调用时创建）"""
+    global _default_store
+    if _default_store is None:
+        with _default_store_lock:
+            if _default_store is None:
+                _default_store = ArticleStore()
+    return _default_store
@@ -0,0 +1,166 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, Dict
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# ======================== 1. URL 规范化 ========================
+# 常见的追踪参数：不同渠道转发同一篇文章时只有这些参数不同
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "yclid", "igshid", "mc_cid", "mc_eid",
+    "spm", "share_token", "ref", "ref_src", "cmpid", "ocid", "smid",
+}
+TRACKING_PREFIXES = ("utm_", "_hs", "mkt_", "pk_")
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    """
+    将 URL 规范化为缓存键：
+    - scheme / host 小写，去掉默认端口；
+    - 去掉追踪参数（utm_*、fbclid 等）与 #fragment；
+    - 剩余查询参数按名称排序，保证参数顺序不同的 URL 命中同一条缓存。
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+
+    query = [
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in TRACKING_PARAMS and not k.lower().startswith(TRACKING_PREFIXES)
+    ]
+    query.sort()
+    path = parts.path or "/"
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+
+# ======================== 2. SQLite 原文缓存 ========================
+class ContentCache:
+    """
+    新闻原文本地缓存（SQLite）：
+    - 以规范化 URL 为键，保存提取到的原文；
+    - 超过 ttl 秒的记录视为过期；
+    - 总大小超过 max_bytes 时按最近访问时间（LRU）淘汰；
+    - 记录命中/未命中次数，便于评估节省的提取调用。
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        ttl: float = 7 * 24 * 3600,
+        max_bytes: int = 512 * 1024 * 1024,
+    ):
+        self.db_path = db_path or os.path.join(os.getcwd(), "data", "cache", "news_content.sqlite")
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # 批量模式会在线程池里并发调用，连接需跨线程共享（由 _lock 串行化）
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS content_cache (
+                url_key     TEXT PRIMARY KEY,
+                url         TEXT NOT NULL,
+                content     TEXT NOT NULL,
+                size        INTEGER NOT NULL,
+                created_at  REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_content_last_access ON content_cache(last_access)")
+        self._conn.commit()
+
+    def get(self, url: str) -> Optional[str]:
+        """读取缓存；未命中或已过期返回 None"""
+        key = normalize_url(url)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content, created_at FROM content_cache WHERE url_key = ?", (key,)
+            ).fetchone()
+            if row is None or (self.ttl and now - row[1] > self.ttl):
+                if row is not None:
+                    self._conn.execute("DELETE FROM content_cache WHERE url_key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE content_cache SET last_access = ? WHERE url_key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def set(self, url: str, content: str) -> None:
+        """写入缓存，并在超出容量时执行 LRU 淘汰"""
+        key = normalize_url(url)
+        now = time.time()
+        size = len(content.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO content_cache (url_key, url, content, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, url, content, size, now, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """先清理过期记录，再按 last_access 从旧到新淘汰直到总大小回到上限内（调用方持有锁）"""
+        if self.ttl:
+            self._conn.execute("DELETE FROM content_cache WHERE created_at < ?", (time.time() - self.ttl,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM content_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        overflow = total - self.max_bytes
+        freed = 0
+        victims = []
+        for url_key, size in self._conn.execute("SELECT url_key, size FROM content_cache ORDER BY last_access ASC"):
+            victims.append((url_key,))
+            freed += size
+            if freed >= overflow:
+                break
+        self._conn.executemany("DELETE FROM content_cache WHERE url_key = ?", victims)
+
+    def stats(self) -> Dict[str, float]:
+        """返回命中统计与当前占用"""
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM content_cache"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": count,
+            "bytes": total,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM content_cache")
+            self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+
+# ======================== 3. 进程级共享实例 ========================
+_default_cache: Optional[ContentCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_content_cache() -> ContentCache:
+    """获取进程内共享的原文缓存实例（首次调用时创建）"""
+    global _default_cache
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                _default_cache = ContentCache()
+    return _default_cache
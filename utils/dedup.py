@@ -0,0 +1,296 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+import zlib
+from typing import Optional, Dict, List, Tuple
+
+import numpy as np
+
+from utils.content_cache import normalize_url
+
+# ======================== 1. 文本 → MinHash 签名 ========================
+_NON_WORD_RE = re.compile(r"[\W_]+", re.UNICODE)
+# NewsAPI 标题常带 " - 来源" 后缀，同一通稿在不同媒体只差这一段
+_TITLE_SOURCE_SUFFIX_RE = re.compile(r"\s+[-|–—]\s+[^-|–—]{1,40}$")
+
+_HASH_PRIME = np.uint64(4294967311)  # 大于 2^32 的素数
+_MAX_HASH = np.uint64(4294967295)
+
+
+def normalize_text(text: str) -> str:
+    """NFKC → 小写 → 去掉空白与标点，使中英文都可直接做字符 shingle"""
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    return _NON_WORD_RE.sub("", text)
+
+
+def normalize_title(title: str) -> str:
+    return normalize_text(_TITLE_SOURCE_SUFFIX_RE.sub("", title or ""))
+
+
+def shingles(text: str, k: int) -> List[int]:
+    """字符 k-gram（对中文无需分词）→ 稳定的 32 位哈希（crc32，跨进程一致）"""
+    if len(text) <= k:
+        return [zlib.crc32(text.encode("utf-8"))] if text else []
+    return list({zlib.crc32(text[i:i + k].encode("utf-8")) for i in range(len(text) - k + 1)})
+
+
+class MinHasher:
+    """固定种子的 MinHash：同一参数下签名跨运行可比，便于增量索引持久化"""
+
+    def __init__(self, num_perm: int = 64, seed: int = 20240501):
+        rng = np.random.default_rng(seed)
+        # a、b < 2^32 且哈希值 < 2^32，a*x+b 不会溢出 uint64
+        self.a = rng.integers(1, _MAX_HASH, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, _MAX_HASH, size=num_perm, dtype=np.uint64)
+        self.num_perm = num_perm
+
+    def signature(self, hashes: List[int]) -> np.ndarray:
+        if not hashes:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+        x = np.asarray(hashes, dtype=np.uint64)
+        return ((self.a[:, None] * x[None, :] + self.b[:, None]) % _HASH_PRIME).min(axis=1)
+
+
+def estimate_jaccard(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+    return float(np.mean(sig_a == sig_b))
+
+
+# ======================== 2. 持久化 LSH 近重复索引 ========================
+class NearDuplicateIndex:
+    """
+    MinHash-LSH 近重复索引（SQLite 持久化，可跨批次增量维护）：
+    - 签名按 bands 切段，任一段完全相同即为候选，再用签名估算 Jaccard 复核；
+    - 每篇文档归属一个簇（cluster_id 为首篇文档的 ID），簇内首篇为代表；
+    - 规范化后短于 shingle_size 的文本（如空标题）无法可靠比较，自成一簇且不进入 LSH 桶；
+    - max_age（秒）设置后，早于该时间加入的文档不再参与匹配，并在打开索引时清理。
+    namespace 区分标题索引与正文索引，两者共用一个数据库文件。
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        db_path: Optional[str] = None,
+        shingle_size: int = 5,
+        threshold: float = 0.7,
+        num_perm: int = 64,
+        bands: int = 16,
+        max_age: Optional[float] = None,
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm 必须能被 bands 整除")
+        self.namespace = namespace
+        self.db_path = db_path or os.path.join(os.getcwd(), "data", "cache", "dedup_index.sqlite")
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self.shingle_size = shingle_size
+        self.threshold = threshold
+        self.max_age = max_age
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS dedup_docs (
+                namespace  TEXT NOT NULL,
+                doc_id     TEXT NOT NULL,
+                cluster_id TEXT NOT NULL,
+                signature  BLOB NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (namespace, doc_id)
+            );
+            CREATE INDEX IF NOT EXISTS idx_dedup_cluster ON dedup_docs(namespace, cluster_id);
+            CREATE TABLE IF NOT EXISTS dedup_lsh (
+                namespace TEXT NOT NULL,
+                band      INTEGER NOT NULL,
+                bucket    BLOB NOT NULL,
+                doc_id    TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_dedup_lsh ON dedup_lsh(namespace, band, bucket);
+            """
+        )
+        self._conn.commit()
+        self.prune()
+
+    def _cutoff(self) -> float:
+        return time.time() - self.max_age if self.max_age else 0.0
+
+    def prune(self) -> int:
+        """删除超出 max_age 的文档及其 LSH 桶，返回删除的文档数；未设置 max_age 时不做任何事"""
+        if not self.max_age:
+            return 0
+        with self._lock:
+            stale = [r[0] for r in self._conn.execute(
+                "SELECT doc_id FROM dedup_docs WHERE namespace = ? AND created_at < ?", (self.namespace, self._cutoff())
+            )]
+        self.remove(stale)
+        return len(stale)
+
+    def signature(self, text: str) -> np.ndarray:
+        return self.hasher.signature(shingles(text, self.shingle_size))
+
+    def _buckets(self, sig: np.ndarray) -> List[Tuple[int, bytes]]:
+        return [(band, sig[band * self.rows:(band + 1) * self.rows].tobytes()) for band in range(self.bands)]
+
+    def query(self, text: str, sig: Optional[np.ndarray] = None) -> Optional[Tuple[str, float]]:
+        """返回最相似的已有文档所在簇及估算相似度；无满足阈值的候选（或文本过短）返回 None"""
+        if len(text) < self.shingle_size:
+            return None
+        sig = self.signature(text) if sig is None else sig
+        best = None
+        cutoff = self._cutoff()
+        with self._lock:
+            candidates = set()
+            for band, bucket in self._buckets(sig):
+                for (doc_id,) in self._conn.execute(
+                    "SELECT doc_id FROM dedup_lsh WHERE namespace = ? AND band = ? AND bucket = ?",
+                    (self.namespace, band, bucket),
+                ):
+                    candidates.add(doc_id)
+            for doc_id in candidates:
+                row = self._conn.execute(
+                    "SELECT cluster_id, signature FROM dedup_docs WHERE namespace = ? AND doc_id = ? AND created_at >= ?",
+                    (self.namespace, doc_id, cutoff),
+                ).fetchone()
+                if row is None:
+                    continue
+                score = estimate_jaccard(sig, np.frombuffer(row[1], dtype=np.uint64))
+                if score >= self.threshold and (best is None or score > best[1]):
+                    best = (row[0], score)
+        return best
+
+    def lookup(self, doc_id: str) -> Optional[str]:
+        """doc_id 在有效期内已被索引时返回其簇 ID，否则返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT cluster_id FROM dedup_docs WHERE namespace = ? AND doc_id = ? AND created_at >= ?",
+                (self.namespace, doc_id, self._cutoff()),
+            ).fetchone()
+        return row[0] if row else None
+
+    def add(self, doc_id: str, text: str) -> Tuple[str, bool]:
+        """
+        加入文档并返回 (cluster_id, 是否新簇)。有效期内已存在的 doc_id 直接返回其原簇（过期记录先删除再重新加入）。
+        与已有文档近重复时并入对方的簇，否则以自身为代表新建簇；过短的文本总是自成一簇。
+        """
+        known = self.lookup(doc_id)
+        if known is not None:
+            return known, False
+        if self.max_age:
+            self.remove([doc_id])  # 过期记录：连同旧 LSH 桶一起删掉，避免重复入桶
+
+        sig = self.signature(text)
+        match = self.query(text, sig)
+        cluster_id, is_new = (match[0], False) if match else (doc_id, True)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO dedup_docs (namespace, doc_id, cluster_id, signature, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (self.namespace, doc_id, cluster_id, sig.tobytes(), time.time()),
+            )
+            if len(text) >= self.shingle_size:
+                self._conn.executemany(
+                    "INSERT INTO dedup_lsh (namespace, band, bucket, doc_id) VALUES (?, ?, ?, ?)",
+                    [(self.namespace, band, bucket, doc_id) for band, bucket in self._buckets(sig)],
+                )
+            self._conn.commit()
+        return cluster_id, is_new
+
+    def remove(self, doc_ids: List[str]) -> None:
+        """移除文档（例如处理失败时），使其在下一批次中可被重新处理"""
+        with self._lock:
+            for doc_id in doc_ids:
+                self._conn.execute("DELETE FROM dedup_docs WHERE namespace = ? AND doc_id = ?", (self.namespace, doc_id))
+                self._conn.execute("DELETE FROM dedup_lsh WHERE namespace = ? AND doc_id = ?", (self.namespace, doc_id))
+            self._conn.commit()
+
+    def cluster_members(self, cluster_id: str) -> List[str]:
+        with self._lock:
+            return [r[0] for r in self._conn.execute(
+                "SELECT doc_id FROM dedup_docs WHERE namespace = ? AND cluster_id = ? ORDER BY created_at",
+                (self.namespace, cluster_id),
+            )]
+
+
+# ======================== 3. 两阶段新闻去重 ========================
+class NewsDeduplicator:
+    """
+    两阶段近重复检测：
+    1. 提取前：标题（+描述）的 MinHash-LSH，成本极低，拦下大部分转载通稿；
+    2. 提取后：正文的 MinHash-LSH，处理标题被改写但正文相同的转载。
+    两个索引都持久化，跨批次增量维护，只保留 max_age_days 内的文档：
+    同一 URL 或正文命中历史簇视为已处理过；标题仅与历史批次相似（如每日同名的直播/行情页）只作为候选，
+    仍需提取正文由第二阶段确认。
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        title_threshold: float = 0.6,
+        body_threshold: float = 0.7,
+        max_age_days: float = 3.0,
+    ):
+        max_age = max_age_days * 86400 if max_age_days else None
+        self.title_index = NearDuplicateIndex("title", db_path, shingle_size=3, threshold=title_threshold,
+                                              max_age=max_age)
+        self.body_index = NearDuplicateIndex("body", db_path, shingle_size=5, threshold=body_threshold,
+                                             max_age=max_age)
+
+    @staticmethod
+    def _title_text(item: Dict) -> str:
+        raw = item.get("raw_metadata") or {}
+        description = item.get("description") or raw.get("description") or ""
+        return normalize_title(item.get("title") or "") + normalize_text(description)[:200]
+
+    def cluster_by_title(self, news_list: List[Dict]) -> Tuple[Dict[str, List[Dict]], Dict[str, str]]:
+        """
+        第一阶段。返回 (本批簇：簇 ID → 簇内条目列表（代表在首位）,
+        已处理过的 URL：URL → 历史簇 ID（即历史代表的规范化 URL）)。
+        标题仅与历史批次相似的条目在本批自成候选簇（代表为本批首条），交给正文阶段确认是否真是重复。
+        """
+        clusters: Dict[str, List[Dict]] = {}
+        seen_before: Dict[str, str] = {}
+        batch_ids = set()
+        for item in news_list:
+            url = item.get("url")
+            if not url:
+                continue
+            doc_id = normalize_url(url)
+            if doc_id in batch_ids:
+                continue
+            batch_ids.add(doc_id)
+            known = self.title_index.lookup(doc_id)
+            if known is not None:
+                seen_before[url] = known
+                continue
+            cluster_id, _ = self.title_index.add(doc_id, self._title_text(item))
+            clusters.setdefault(cluster_id, []).append(item)
+        return clusters, seen_before
+
+    def cluster_by_body(self, bodies: Dict[str, str]) -> Tuple[Dict[str, List[str]], Dict[str, str]]:
+        """
+        第二阶段。输入 {代表 URL: 正文}，返回 (本批新簇：代表 URL → 簇内 URL 列表,
+        命中历史簇的 URL → 历史簇 ID（即历史代表的规范化 URL）)。
+        """
+        clusters: Dict[str, List[str]] = {}
+        cluster_rep: Dict[str, str] = {}
+        seen_before: Dict[str, str] = {}
+        batch_ids = set()
+        for url, body in bodies.items():
+            doc_id = normalize_url(url)
+            if doc_id in batch_ids:
+                continue
+            batch_ids.add(doc_id)
+            cluster_id, is_new = self.body_index.add(doc_id, normalize_text(body))
+            if is_new:
+                cluster_rep[cluster_id] = url
+                clusters[url] = [url]
+            elif cluster_id in cluster_rep:
+                clusters[cluster_rep[cluster_id]].append(url)
+            else:
+                seen_before[url] = cluster_id
+        return clusters, seen_before
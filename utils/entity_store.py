@@ -0,0 +1,222 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from dataclasses import dataclass
+from typing import Optional, Dict, List, Iterable
+
+# ======================== 1. 实体名称规范化 ========================
+# 规范化时去掉的分隔符：空白、中英文标点（保留字母、数字和汉字）
+_SEPARATOR_RE = re.compile(r"[\s·・\-_.,，。、'\"“”‘’()（）\[\]【】]+")
+
+
+def canonicalize_entity_name(name: str) -> str:
+    """
+    实体名称规范化：NFKC（全角转半角）→ 小写 → 去掉空白与标点。
+    例如 "Apple Inc." / "apple inc" / "ＡＰＰＬＥ　ＩＮＣ" 得到同一个键。
+    """
+    text = unicodedata.normalize("NFKC", name or "").lower()
+    return _SEPARATOR_RE.sub("", text)
+
+
+# ======================== 2. 按类型区分的 TTL ========================
+HOUR = 3600
+DAY = 24 * HOUR
+# 关键词按顺序匹配 knowledge_graph["type"]，命中即使用对应 TTL
+DEFAULT_TYPE_TTLS = [
+    (("人物", "演员", "歌手", "运动员", "政治家", "person", "actor", "politician", "athlete"), 3 * DAY),
+    (("公司", "集团", "企业", "机构", "组织", "company", "corporation", "organization"), 14 * DAY),
+    (("指数", "指标", "index", "indicator"), 1 * DAY),
+    (("城市", "国家", "地区", "city", "country", "region"), 30 * DAY),
+]
+DEFAULT_TTL = 7 * DAY
+# 没有知识图谱、只有搜索摘要的记录信息更易变化
+ORGANIC_ONLY_TTL = 1 * DAY
+# "未搜索到"之类的空结果，短期内避免重复请求即可
+EMPTY_RESULT_TTL = 6 * HOUR
+
+
+def ttl_for_entity(kg: Optional[Dict], type_ttls=None) -> float:
+    """根据知识图谱中的实体类型选择 TTL"""
+    if not kg:
+        return EMPTY_RESULT_TTL
+    entity_type = str(kg.get("type", "")).lower()
+    for keywords, ttl in type_ttls or DEFAULT_TYPE_TTLS:
+        if any(k in entity_type for k in keywords):
+            return ttl
+    return DEFAULT_TTL
+
+
+# ======================== 3. 实体记录 ========================
+@dataclass
+class EntityRecord:
+    """一个实体的缓存记录：原始 knowledge_graph JSON + 渲染好的知识卡片文本"""
+    canonical_name: str
+    display_name: str
+    entity_type: str
+    knowledge_graph: Dict
+    card_text: str
+    fetched_at: float
+    ttl: float
+
+    def is_expired(self, now: Optional[float] = None) -> bool:
+        return (now or time.time()) - self.fetched_at > self.ttl
+
+
+# ======================== 4. 实体知识卡片库 ========================
+class EntityStore:
+    """
+    持久化实体库（SQLite + 进程内字典）：
+    - entities 表：规范化名称 → 知识图谱 JSON、卡片文本、类型、TTL；
+    - aliases 表：别名（如 "苹果"）→ 规范化名称（如 "苹果公司"）；
+    - 已知实体的查询只走内存字典，不访问网络也不访问磁盘。
+    """
+
+    def __init__(self, db_path: Optional[str] = None, type_ttls=None):
+        self.db_path = db_path or os.path.join(os.getcwd(), "data", "cache", "entity_store.sqlite")
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self.type_ttls = type_ttls or DEFAULT_TYPE_TTLS
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS entities (
+                canonical_name TEXT PRIMARY KEY,
+                display_name   TEXT NOT NULL,
+                entity_type    TEXT NOT NULL DEFAULT '',
+                kg_json        TEXT NOT NULL,
+                card_text      TEXT NOT NULL,
+                fetched_at     REAL NOT NULL,
+                ttl            REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS aliases (
+                alias          TEXT PRIMARY KEY,
+                canonical_name TEXT NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+        # 内存层：启动时一次性载入（实体卡片体量很小），之后查询为纯字典操作
+        self._records: Dict[str, EntityRecord] = {}
+        self._aliases: Dict[str, str] = {}
+        self._load()
+
+    def _load(self) -> None:
+        for row in self._conn.execute(
+            "SELECT canonical_name, display_name, entity_type, kg_json, card_text, fetched_at, ttl FROM entities"
+        ):
+            self._records[row[0]] = EntityRecord(row[0], row[1], row[2], json.loads(row[3]), row[4], row[5], row[6])
+        for alias, canonical in self._conn.execute("SELECT alias, canonical_name FROM aliases"):
+            self._aliases[alias] = canonical
+
+    def resolve(self, name: str) -> str:
+        """名称 → 规范化主键（经过别名表）"""
+        key = canonicalize_entity_name(name)
+        return self._aliases.get(key, key)
+
+    def get(self, name: str, allow_expired: bool = False) -> Optional[EntityRecord]:
+        """查询实体；未命中或已过期返回 None"""
+        record = self._records.get(self.resolve(name))
+        if record is None or (not allow_expired and record.is_expired()):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return record
+
+    def put(self, name: str, knowledge_graph: Optional[Dict], card_text: str, ttl: Optional[float] = None) -> EntityRecord:
+        """
+        写入实体记录。若知识图谱标题与查询名不同（如查询 "苹果" 得到 "苹果公司"），
+        以标题为主键保存，并把查询名登记为别名。
+        """
+        knowledge_graph = knowledge_graph or {}
+        display_name = knowledge_graph.get("title") or name
+        canonical = canonicalize_entity_name(display_name)
+        if ttl is None:
+            ttl = ttl_for_entity(knowledge_graph, self.type_ttls) if knowledge_graph else ORGANIC_ONLY_TTL
+        record = EntityRecord(
+            canonical_name=canonical,
+            display_name=display_name,
+            entity_type=str(knowledge_graph.get("type", "")),
+            knowledge_graph=knowledge_graph,
+            card_text=card_text,
+            fetched_at=time.time(),
+            ttl=ttl,
+        )
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entities "
+                "(canonical_name, display_name, entity_type, kg_json, card_text, fetched_at, ttl) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (canonical, display_name, record.entity_type,
+                 json.dumps(knowledge_graph, ensure_ascii=False), card_text, record.fetched_at, ttl),
+            )
+            self._records[canonical] = record
+            self._add_alias_locked(name, canonical)
+            self._conn.commit()
+        return record
+
+    def add_alias(self, alias: str, name: str) -> None:
+        """手动登记别名：alias 与 name 指向同一实体"""
+        with self._lock:
+            self._add_alias_locked(alias, self.resolve(name))
+            self._conn.commit()
+
+    def _add_alias_locked(self, alias: str, canonical: str) -> None:
+        alias_key = canonicalize_entity_name(alias)
+        if not alias_key or alias_key == canonical:
+            return
+        self._conn.execute(
+            "INSERT OR REPLACE INTO aliases (alias, canonical_name) VALUES (?, ?)", (alias_key, canonical)
+        )
+        self._aliases[alias_key] = canonical
+
+    def missing(self, names: Iterable[str]) -> List[str]:
+        """返回不在库中（或已过期）的名称，用于批量预热"""
+        result = []
+        for name in names:
+            record = self._records.get(self.resolve(name))
+            if record is None or record.is_expired():
+                result.append(name)
+        return result
+
+    def purge_expired(self) -> int:
+        """删除已过期的实体记录，返回删除条数"""
+        now = time.time()
+        expired = [k for k, r in self._records.items() if r.is_expired(now)]
+        with self._lock:
+            self._conn.executemany("DELETE FROM entities WHERE canonical_name = ?", [(k,) for k in expired])
+            self._conn.commit()
+            for k in expired:
+                self._records.pop(k, None)
+        return len(expired)
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entities": len(self._records),
+            "aliases": len(self._aliases),
+        }
+
+
+# ======================== 5. 进程级共享实例 ========================
+_default_store: Optional[EntityStore] = None
+_default_store_lock = threading.Lock()
+
+
+def get_entity_store() -> EntityStore:
+    """获取进程内共享的实体库实例（首次调用时创建）"""
+    global _default_store
+    if _default_store is None:
+        with _default_store_lock:
+            if _default_store is None:
+                _default_store = EntityStore()
+    return _default_store
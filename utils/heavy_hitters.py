@@ -0,0 +1,65 @@
+import heapq
+from typing import Dict, Hashable, Iterable, List, Tuple
+
+
+class SpaceSaving:
+    """
+    Space-Saving 高频项（heavy hitters）计数：最多同时跟踪 capacity 个项，内存有界。
+    - 已跟踪的项直接加计数；
+    - 未跟踪且已满时，替换当前计数最小的项，新项继承其计数（记录为误差上界）；
+    - 任一真实频次超过 总数 / capacity 的项保证在结果中，估计值最多高估 error。
+    最小计数项用带惰性删除的小顶堆维护，单次更新摊销 O(log capacity)。
+    """
+
+    def __init__(self, capacity: int = 1000):
+        if capacity <= 0:
+            raise ValueError("capacity 必须大于 0")
+        self.capacity = capacity
+        self.total = 0
+        self._counts: Dict[Hashable, int] = {}
+        self._errors: Dict[Hashable, int] = {}
+        self._heap: List[Tuple[int, int, Hashable]] = []  # (计数, 插入序号, 项)，序号避免比较不可比的项
+        self._seq = 0
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def __contains__(self, item: Hashable) -> bool:
+        return item in self._counts
+
+    def _push(self, item: Hashable) -> None:
+        self._seq += 1
+        heapq.heappush(self._heap, (self._counts[item], self._seq, item))
+        # 过期条目过多时重建堆，保持内存与 capacity 同阶
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(count, i, key) for i, (key, count) in enumerate(self._counts.items())]
+            heapq.heapify(self._heap)
+
+    def _pop_min(self) -> Tuple[Hashable, int]:
+        while True:
+            count, _, item = heapq.heappop(self._heap)
+            if self._counts.get(item) == count:
+                return item, count
+
+    def add(self, item: Hashable, count: int = 1) -> None:
+        self.total += count
+        if item in self._counts:
+            self._counts[item] += count
+        elif len(self._counts) < self.capacity:
+            self._counts[item] = count
+            self._errors[item] = 0
+        else:
+            victim, min_count = self._pop_min()
+            del self._counts[victim], self._errors[victim]
+            self._counts[item] = min_count + count
+            self._errors[item] = min_count
+        self._push(item)
+
+    def update(self, items: Iterable[Hashable]) -> None:
+        for item in items:
+            self.add(item)
+
+    def top(self, k: int) -> List[Tuple[Hashable, int, int]]:
+        """返回估计频次最高的 k 项：(项, 估计频次, 误差上界)，按估计频次降序"""
+        ranked = heapq.nlargest(k, self._counts.items(), key=lambda x: x[1])
+        return [(item, count, self._errors[item]) for item, count in ranked]
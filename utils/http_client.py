@@ -0,0 +1,303 @@
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Optional, Dict, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.telemetry import span
+
+# ======================== 1. 令牌桶限流 ========================
+class TokenBucket:
+    """
+    令牌桶限流器：rate 为每秒补充的令牌数，burst 为桶容量。
+    同时提供同步 acquire（time.sleep）与异步 aacquire（asyncio.sleep）两种等待方式。
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """预占一个令牌，返回需要等待的秒数（0 表示立即可用）"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self) -> None:
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def aacquire(self) -> None:
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+# 各 API 的默认限流配置：(每秒请求数, 突发容量)
+DEFAULT_RATE_LIMITS: Dict[str, Tuple[float, int]] = {
+    "newsapi": (5.0, 5),
+    "jina": (3.0, 10),
+    "serpapi": (5.0, 5),
+}
+
+# ======================== 2. 重试策略 ========================
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+def _retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """解析 Retry-After 头：支持秒数与 HTTP 日期两种格式"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _backoff_delay(attempt: int, base: float, cap: float, retry_after: Optional[str] = None) -> float:
+    """指数退避 + 全抖动；服务端给出 Retry-After 时以其为准（不超过 cap）"""
+    server_delay = _retry_after_seconds(retry_after)
+    if server_delay is not None:
+        return min(cap, server_delay)
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+# ======================== 3. 接口耗时统计 ========================
+class LatencyTracker:
+    """按 "api path" 记录请求次数、失败次数与最近样本的耗时分位数"""
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self._samples: Dict[str, deque] = {}
+        self._counts: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, seconds: float, ok: bool) -> None:
+        with self._lock:
+            self._samples.setdefault(endpoint, deque(maxlen=self.window)).append(seconds)
+            counts = self._counts.setdefault(endpoint, {"requests": 0, "errors": 0})
+            counts["requests"] += 1
+            if not ok:
+                counts["errors"] += 1
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        result = {}
+        with self._lock:
+            for endpoint, samples in self._samples.items():
+                ordered = sorted(samples)
+                n = len(ordered)
+                result[endpoint] = {
+                    **self._counts[endpoint],
+                    "avg": sum(ordered) / n,
+                    "p50": ordered[int(0.50 * (n - 1))],
+                    "p95": ordered[int(0.95 * (n - 1))],
+                    "max": ordered[-1],
+                }
+        return result
+
+
+def _endpoint(api: str, url: str) -> str:
+    """
+    统计口径："api 路径前两段"。Jina 的路径本身是目标文章 URL（含 "http:"），
+    遇到这类段即截止，避免每篇文章生成一个独立的统计项。
+    """
+    segments = []
+    for segment in urlsplit(url).path.split("/"):
+        if not segment:
+            continue
+        if ":" in segment or len(segments) >= 2:
+            break
+        segments.append(segment)
+    return f"{api} /{'/'.join(segments)}"
+
+
+# ======================== 4. 同步客户端（requests.Session） ========================
+class HttpClient:
+    """
+    所有工具共享的同步 HTTP 客户端：
+    - requests.Session 按 host 维护 keep-alive 连接池，避免每次请求重新握手；
+    - 按 API 名称做令牌桶限流；
+    - 对 429/5xx 与连接错误做带抖动的指数退避重试，并遵守 Retry-After。
+    """
+
+    def __init__(
+        self,
+        rate_limits: Optional[Dict[str, Tuple[float, int]]] = None,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_cap: float = 30.0,
+        pool_maxsize: int = 32,
+    ):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.limiters: Dict[str, TokenBucket] = {
+            api: TokenBucket(rate, burst) for api, (rate, burst) in (rate_limits or DEFAULT_RATE_LIMITS).items()
+        }
+        self.latency = LatencyTracker()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=pool_maxsize)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def configure_rate_limit(self, api: str, rate: float, burst: int) -> None:
+        self.limiters[api] = TokenBucket(rate, burst)
+
+    def request(self, method: str, api: str, url: str, **kwargs) -> requests.Response:
+        """
+        发送请求。重试耗尽后，429/5xx 响应原样返回（由调用方 raise_for_status），
+        连接异常则抛出最后一次的 requests 异常。
+        """
+        limiter = self.limiters.get(api)
+        endpoint = _endpoint(api, url)
+        with span(f"http.{api}", endpoint=endpoint) as sp:
+            for attempt in range(self.max_retries + 1):
+                if limiter:
+                    limiter.acquire()
+                start = time.perf_counter()
+                try:
+                    response = self.session.request(method, url, **kwargs)
+                except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError):
+                    self.latency.record(endpoint, time.perf_counter() - start, ok=False)
+                    if attempt >= self.max_retries:
+                        raise
+                    time.sleep(_backoff_delay(attempt, self.backoff_base, self.backoff_cap))
+                    continue
+                except requests.exceptions.RequestException:
+                    # 超时等错误不重试：Jina 单次就可能耗时数十秒，重试只会放大尾延迟
+                    self.latency.record(endpoint, time.perf_counter() - start, ok=False)
+                    raise
+
+                self.latency.record(endpoint, time.perf_counter() - start, ok=response.status_code < 400)
+                if response.status_code not in RETRY_STATUS or attempt >= self.max_retries:
+                    sp.set(status=response.status_code, attempts=attempt + 1)
+                    if response.status_code >= 400:
+                        sp.fail(f"HTTP {response.status_code}")
+                    return response
+                delay = _backoff_delay(attempt, self.backoff_base, self.backoff_cap, response.headers.get("Retry-After"))
+                response.close()
+                time.sleep(delay)
+            return response
+
+    def get(self, api: str, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", api, url, **kwargs)
+
+
+# ======================== 5. 异步客户端（httpx.AsyncClient） ========================
+class AsyncHttpClient:
+    """
+    异步版本：httpx.AsyncClient 连接池 + 同样的限流与重试策略。
+    限流器与耗时统计可与同步客户端共享，保证同一进程内对供应商的总速率受控。
+    需在事件循环内使用：async with AsyncHttpClient() as client: ...
+    """
+
+    def __init__(
+        self,
+        limiters: Optional[Dict[str, TokenBucket]] = None,
+        latency: Optional[LatencyTracker] = None,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_cap: float = 30.0,
+        max_connections: int = 64,
+    ):
+        import httpx  # 仅异步模式需要，避免同步进程加载
+
+        self._httpx = httpx
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.limiters = limiters if limiters is not None else {
+            api: TokenBucket(rate, burst) for api, (rate, burst) in DEFAULT_RATE_LIMITS.items()
+        }
+        self.latency = latency or LatencyTracker()
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            follow_redirects=True,
+        )
+
+    async def __aenter__(self) -> "AsyncHttpClient":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+    async def request(self, method: str, api: str, url: str, **kwargs):
+        httpx = self._httpx
+        limiter = self.limiters.get(api)
+        endpoint = _endpoint(api, url)
+        with span(f"http.{api}", endpoint=endpoint) as sp:
+            for attempt in range(self.max_retries + 1):
+                if limiter:
+                    await limiter.aacquire()
+                start = time.perf_counter()
+                try:
+                    response = await self.client.request(method, url, **kwargs)
+                except (httpx.ConnectError, httpx.RemoteProtocolError):
+                    self.latency.record(endpoint, time.perf_counter() - start, ok=False)
+                    if attempt >= self.max_retries:
+                        raise
+                    await asyncio.sleep(_backoff_delay(attempt, self.backoff_base, self.backoff_cap))
+                    continue
+                except httpx.HTTPError:
+                    self.latency.record(endpoint, time.perf_counter() - start, ok=False)
+                    raise
+
+                self.latency.record(endpoint, time.perf_counter() - start, ok=response.status_code < 400)
+                if response.status_code not in RETRY_STATUS or attempt >= self.max_retries:
+                    sp.set(status=response.status_code, attempts=attempt + 1)
+                    if response.status_code >= 400:
+                        sp.fail(f"HTTP {response.status_code}")
+                    return response
+                delay = _backoff_delay(attempt, self.backoff_base, self.backoff_cap, response.headers.get("Retry-After"))
+                await response.aclose()
+                await asyncio.sleep(delay)
+            return response
+
+    async def get(self, api: str, url: str, **kwargs):
+        return await self.request("GET", api, url, **kwargs)
+
+
+# ======================== 6. 进程级共享实例 ========================
+_default_client: Optional[HttpClient] = None
+_default_client_lock = threading.Lock()
+
+
+def get_http_client() -> HttpClient:
+    """获取进程内共享的同步 HTTP 客户端（首次调用时创建）"""
+    global _default_client
+    if _default_client is None:
+        with _default_client_lock:
+            if _default_client is None:
+                _default_client = HttpClient()
+    return _default_client
+
+
+def new_async_http_client(**kwargs) -> AsyncHttpClient:
+    """
+    创建绑定当前事件循环的异步客户端。
+    限流器与耗时统计复用同步共享客户端的实例，两种调用方式共同受同一速率约束。
+    """
+    shared = get_http_client()
+    return AsyncHttpClient(limiters=shared.limiters, latency=shared.latency, **kwargs)
@@ -0,0 +1,144 @@
+import hashlib
+import io
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, List, Iterable
+
+from utils.http_client import get_http_client
+from utils.telemetry import get_logger
+
+try:  # Pillow 为可选依赖：缺失时保留原图字节，不做缩放与重压缩
+    from PIL import Image
+except ImportError:
+    Image = None
+
+logger = get_logger(__name__)
+
+# <img ... src="http(s)://..."> 中的远程图片地址
+IMG_SRC_RE = re.compile(r'(<img\b[^>]*?\bsrc\s*=\s*)(["\'])(https?://[^"\']+)\2', re.IGNORECASE)
+IMAGE_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36",
+    "Accept": "image/avif,image/webp,image/apng,image/*,*/*;q=0.8",
+}
+
+
+class ImageAssetCache:
+    """
+    知识卡片图片的本地资源缓存：
+    - 并发下载 HTML 中引用的远程图片，按内容哈希（sha256）存储，相同图片只存一份；
+    - URL → 内容哈希的映射保存在 SQLite 中，同一 URL 不重复下载；
+    - 安装了 Pillow 时按卡片尺寸缩放并重压缩为 JPEG；
+    - 将 HTML 中的图片改写为本地 file:// 地址，下载失败的直接替换为占位图，截图时无需任何网络请求。
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        max_size: tuple = (520, 380),  # 卡片图片显示尺寸 260x190 的 2 倍，保证清晰
+        jpeg_quality: int = 82,
+        max_workers: int = 8,
+        timeout: float = 10.0,
+    ):
+        self.cache_dir = cache_dir or os.path.join(os.getcwd(), "data", "cache", "images")
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.max_size = max_size
+        self.jpeg_quality = jpeg_quality
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(self.cache_dir, "index.sqlite"), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS image_urls (url TEXT PRIMARY KEY, path TEXT NOT NULL, fetched_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def _lookup(self, url: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT path FROM image_urls WHERE url = ?", (url,)).fetchone()
+        if row and os.path.exists(row[0]):
+            return row[0]
+        return None
+
+    def _process(self, data: bytes) -> tuple:
+        """缩放 + 重压缩；返回 (字节, 扩展名)。无 Pillow 或无法解码时原样保留"""
+        if Image is None:
+            return data, ".img"
+        try:
+            with Image.open(io.BytesIO(data)) as img:
+                img = img.convert("RGB")
+                img.thumbnail(self.max_size)
+                out = io.BytesIO()
+                img.save(out, format="JPEG", quality=self.jpeg_quality, optimize=True)
+                return out.getvalue(), ".jpg"
+        except Exception:
+            # Pillow 无法解码（如 SVG）：交给浏览器自行处理
+            return data, ".img"
+
+    def fetch(self, url: str) -> Optional[str]:
+        """获取单张图片的本地路径；下载或解码失败返回 None"""
+        cached = self._lookup(url)
+        if cached:
+            return cached
+        try:
+            response = get_http_client().get("images", url, headers=IMAGE_HEADERS, timeout=self.timeout)
+            response.raise_for_status()
+            if not response.headers.get("Content-Type", "image/").startswith("image/"):
+                return None
+            data, ext = self._process(response.content)
+        except Exception as e:
+            logger.warning(f"⚠️ 图片下载失败，使用占位图：{url}（{str(e)[:80]}）")
+            return None
+
+        digest = hashlib.sha256(data).hexdigest()
+        shard_dir = os.path.join(self.cache_dir, digest[:2])
+        os.makedirs(shard_dir, exist_ok=True)
+        path = os.path.join(shard_dir, digest + ext)
+        if not os.path.exists(path):
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO image_urls (url, path, fetched_at) VALUES (?, ?, ?)", (url, path, time.time())
+            )
+            self._conn.commit()
+        return path
+
+    def fetch_many(self, urls: Iterable[str]) -> Dict[str, Optional[str]]:
+        """并发获取多张图片：URL → 本地路径（失败为 None）"""
+        unique = list(dict.fromkeys(urls))
+        if not unique:
+            return {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return dict(zip(unique, executor.map(self.fetch, unique)))
+
+    def localize_html(self, html_content: str, placeholder: str, local_paths: Optional[Dict[str, Optional[str]]] = None) -> str:
+        """把 HTML 中的远程图片改写为本地 file:// 地址，失败的替换为 placeholder"""
+        if local_paths is None:
+            local_paths = self.fetch_many(m.group(3) for m in IMG_SRC_RE.finditer(html_content))
+
+        def _replace(match: re.Match) -> str:
+            path = local_paths.get(match.group(3))
+            src = f"file://{os.path.abspath(path)}" if path else placeholder
+            return f"{match.group(1)}{match.group(2)}{src}{match.group(2)}"
+
+        return IMG_SRC_RE.sub(_replace, html_content)
+
+    def localize_html_files(self, html_paths: List[str], placeholder: str) -> None:
+        """批量处理 HTML 文件：先汇总所有文件的图片统一并发下载，再逐个改写文件"""
+        contents = {}
+        for path in html_paths:
+            with open(path, "r", encoding="utf-8") as f:
+                contents[path] = f.read()
+        urls = [m.group(3) for content in contents.values() for m in IMG_SRC_RE.finditer(content)]
+        local_paths = self.fetch_many(urls)
+        for path, content in contents.items():
+            localized = self.localize_html(content, placeholder, local_paths)
+            if localized != content:
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(localized)
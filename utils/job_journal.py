@@ -0,0 +1,223 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from utils.telemetry import count, get_logger
+
+logger = get_logger(__name__)
+
+# 条目状态：pending=未完成；done=已完成（结果已落盘）；failed=最近一次失败（失败次数未超限时下次运行重试）
+STATUS_PENDING = "pending"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+
+def item_key(value: Any) -> str:
+    """条目键：字符串输入（URL 等）直接使用，其余（长文本 / 字典）取内容哈希，同一输入在不同次运行中得到同一个键"""
+    if isinstance(value, str) and len(value) <= 512:
+        return value
+    text = value if isinstance(value, str) else json.dumps(value, ensure_ascii=False, sort_keys=True)
+    return "sha1:" + hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class JobJournal:
+    """
+    可恢复批处理任务的进度日志（SQLite）：
+    - jobs：任务 ID → 任务类型、创建 / 更新时间；
+    - items：(任务 ID, 条目键) → 状态、结果 JSON、失败次数、最后一次错误。
+    每个条目完成即提交一次事务，进程中途退出时已完成的条目不会丢失；
+    同一任务 ID 重新运行时跳过已完成的条目，只处理未完成与失败次数未超限的条目。
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or os.path.join(os.getcwd(), "data", "store", "job_journal.sqlite")
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id     TEXT PRIMARY KEY,
+                kind       TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS items (
+                job_id     TEXT NOT NULL,
+                item_key   TEXT NOT NULL,
+                status     TEXT NOT NULL,
+                result     TEXT,
+                failures   INTEGER NOT NULL DEFAULT 0,
+                error      TEXT,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (job_id, item_key)
+            );
+            """
+        )
+        self._conn.commit()
+
+    def open_job(self, job_id: str, kind: str, keys: Sequence[str], max_attempts: int = 3) -> "JobRun":
+        """
+        登记（或恢复）一个任务：新条目记为 pending，已有条目保留原状态。
+        :param kind: 任务类型（如 "news_summary"），同一任务 ID 不能被不同类型的任务复用
+        :param keys: 与输入一一对应的条目键（见 item_key），重复的键视为同一条目
+        :param max_attempts: 单个条目最多尝试次数，失败次数达到该值后不再重试（保留最后一次的失败结果）
+        """
+        now = time.time()
+        unique = list(dict.fromkeys(keys))
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT kind FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row and row[0] != kind:
+                raise ValueError(f"任务 ID {job_id} 已被 {row[0]} 类型的任务使用")
+            self._conn.execute(
+                "INSERT INTO jobs (job_id, kind, created_at, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(job_id) DO UPDATE SET updated_at = excluded.updated_at",
+                (job_id, kind, now, now),
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO items (job_id, item_key, status, updated_at) VALUES (?, ?, ?, ?)",
+                [(job_id, key, STATUS_PENDING, now) for key in unique],
+            )
+            states: Dict[str, tuple] = {}
+            for start in range(0, len(unique), 500):  # SQLite 单条语句参数个数有限制
+                batch = unique[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT item_key, status, result, failures FROM items "
+                    f"WHERE job_id = ? AND item_key IN ({','.join('?' * len(batch))})",
+                    [job_id, *batch],
+                ).fetchall()
+                states.update((r[0], r[1:]) for r in rows)
+        return JobRun(self, job_id, kind, list(keys), states, max_attempts)
+
+    def record(self, job_id: str, key: str, result: Any, error: Optional[str] = None) -> None:
+        """写入一个条目的结果：error 为空记为 done，否则记为 failed 并累加失败次数"""
+        now = time.time()
+        payload = json.dumps(result, ensure_ascii=False)
+        with self._lock, self._conn:
+            if error is None:
+                self._conn.execute(
+                    "UPDATE items SET status = ?, result = ?, error = NULL, updated_at = ? WHERE job_id = ? AND item_key = ?",
+                    (STATUS_DONE, payload, now, job_id, key),
+                )
+            else:
+                self._conn.execute(
+                    "UPDATE items SET status = ?, result = ?, failures = failures + 1, error = ?, updated_at = ? "
+                    "WHERE job_id = ? AND item_key = ?",
+                    (STATUS_FAILED, payload, error[:500], now, job_id, key),
+                )
+            self._conn.execute("UPDATE jobs SET updated_at = ? WHERE job_id = ?", (now, job_id))
+
+    def progress(self, job_id: str) -> Dict[str, int]:
+        """任务进度：各状态条目数与累计失败次数"""
+        with self._lock:
+            counts = dict(self._conn.execute(
+                "SELECT status, COUNT(*) FROM items WHERE job_id = ? GROUP BY status", (job_id,)
+            ).fetchall())
+            failures = self._conn.execute(
+                "SELECT COALESCE(SUM(failures), 0) FROM items WHERE job_id = ?", (job_id,)
+            ).fetchone()[0]
+        return {
+            "total": sum(counts.values()),
+            "done": counts.get(STATUS_DONE, 0),
+            "failed": counts.get(STATUS_FAILED, 0),
+            "pending": counts.get(STATUS_PENDING, 0),
+            "failures": failures,
+        }
+
+    def failed_items(self, job_id: str) -> List[Dict]:
+        """失败条目明细（条目键、失败次数、最后一次错误），用于排查"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT item_key, failures, error FROM items WHERE job_id = ? AND status = ? ORDER BY failures DESC",
+                (job_id, STATUS_FAILED),
+            ).fetchall()
+        return [{"item_key": r[0], "failures": r[1], "error": r[2]} for r in rows]
+
+    def list_jobs(self) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job_id, kind, created_at, updated_at FROM jobs ORDER BY updated_at DESC"
+            ).fetchall()
+        return [{"job_id": r[0], "kind": r[1], "created_at": r[2], "updated_at": r[3]} for r in rows]
+
+    def delete_job(self, job_id: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM items WHERE job_id = ?", (job_id,))
+            self._conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+
+
+class JobRun:
+    """
+    一次运行的视图：todo 为本次需要处理的输入下标（每个条目键只出现一次），
+    results 为与输入一一对应的结果列表（已完成 / 失败次数超限的条目预先填入日志中的结果）。
+    处理完一个条目立即调用 record() 落盘。
+    """
+
+    def __init__(self, journal: JobJournal, job_id: str, kind: str, keys: List[str],
+                 states: Dict[str, tuple], max_attempts: int):
+        self.journal = journal
+        self.job_id = job_id
+        self.kind = kind
+        self.keys = keys
+        self.results: List[Any] = [None] * len(keys)
+        self.todo: List[int] = []
+        self._positions: Dict[str, List[int]] = {}
+        for idx, key in enumerate(keys):
+            self._positions.setdefault(key, []).append(idx)
+
+        skipped = retried = exhausted = 0
+        for key, positions in self._positions.items():
+            status, result, failures = states.get(key, (STATUS_PENDING, None, 0))
+            if status == STATUS_DONE or (status == STATUS_FAILED and failures >= max_attempts):
+                stored = json.loads(result) if result else None
+                for idx in positions:
+                    self.results[idx] = stored
+                if status == STATUS_DONE:
+                    skipped += 1
+                else:
+                    exhausted += 1
+                continue
+            retried += status == STATUS_FAILED
+            self.todo.append(positions[0])
+        self.stats = {"skipped": skipped, "todo": len(self.todo), "retried": retried, "exhausted": exhausted,
+                      "done": 0, "failed": 0}
+        self._lock = threading.Lock()
+        logger.info(f"📒 任务 {job_id}（{kind}）：共 {len(self._positions)} 条，跳过已完成 {skipped} 条，"
+                    f"本次处理 {len(self.todo)} 条（重试 {retried} 条），失败次数超限 {exhausted} 条")
+
+    def record(self, idx: int, result: Any, error: Optional[str] = None) -> None:
+        """记录输入下标 idx 对应条目的结果（可在多个线程中调用）"""
+        key = self.keys[idx]
+        self.journal.record(self.job_id, key, result, error)
+        with self._lock:
+            for position in self._positions[key]:
+                self.results[position] = result
+            self.stats["failed" if error else "done"] += 1
+        count("news_agents_job_items_total", kind=self.kind, status="failed" if error else "done")
+
+    def finish(self) -> Dict[str, int]:
+        """记录本次运行的统计并返回任务整体进度"""
+        progress = self.journal.progress(self.job_id)
+        logger.info(f"📒 任务 {self.job_id} 本次完成 {self.stats['done']} 条，失败 {self.stats['failed']} 条；"
+                    f"整体进度 {progress['done']}/{progress['total']}，失败 {progress['failed']} 条")
+        return progress
+
+
+# ======================== 进程级共享实例 ========================
+_default_journal: Optional[JobJournal] = None
+_default_journal_lock = threading.Lock()
+
+
+def get_job_journal() -> JobJournal:
+    """获取进程内共享的任务日志实例（首次调用时创建）"""
+    global _default_journal
+    if _default_journal is None:
+        with _default_journal_lock:
+            if _default_journal is None:
+                _default_journal = JobJournal()
+    return _default_journal
@@ -0,0 +1,141 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, Dict, Sequence, Any
+
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+from langchain_core.outputs import Generation
+
+# 环境变量开关：设为 1/true 时 get_qwen_llm 默认启用响应缓存
+LLM_CACHE_ENV = "NEWS_AGENTS_LLM_CACHE"
+
+
+class SQLiteLLMCache(BaseCache):
+    """
+    LLM 精确匹配响应缓存（SQLite）：
+    - 键 = namespace + llm_string（模型名与全部调用参数）+ 完整格式化后的消息，取 sha256；
+    - 作为 LangChain BaseCache 挂到模型上，invoke / batch / ainvoke 均自动生效；
+    - 每个 Agent 使用独立 namespace，可分别统计与清理；
+    - 总大小超过 max_bytes 时按最近访问时间（LRU）淘汰。
+    仅适用于确定性调用（temperature=0），否则缓存会固定住某一次的随机输出。
+    """
+
+    def __init__(self, namespace: str = "default", db_path: Optional[str] = None, max_bytes: int = 256 * 1024 * 1024):
+        self.namespace = namespace
+        self.db_path = db_path or os.path.join(os.getcwd(), "data", "cache", "llm_cache.sqlite")
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key         TEXT PRIMARY KEY,
+                namespace   TEXT NOT NULL,
+                response    TEXT NOT NULL,
+                size        INTEGER NOT NULL,
+                created_at  REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_ns ON llm_cache(namespace, last_access)")
+        self._conn.commit()
+
+    def _key(self, prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{self.namespace}\x00{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        key = self._key(prompt, llm_string)
+        with self._lock:
+            row = self._conn.execute("SELECT response FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self.hits += 1
+        try:
+            return loads(row[0])
+        except Exception:
+            # 旧版本序列化格式无法解析时视为未命中
+            return None
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        payload = dumps(list(return_val))
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, namespace, response, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (self._key(prompt, llm_string), self.namespace, payload, len(payload.encode("utf-8")), now, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """整库按 last_access 从旧到新淘汰，直到总大小回到上限内（调用方持有锁）"""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        overflow = total - self.max_bytes
+        freed = 0
+        victims = []
+        for key, size in self._conn.execute("SELECT key, size FROM llm_cache ORDER BY last_access ASC"):
+            victims.append((key,))
+            freed += size
+            if freed >= overflow:
+                break
+        self._conn.executemany("DELETE FROM llm_cache WHERE key = ?", victims)
+
+    def clear(self, **kwargs: Any) -> None:
+        """清空当前 namespace 的缓存"""
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache WHERE namespace = ?", (self.namespace,))
+            self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache WHERE namespace = ?", (self.namespace,)
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": count,
+            "bytes": total,
+        }
+
+
+# ======================== 进程级 namespace → 缓存实例 ========================
+_caches: Dict[str, SQLiteLLMCache] = {}
+_caches_lock = threading.Lock()
+
+
+def llm_cache_enabled() -> bool:
+    return os.getenv(LLM_CACHE_ENV, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def get_llm_cache(namespace: str = "default") -> SQLiteLLMCache:
+    """获取某个 namespace 的共享缓存实例（首次调用时创建）"""
+    with _caches_lock:
+        if namespace not in _caches:
+            _caches[namespace] = SQLiteLLMCache(namespace)
+        return _caches[namespace]
+
+
+def llm_cache_stats() -> Dict[str, Dict[str, float]]:
+    """所有已创建 namespace 的命中统计，用于评估缓存节省的调用量"""
+    with _caches_lock:
+        caches = dict(_caches)
+    return {namespace: cache.stats() for namespace, cache in caches.items()}
@@ -1,25 +1,68 @@
 import os
-from config import load_key
-from langchain_community.chat_models import ChatOpenAI
+import threading
 from config.load_key import load_api_key 
-def get_qwen_llm(model_name: str = "qwen-turbo") -> ChatOpenAI:
+from utils.telemetry import get_logger, llm_callback_handler
+from typing import Optional, Dict, Tuple, TYPE_CHECKING
+if TYPE_CHECKING:
+    from langchain_community.chat_models import ChatOpenAI
+
+# 进程级 LLM 客户端缓存：相同 (模型, 缓存命名空间, 是否缓存) 复用同一个实例
+_llm_instances: Dict[Tuple[str, str, bool], "ChatOpenAI"] = {}
+_llm_lock = threading.Lock()
+# 阿里云百炼的 OpenAI 兼容 API 地址（可用环境变量覆盖，如指向本地 mock 服务做离线基准）
+DASHSCOPE_API_BASE = os.getenv("DASHSCOPE_API_BASE", "https://dashscope.aliyuncs.com/compatible-mode/v1")
+logger = get_logger(__name__)
+
+
+def get_qwen_llm(
+    model_name: str = "qwen-turbo",
+    cache_namespace: str = "default",
+    use_cache: Optional[bool] = None,
+) -> "ChatOpenAI":
     """
     获取一个配置好的、用于调用阿里云百炼 Qwen 模型的 ChatOpenAI 实例。
+    同一进程内相同参数只创建一次（langchain-community 与缓存模块也在首次调用时才导入）。
+    :param cache_namespace: 响应缓存的命名空间（建议每个 Agent 一个，便于分别统计/清理）
+    :param use_cache: 是否启用本地响应缓存；None 时由环境变量 NEWS_AGENTS_LLM_CACHE 决定（默认关闭）
     """
-    # 确保你的环境变量中已经设置了 DASHSCOPE_API_KEY
-    # 例如: export DASHSCOPE_API_KEY="sk_..."
-    api_key = load_api_key("DASHSCOPE_API_KEY")
-    
-    # 阿里云百炼的 OpenAI 兼容 API 地址
-    api_base = "https://dashscope.aliyuncs.com/compatible-mode/v1"
-    
-    print(f"正在初始化 Qwen LLM (兼容 OpenAI 模式)...")
-    print(f"  - API Base: {api_base}")
-    print(f"  - Model Name: {model_name}")
-    
-    return ChatOpenAI(
-        model_name=model_name,
-        openai_api_key=api_key,
-        openai_api_base=api_base,
-        temperature=0.0, # 根据你的需求调整
-    )
\ No newline at end of file
+    from utils.llm_cache import get_llm_cache, llm_cache_enabled
+
+    # temperature=0 时相同输入得到相同输出，可安全复用缓存结果
+    if use_cache is None:
+        use_cache = llm_cache_enabled()
+    # 未启用缓存时各 Agent 共用同一个客户端，命名空间不参与区分
+    instance_key = (model_name, cache_namespace if use_cache else "", bool(use_cache))
+    if instance_key in _llm_instances:
+        return _llm_instances[instance_key]
+
+    with _llm_lock:
+        if instance_key in _llm_instances:
+            return _llm_instances[instance_key]
+
+        from langchain_community.chat_models import ChatOpenAI
+
+        # 确保你的环境变量中已经设置了 DASHSCOPE_API_KEY
+        # 例如: export DASHSCOPE_API_KEY="sk_..."
+        api_key = load_api_key("DASHSCOPE_API_KEY")
+
+        api_base = DASHSCOPE_API_BASE
+
+        logger.info(f"正在初始化 Qwen LLM (兼容 OpenAI 模式)...")
+        logger.info(f"  - API Base: {api_base}")
+        logger.info(f"  - Model Name: {model_name}")
+
+        cache = get_llm_cache(cache_namespace) if use_cache else None
+        if cache:
+            logger.info(f"  - Response Cache: {cache_namespace}")
+
+        llm = ChatOpenAI(
+            model_name=model_name,
+            openai_api_key=api_key,
+            openai_api_base=api_base,
+            temperature=0.0, # 根据你的需求调整
+            cache=cache,
+            # 追踪回调常驻：未开启追踪时只做一次开关判断
+            callbacks=[llm_callback_handler(model_name, cache_namespace if cache else None)],
+        )
+        _llm_instances[instance_key] = llm
+        return llm
@@ -0,0 +1,309 @@
+import re
+import unicodedata
+import zlib
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from utils.model import NewsArticle
+from utils.text_utils import chunk_text
+
+# ======================== 1. 中英文分词 ========================
+# 英文/数字按词切分；连续的中文按字符二元组（bigram）切分，无需外部分词器即可召回中文词语
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:\.[0-9]+)*|[一-鿿㐀-䶿]+")
+_STOPWORDS = {
+    "the", "a", "an", "of", "to", "in", "and", "or", "is", "are", "was", "were", "for", "on", "at", "by", "with",
+    "的", "了", "和", "是", "在", "也", "就", "都", "而", "及", "与", "着", "或",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """NFKC + 小写后切词：英文单词、数字整体保留，中文连续片段转为字符 bigram（单字片段保留单字）"""
+    tokens = []
+    for piece in _TOKEN_RE.findall(unicodedata.normalize("NFKC", text or "").lower()):
+        if piece[0].isascii():
+            if piece not in _STOPWORDS:
+                tokens.append(piece)
+        elif len(piece) == 1:
+            if piece not in _STOPWORDS:
+                tokens.append(piece)
+        else:
+            tokens.extend(piece[i:i + 2] for i in range(len(piece) - 1))
+    return tokens
+
+
+# ======================== 2. BM25 倒排索引（NumPy CSR） ========================
+class BM25Index:
+    """
+    倒排索引 + BM25 打分：
+    - 新文档先进入待合并缓冲区，查询前批量合并为 CSR 结构（indptr / 文档号 / 词频）；
+    - 查询时逐个查询词取出倒排列表，向量化累加 BM25 分数，argpartition 取 top-k；
+    - 合并只对新增的 (词, 文档) 对排序，不需要保留原始 token 序列。
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.vocab: Dict[str, int] = {}
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.postings_doc = np.zeros(0, dtype=np.int32)
+        self.postings_tf = np.zeros(0, dtype=np.float32)
+        self.doc_len = np.zeros(0, dtype=np.float32)
+        self._pending: List[np.ndarray] = []
+        self._num_docs = 0
+
+    def __len__(self) -> int:
+        return self._num_docs
+
+    def term_ids(self, tokens: Sequence[str], add: bool = False) -> np.ndarray:
+        ids = []
+        for token in tokens:
+            term_id = self.vocab.get(token)
+            if term_id is None and add:
+                term_id = self.vocab[token] = len(self.vocab)
+            if term_id is not None:
+                ids.append(term_id)
+        return np.asarray(ids, dtype=np.int64)
+
+    def add(self, tokens: Sequence[str]) -> int:
+        """加入一篇文档（已分词），返回其文档号"""
+        return self.add_token_ids(self.term_ids(tokens, add=True))
+
+    def add_token_ids(self, term_ids: np.ndarray) -> int:
+        """按词表编号加入文档（批量导入/基准测试可绕过分词直接使用）"""
+        self._pending.append(np.asarray(term_ids, dtype=np.int64))
+        self._num_docs += 1
+        return self._num_docs - 1
+
+    def build(self) -> None:
+        """把待合并缓冲区并入 CSR 索引（查询时自动调用）"""
+        if not self._pending:
+            return
+        first_doc = len(self.doc_len)
+        lengths = np.fromiter((len(t) for t in self._pending), dtype=np.int64, count=len(self._pending))
+        tokens = np.concatenate(self._pending) if lengths.sum() else np.zeros(0, dtype=np.int64)
+        docs = np.repeat(np.arange(first_doc, first_doc + len(lengths), dtype=np.int64), lengths)
+        self._pending = []
+
+        # (词, 文档) 组合键去重即得到词频；键按词排序，天然分组
+        total_docs = first_doc + len(lengths)
+        keys, tf = np.unique(tokens * total_docs + docs, return_counts=True)
+        new_terms, new_docs = keys // total_docs, keys % total_docs
+
+        vocab_size = max(len(self.vocab), int(new_terms.max()) + 1 if len(new_terms) else 0)
+        old_terms = np.repeat(np.arange(len(self.indptr) - 1, dtype=np.int64), np.diff(self.indptr))
+        all_terms = np.concatenate([old_terms, new_terms])
+        order = np.argsort(all_terms, kind="stable")  # 稳定排序：同一词下文档号保持递增
+        self.postings_doc = np.concatenate([self.postings_doc, new_docs.astype(np.int32)])[order]
+        self.postings_tf = np.concatenate([self.postings_tf, tf.astype(np.float32)])[order]
+        counts = np.bincount(all_terms, minlength=vocab_size)
+        self.indptr = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        self.doc_len = np.concatenate([self.doc_len, lengths.astype(np.float32)])
+
+    def search(self, term_ids: np.ndarray, k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """返回 (文档号, BM25 分数)，按分数降序"""
+        self.build()
+        n_docs = len(self.doc_len)
+        if n_docs == 0 or len(term_ids) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        avgdl = float(self.doc_len.mean()) or 1.0
+        scores = np.zeros(n_docs, dtype=np.float32)
+        touched = []
+        for term_id in np.unique(term_ids):
+            if term_id >= len(self.indptr) - 1:
+                continue
+            start, end = self.indptr[term_id], self.indptr[term_id + 1]
+            if start == end:
+                continue
+            docs = self.postings_doc[start:end]
+            tf = self.postings_tf[start:end]
+            df = end - start
+            idf = np.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+            norm = tf + self.k1 * (1.0 - self.b + self.b * self.doc_len[docs] / avgdl)
+            scores[docs] += (idf * tf * (self.k1 + 1.0) / norm).astype(np.float32)
+            touched.append(docs)
+        if not touched:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        candidates = np.unique(np.concatenate(touched)) if len(touched) > 1 else touched[0]
+        return _top_k(candidates.astype(np.int64), scores[candidates], k)
+
+
+def _top_k(ids: np.ndarray, scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    if len(scores) > k:
+        part = np.argpartition(-scores, k - 1)[:k]
+        ids, scores = ids[part], scores[part]
+    order = np.argsort(-scores, kind="stable")
+    return ids[order], scores[order]
+
+
+# ======================== 3. 向量索引（NumPy 稠密矩阵） ========================
+EmbedFn = Callable[[List[str]], np.ndarray]
+
+
+class HashingEmbedding:
+    """
+    本地确定性嵌入（特征哈希）：token → crc32 → 维度与符号，L2 归一化。
+    不需要模型与网络，相同文本永远得到相同向量；用于测试与离线基准，生产环境可替换为真实嵌入模型。
+    """
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+
+    def __call__(self, texts: List[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in tokenize(text):
+                h = zlib.crc32(token.encode("utf-8"))
+                matrix[row, h % self.dim] += 1.0 if (h >> 31) & 1 else -1.0
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-12)
+
+
+class DenseIndex:
+    """
+    L2 归一化后的 float32 矩阵，余弦相似度 = 点积。
+    按容量倍增预分配，追加为 O(1) 摊销；查询批量矩阵乘 + argpartition 取 top-k，并按块计算控制临时内存。
+    """
+
+    def __init__(self, dim: int, block_rows: int = 262144):
+        self.dim = dim
+        self.block_rows = block_rows
+        self._matrix = np.zeros((0, dim), dtype=np.float32)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def matrix(self) -> np.ndarray:
+        return self._matrix[:self._size]
+
+    def add(self, vectors: np.ndarray) -> np.ndarray:
+        """追加向量（自动归一化），返回其文档号"""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        needed = self._size + len(vectors)
+        if needed > len(self._matrix):
+            grown = np.zeros((max(needed, 2 * len(self._matrix), 1024), self.dim), dtype=np.float32)
+            grown[:self._size] = self._matrix[:self._size]
+            self._matrix = grown
+        self._matrix[self._size:needed] = vectors
+        ids = np.arange(self._size, needed, dtype=np.int64)
+        self._size = needed
+        return ids
+
+    def search(self, queries: np.ndarray, k: int = 10) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """批量查询：queries 形状 (Q, dim)，返回每个查询的 (文档号, 余弦相似度)"""
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+        if self._size == 0:
+            return [(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)) for _ in queries]
+        best_ids = [[] for _ in queries]
+        best_scores = [[] for _ in queries]
+        for start in range(0, self._size, self.block_rows):
+            block = self._matrix[start:min(start + self.block_rows, self._size)]
+            sims = queries @ block.T  # (Q, 块大小)
+            kk = min(k, sims.shape[1])
+            part = np.argpartition(-sims, kk - 1, axis=1)[:, :kk]
+            for q in range(len(queries)):
+                best_ids[q].append(part[q] + start)
+                best_scores[q].append(sims[q, part[q]])
+        return [_top_k(np.concatenate(ids), np.concatenate(scores), k) for ids, scores in zip(best_ids, best_scores)]
+
+
+# ======================== 4. 混合检索（RRF 融合） ========================
+def reciprocal_rank_fusion(rankings: List[np.ndarray], k: int = 60) -> Dict[int, float]:
+    """RRF：score(d) = Σ 1 / (k + rank)，rank 从 1 开始"""
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking.tolist(), 1):
+            fused[doc] = fused.get(doc, 0.0) + 1.0 / (k + rank)
+    return fused
+
+
+@dataclass
+class RetrievedChunk:
+    """检索结果：一个文本块及其所属文章"""
+    text: str
+    url: str
+    title: Optional[str]
+    published_at: Optional[str]
+    score: float
+    bm25_rank: Optional[int] = None
+    dense_rank: Optional[int] = None
+
+
+class HybridRetriever:
+    """
+    基于 NewsArticle 的本地混合检索引擎：
+    文章正文按段落/句子切块 → 同时写入 BM25 倒排索引与向量索引 → 查询时两路各取候选，RRF 融合排序。
+    """
+
+    def __init__(self, embed_fn: Optional[EmbedFn] = None, dim: int = 256, chunk_tokens: int = 300, rrf_k: int = 60):
+        self.embed_fn = embed_fn or HashingEmbedding(dim)
+        self.bm25 = BM25Index()
+        self.dense: Optional[DenseIndex] = None
+        self.chunk_tokens = chunk_tokens
+        self.rrf_k = rrf_k
+        self.chunks: List[str] = []
+        self.chunk_article: List[int] = []
+        self.articles: List[NewsArticle] = []
+        self._article_ids: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def add_articles(self, articles: Sequence[NewsArticle], batch_size: int = 256) -> int:
+        """加入文章（按 URL 去重），返回新增的文本块数"""
+        new_chunks = []
+        for article in articles:
+            if not article.url or article.url in self._article_ids:
+                continue
+            article_id = len(self.articles)
+            self._article_ids[article.url] = article_id
+            self.articles.append(article)
+            body = article.core_content or (article.raw_metadata or {}).get("description") or ""
+            pieces = chunk_text(body, self.chunk_tokens) or [""]
+            for piece in pieces:
+                # 标题拼入每个块，短块也能按标题召回
+                new_chunks.append((f"{article.title or ''}\n{piece}".strip(), article_id))
+
+        for start in range(0, len(new_chunks), batch_size):
+            batch = new_chunks[start:start + batch_size]
+            texts = [text for text, _ in batch]
+            vectors = np.asarray(self.embed_fn(texts), dtype=np.float32)
+            if self.dense is None:
+                self.dense = DenseIndex(vectors.shape[1])
+            self.dense.add(vectors)
+            for text, article_id in batch:
+                self.bm25.add(tokenize(text))
+                self.chunks.append(text)
+                self.chunk_article.append(article_id)
+        return len(new_chunks)
+
+    def search_many(self, queries: List[str], top_k: int = 5, candidates: int = 50) -> List[List[RetrievedChunk]]:
+        """批量检索：向量部分一次矩阵乘完成所有查询"""
+        if not self.chunks:
+            return [[] for _ in queries]
+        dense_results = self.dense.search(np.asarray(self.embed_fn(queries), dtype=np.float32), candidates)
+        results = []
+        for query, (dense_ids, dense_scores) in zip(queries, dense_results):
+            dense_ids = dense_ids[dense_scores > 0]  # 与查询不相关（余弦 ≤ 0）的块不参与融合
+            bm25_ids, _ = self.bm25.search(self.bm25.term_ids(tokenize(query)), candidates)
+            fused = reciprocal_rank_fusion([bm25_ids, dense_ids], self.rrf_k)
+            bm25_rank = {d: r for r, d in enumerate(bm25_ids.tolist(), 1)}
+            dense_rank = {d: r for r, d in enumerate(dense_ids.tolist(), 1)}
+            hits = []
+            for doc, score in sorted(fused.items(), key=lambda x: -x[1])[:top_k]:
+                article = self.articles[self.chunk_article[doc]]
+                hits.append(RetrievedChunk(
+                    text=self.chunks[doc], url=article.url, title=article.title,
+                    published_at=article.published_at, score=score,
+                    bm25_rank=bm25_rank.get(doc), dense_rank=dense_rank.get(doc),
+                ))
+            results.append(hits)
+        return results
+
+    def search(self, query: str, top_k: int = 5, candidates: int = 50) -> List[RetrievedChunk]:
+        return self.search_many([query], top_k, candidates)[0]
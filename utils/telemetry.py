@@ -0,0 +1,466 @@
+import atexit
+import contextvars
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+
+# ======================== 1. 开关与配置 ========================
+# NEWS_AGENTS_TELEMETRY=1 开启；关闭时 span() 返回共享的空对象，几乎没有额外开销
+TELEMETRY_ENV = "NEWS_AGENTS_TELEMETRY"
+TRACE_FILE_ENV = "NEWS_AGENTS_TRACE_FILE"        # JSONL 追踪日志路径
+METRICS_FILE_ENV = "NEWS_AGENTS_METRICS_FILE"    # Prometheus 文本文件路径（定时刷新 + 进程退出/flush 时写入）
+METRICS_FLUSH_ENV = "NEWS_AGENTS_METRICS_FLUSH_INTERVAL"  # 文本文件定时刷新间隔（秒），0 表示只在退出/flush 时写入
+METRICS_PORT_ENV = "NEWS_AGENTS_METRICS_PORT"    # 设置后在该端口提供 /metrics
+METRICS_HOST_ENV = "NEWS_AGENTS_METRICS_HOST"    # /metrics 监听地址，默认只监听本机；对外暴露需显式设为 0.0.0.0
+LOG_FORMAT_ENV = "NEWS_AGENTS_LOG_FORMAT"        # text（默认，与原 print 输出一致）/ json
+LOG_LEVEL_ENV = "NEWS_AGENTS_LOG_LEVEL"
+
+# 耗时直方图分桶（秒）：覆盖毫秒级模板渲染到分钟级长文总结
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# 这些数值属性累加为计数器：news_agents_span_<属性>_total
+COUNTED_ATTRS = ("bytes", "prompt_tokens", "completion_tokens")
+DEFAULT_METRICS_HOST = "127.0.0.1"
+DEFAULT_FLUSH_INTERVAL = 15.0
+
+
+def _env_flag(name: str) -> bool:
+    return os.getenv(name, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+# ======================== 2. 指标注册表 ========================
+class MetricsRegistry:
+    """进程内指标：计数器 + 耗时直方图，按 (指标名, 标签) 聚合，可导出为 Prometheus 文本格式"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self._histograms: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], list] = {}
+
+    def inc(self, name: str, value: float = 1.0, **labels) -> None:
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = [[0] * len(DURATION_BUCKETS), 0.0, 0]
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if seconds <= bound:
+                    hist[0][i] += 1
+            hist[1] += seconds
+            hist[2] += 1
+
+    @staticmethod
+    def _labels(labels: Tuple[Tuple[str, str], ...], extra: str = "") -> str:
+        parts = ['%s="%s"' % (k, v.replace("\\", "\\\\").replace('"', '\\"')) for k, v in labels]
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+    def prometheus_text(self) -> str:
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {k: [list(v[0]), v[1], v[2]] for k, v in self._histograms.items()}
+        lines, typed = [], set()
+        for (name, labels), value in sorted(counters.items()):
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            lines.append(f"{name}{self._labels(labels)} {value:g}")
+        for (name, labels), (buckets, total, count) in sorted(histograms.items()):
+            if name not in typed:
+                lines.append(f"# TYPE {name} histogram")
+                typed.add(name)
+            for bound, n in zip(DURATION_BUCKETS, buckets):
+                le = 'le="%g"' % bound
+                lines.append(f"{name}_bucket{self._labels(labels, le)} {n}")
+            inf = 'le="+Inf"'
+            lines.append(f"{name}_bucket{self._labels(labels, inf)} {count}")
+            lines.append(f"{name}_sum{self._labels(labels)} {total:.6f}")
+            lines.append(f"{name}_count{self._labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, float]:
+        """计数器的扁平快照（调试 / 测试用）"""
+        with self._lock:
+            return {f"{name}{self._labels(labels)}": value for (name, labels), value in self._counters.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+# ======================== 3. Span ========================
+_current_span: contextvars.ContextVar = contextvars.ContextVar("news_agents_span", default=None)
+
+
+class _NoopSpan:
+    """关闭时使用的共享空 span：所有操作都是空函数"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs) -> "_NoopSpan":
+        return self
+
+    def fail(self, error: Any) -> "_NoopSpan":
+        return self
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    """一次被追踪的操作：耗时、属性（字节数 / token / 缓存命中 / 错误等），支持嵌套（父子关系按上下文传递）"""
+    __slots__ = ("name", "attrs", "trace_id", "span_id", "parent_id", "error", "_start", "_wall", "_token")
+
+    def __init__(self, name: str, attrs: Dict[str, Any]):
+        self.name = name
+        self.attrs = attrs
+        self.error: Optional[str] = None
+        parent = _current_span.get()
+        self.trace_id = parent.trace_id if parent else os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.span_id = os.urandom(8).hex()
+
+    def __enter__(self) -> "Span":
+        self._wall = time.time()
+        self._start = time.perf_counter()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        duration = time.perf_counter() - self._start
+        try:
+            _current_span.reset(self._token)
+        except ValueError:
+            # 流式接口（异步生成器）中途被放弃时，会在另一个任务（另一个 Context）中关闭，无需恢复
+            pass
+        if exc is not None and self.error is None:
+            self.error = f"{exc_type.__name__}: {str(exc)[:200]}"
+        _telemetry.finish(self, duration)
+        return False
+
+    def set(self, **attrs) -> "Span":
+        self.attrs.update(attrs)
+        return self
+
+    def fail(self, error: Any) -> "Span":
+        """标记失败但不抛异常（工具函数以 "错误：..." 字符串返回失败时使用）"""
+        self.error = str(error)[:200]
+        return self
+
+
+class Telemetry:
+    """全局追踪/指标状态：span 结束时更新指标并写 JSONL；导出 Prometheus 文本（文件或 HTTP 端点）"""
+
+    def __init__(self):
+        self.enabled = False
+        self.metrics = MetricsRegistry()
+        self.trace_path: Optional[str] = None
+        self.metrics_path: Optional[str] = None
+        self._trace_file = None
+        self._trace_lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self.flush_interval = DEFAULT_FLUSH_INTERVAL
+        self._flusher: Optional[threading.Thread] = None
+        self._flusher_lock = threading.Lock()
+        self._metrics_file_lock = threading.Lock()  # 定时线程与 atexit/手动 flush 共用同一个 .tmp 文件
+
+    def configure(
+        self,
+        enabled: bool = True,
+        trace_path: Optional[str] = None,
+        metrics_path: Optional[str] = None,
+        metrics_port: Optional[int] = None,
+        metrics_host: str = DEFAULT_METRICS_HOST,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+    ) -> None:
+        self.flush()
+        with self._trace_lock:
+            if self._trace_file:
+                self._trace_file.close()
+                self._trace_file = None
+        self.enabled = enabled
+        self.trace_path = trace_path
+        self.metrics_path = metrics_path
+        self.flush_interval = flush_interval
+        if enabled and metrics_port and self._server is None:
+            self._start_server(metrics_host, metrics_port)
+        if enabled and metrics_path and flush_interval > 0:
+            self._start_flusher()
+
+    def finish(self, span: Span, duration: float) -> None:
+        status = "error" if span.error else "ok"
+        self.metrics.observe("news_agents_span_duration_seconds", duration, span=span.name)
+        self.metrics.inc("news_agents_span_total", span=span.name, status=status)
+        for attr in COUNTED_ATTRS:
+            value = span.attrs.get(attr)
+            if isinstance(value, (int, float)):
+                self.metrics.inc(f"news_agents_span_{attr}_total", value, span=span.name)
+        cache = span.attrs.get("cache")
+        if cache:
+            self.metrics.inc("news_agents_cache_total", span=span.name, result=cache)
+        if self.trace_path:
+            record = {
+                "ts": round(span._wall, 6), "name": span.name, "trace_id": span.trace_id, "span_id": span.span_id,
+                "parent_id": span.parent_id, "duration_ms": round(duration * 1000, 3), "status": status,
+                "error": span.error, "attrs": span.attrs,
+            }
+            self._write_trace(json.dumps(record, ensure_ascii=False, default=str))
+
+    def _write_trace(self, line: str) -> None:
+        with self._trace_lock:
+            if self._trace_file is None:
+                os.makedirs(os.path.dirname(os.path.abspath(self.trace_path)), exist_ok=True)
+                self._trace_file = open(self.trace_path, "a", encoding="utf-8", buffering=1 << 16)
+            self._trace_file.write(line + "\n")
+
+    def flush(self) -> None:
+        """刷新 JSONL 缓冲区，并把当前指标写入 Prometheus 文本文件（原子替换）"""
+        with self._trace_lock:
+            if self._trace_file:
+                self._trace_file.flush()
+        if self.enabled and self.metrics_path:
+            with self._metrics_file_lock:
+                os.makedirs(os.path.dirname(os.path.abspath(self.metrics_path)), exist_ok=True)
+                tmp_path = self.metrics_path + ".tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    f.write(self.metrics.prometheus_text())
+                os.replace(tmp_path, self.metrics_path)
+
+    def _start_flusher(self) -> None:
+        """后台定时刷新：长时间运行的任务无需等到退出，文本文件也能反映最新指标（整个进程只起一个线程）"""
+        with self._flusher_lock:
+            if self._flusher is not None:
+                return
+            self._flusher = threading.Thread(target=self._flush_loop, name="telemetry-flush", daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self) -> None:
+        # 每轮读取当前间隔：重新 configure 后立即生效；关闭或间隔为 0 时线程空转等待，不写文件
+        while True:
+            time.sleep(self.flush_interval if self.flush_interval > 0 else DEFAULT_FLUSH_INTERVAL)
+            if not (self.enabled and self.metrics_path and self.flush_interval > 0):
+                continue
+            try:
+                self.flush()
+            except OSError as e:
+                get_logger(__name__).warning(f"⚠️ 指标文件刷新失败（下一轮重试）：{e}")
+
+    def _start_server(self, host: str, port: int) -> None:
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+
+_telemetry = Telemetry()
+atexit.register(_telemetry.flush)
+
+
+def configure_telemetry(
+    enabled: bool = True,
+    trace_path: Optional[str] = None,
+    metrics_path: Optional[str] = None,
+    metrics_port: Optional[int] = None,
+    metrics_host: str = DEFAULT_METRICS_HOST,
+    flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+) -> Telemetry:
+    """
+    代码中开启/关闭追踪（环境变量方式见模块顶部）。
+    :param trace_path: JSONL 追踪日志路径，None 时不写追踪日志（只聚合指标）
+    :param metrics_path: Prometheus 文本文件路径（可配合 node_exporter textfile collector）
+    :param metrics_port: 提供 HTTP /metrics 的端口
+    :param metrics_host: /metrics 监听地址，默认只监听本机（127.0.0.1）
+    :param flush_interval: Prometheus 文本文件的定时刷新间隔（秒），0 表示只在退出/flush 时写入
+    """
+    _telemetry.configure(enabled, trace_path, metrics_path, metrics_port, metrics_host, flush_interval)
+    return _telemetry
+
+
+def get_telemetry() -> Telemetry:
+    return _telemetry
+
+
+def telemetry_enabled() -> bool:
+    return _telemetry.enabled
+
+
+def span(name: str, **attrs):
+    """
+    追踪一段操作：with span("tool.search_news", query=q) as sp: ... sp.set(bytes=n)
+    关闭时返回共享空对象，开销仅为一次属性判断。
+    """
+    if not _telemetry.enabled:
+        return NOOP_SPAN
+    return Span(name, attrs)
+
+
+def propagate(fn):
+    """
+    把当前 span 带入线程池，使工作线程中的 span 挂在调用方之下：executor.map(propagate(fn), items)。
+    关闭时原样返回 fn。
+    """
+    if not _telemetry.enabled:
+        return fn
+    parent = _current_span.get()
+
+    def _run(*args, **kwargs):
+        token = _current_span.set(parent)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current_span.reset(token)
+
+    return _run
+
+
+def count(name: str, value: float = 1.0, **labels) -> None:
+    """累加一个自定义计数器（关闭时不记录）"""
+    if _telemetry.enabled:
+        _telemetry.metrics.inc(name, value, **labels)
+
+
+if _env_flag(TELEMETRY_ENV):
+    _telemetry.configure(
+        True,
+        os.getenv(TRACE_FILE_ENV) or os.path.join(os.getcwd(), "data", "telemetry", "traces.jsonl"),
+        os.getenv(METRICS_FILE_ENV) or None,
+        int(os.getenv(METRICS_PORT_ENV)) if os.getenv(METRICS_PORT_ENV) else None,
+        os.getenv(METRICS_HOST_ENV) or DEFAULT_METRICS_HOST,
+        float(os.getenv(METRICS_FLUSH_ENV)) if os.getenv(METRICS_FLUSH_ENV) else DEFAULT_FLUSH_INTERVAL,
+    )
+
+
+# ======================== 4. LangChain 回调：LLM 调用 span ========================
+def llm_callback_handler(model_name: str, cache_namespace: Optional[str] = None):
+    """
+    挂载到 get_qwen_llm 创建的模型上的回调：每次 LLM 调用（invoke / batch 中的每一项 / ainvoke）生成一个
+    "llm.<模型名>" span，记录 prompt/completion token、缓存命中与错误；父 span 为调用方 Agent 的 span。
+    langchain_core 在此处才导入。
+    """
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class TelemetryCallbackHandler(BaseCallbackHandler):
+        def __init__(self):
+            self._spans: Dict[Any, Span] = {}
+            self._lock = threading.Lock()
+
+        def _start(self, run_id) -> None:
+            if not _telemetry.enabled:
+                return
+            sp = Span(f"llm.{model_name}", {"cache_namespace": cache_namespace} if cache_namespace else {})
+            sp._wall, sp._start = time.time(), time.perf_counter()
+            with self._lock:
+                self._spans[run_id] = sp
+
+        def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+            self._start(run_id)
+
+        def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+            self._start(run_id)
+
+        def on_llm_new_token(self, token, *, run_id, **kwargs):
+            # 仅流式调用触发：记录首 token 延迟（用户真正感受到的等待时间）
+            sp = self._spans.get(run_id)
+            if sp is not None and "first_token_ms" not in sp.attrs:
+                sp.set(first_token_ms=round((time.perf_counter() - sp._start) * 1000, 1))
+
+        def _end(self, run_id, response=None, error: Optional[BaseException] = None) -> None:
+            with self._lock:
+                sp = self._spans.pop(run_id, None)
+            if sp is None:
+                return
+            usage = ((response.llm_output or {}).get("token_usage") or {}) if response is not None else {}
+            if usage:
+                sp.set(prompt_tokens=usage.get("prompt_tokens", 0), completion_tokens=usage.get("completion_tokens", 0))
+            if cache_namespace and response is not None:
+                # 命中响应缓存时不会请求接口，结果中没有 token 用量（流式调用不走缓存，也没有用量）
+                sp.set(cache="miss" if usage or "first_token_ms" in sp.attrs else "hit")
+            if error is not None:
+                sp.fail(f"{type(error).__name__}: {error}")
+            _telemetry.finish(sp, time.perf_counter() - sp._start)
+
+        def on_llm_end(self, response, *, run_id, **kwargs):
+            self._end(run_id, response=response)
+
+        def on_llm_error(self, error, *, run_id, **kwargs):
+            self._end(run_id, error=error)
+
+    return TelemetryCallbackHandler()
+
+
+# ======================== 5. 结构化日志 ========================
+class _JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": round(record.created, 3), "level": record.levelname.lower(),
+            "logger": record.name, "msg": record.getMessage(),
+        }
+        current = _current_span.get()
+        if current is not None:
+            payload.update(trace_id=current.trace_id, span_id=current.span_id)
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False)
+
+
+class _StdoutHandler(logging.StreamHandler):
+    """始终写入当前的 sys.stdout（基准脚本等重定向 stdout 后同样生效）"""
+
+    def __init__(self):
+        super().__init__(sys.stdout)
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+_root_logger = logging.getLogger("news_agents")
+if not _root_logger.handlers:
+    _handler = _StdoutHandler()
+    # 默认只输出消息本身，与原先 print 的显示效果一致；json 模式附带级别、模块与 trace_id
+    _handler.setFormatter(_JsonFormatter() if os.getenv(LOG_FORMAT_ENV, "").lower() == "json"
+                          else logging.Formatter("%(message)s"))
+    _root_logger.addHandler(_handler)
+    _root_logger.setLevel(os.getenv(LOG_LEVEL_ENV, "INFO").upper())
+    _root_logger.propagate = False
+
+
+def get_logger(name: str) -> logging.Logger:
+    """各模块的日志器：get_logger(__name__) → news_agents.<模块名>"""
+    return _root_logger.getChild(name)
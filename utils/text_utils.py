@@ -0,0 +1,85 @@
+import re
+
+# 中日韩统一表意文字及全角标点：大多数分词器下约 1 字 ≈ 1 token
+_CJK_RE = re.compile(r"[　-〿㐀-䶿一-鿿豈-﫿＀-￯]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    粗略估算 token 数（无需加载分词器）：
+    中文字符按 1 字 1 token，其余字符按约 4 字符 1 token 计算。
+    用于切分 Prompt 输入时控制上限，宁可略微高估。
+    """
+    if not text:
+        return 0
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+# 句末标点：中文句号/问号/叹号/分号（含后随引号），英文句末标点后需跟空白
+_SENTENCE_END_RE = re.compile(r"(?<=[。！？；!?])[”’」』）)]*|(?<=[.!?;])[\"')\]]*(?=\s)")
+
+
+def split_sentences(text: str) -> list:
+    """按中英文句末标点切分句子，保留标点；不会在英文小数点、缩写内部错误切分（要求后随空白）"""
+    sentences, start = [], 0
+    for match in _SENTENCE_END_RE.finditer(text):
+        end = match.end()
+        if end > start:
+            sentence = text[start:end].strip()
+            if sentence:
+                sentences.append(sentence)
+            start = end
+    tail = text[start:].strip()
+    if tail:
+        sentences.append(tail)
+    return sentences
+
+
+def _hard_split(text: str, max_tokens: int) -> list:
+    """没有任何标点可切的超长片段：按字符数硬切（中文 1 字 ≈ 1 token，取保守值）"""
+    step = max(1, max_tokens)
+    return [text[i:i + step] for i in range(0, len(text), step)]
+
+
+def chunk_text(text: str, max_tokens: int = 3000) -> list:
+    """
+    按 token 预算切分长文本，优先在段落边界、其次在句子边界切分：
+    - 段落（空行/换行分隔）能整体放入当前块时整体放入；
+    - 单个段落超出预算时按句子拆开再装箱；
+    - 单个句子仍超预算时按字符硬切。
+    返回的每块 estimate_tokens 均不超过 max_tokens。
+    """
+    paragraphs = [p.strip() for p in re.split(r"\n\s*\n|\n", text or "") if p.strip()]
+    pieces = []  # (文本片段, 所属段落序号)
+    for para_no, paragraph in enumerate(paragraphs):
+        if estimate_tokens(paragraph) <= max_tokens:
+            pieces.append((paragraph, para_no))
+            continue
+        for sentence in split_sentences(paragraph):
+            if estimate_tokens(sentence) <= max_tokens:
+                pieces.append((sentence, para_no))
+            else:
+                pieces.extend((part, para_no) for part in _hard_split(sentence, max_tokens))
+
+    chunks, current, current_tokens, last_para = [], [], 0, None
+    for piece, para_no in pieces:
+        # 跨段落用换行连接；同段落内的英文句子补空格，中文句子直接拼接
+        if not current:
+            sep = ""
+        elif para_no != last_para:
+            sep = "\n"
+        else:
+            sep = " " if piece[0].isascii() else ""
+        # 拼接后的估算值不超过各部分估算值之和，分隔符最多再加 1
+        piece_tokens = estimate_tokens(piece) + (1 if sep else 0)
+        if current and current_tokens + piece_tokens > max_tokens:
+            chunks.append("".join(current))
+            current, current_tokens, sep = [], 0, ""
+            piece_tokens = estimate_tokens(piece)
+        current.append(sep + piece)
+        current_tokens += piece_tokens
+        last_para = para_no
+    if current:
+        chunks.append("".join(current))
+    return chunks
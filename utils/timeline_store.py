@@ -0,0 +1,346 @@
+import hashlib
+import json
+import mmap
+import os
+import threading
+import unicodedata
+import zlib
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from utils.content_cache import normalize_url
+from utils.model import NewsArticle
+from utils.telemetry import get_logger
+
+logger = get_logger(__name__)
+
+# ======================== 1. 段文件格式 ========================
+# 每天一个段：{day}.dat 顺序存放 zlib 压缩的 JSON 记录，{day}.idx 为定长索引行（32 字节），
+# {day}.hsh 为该段 url_hash 列排序后的副本（URL 去重 / 点查时二分查找）。
+# 先写数据再写索引：进程中途退出时最多在 .dat 末尾留下无索引的孤立字节，读取方只认索引；
+# .hsh 最后写，行数与索引不一致时（旧数据或写入中途退出）由索引重建。
+IDX_DTYPE = np.dtype([
+    ("ts", "<i8"),        # 发布时间（UTC 秒）
+    ("url_hash", "<u8"),  # 规范化 URL 的 64 位哈希
+    ("source", "<u4"),    # 来源编号（见 sources.json）
+    ("length", "<u4"),    # 记录字节数
+    ("offset", "<u8"),    # 记录在 .dat 中的偏移
+])
+UNKNOWN_SOURCE = 0
+
+DateLike = Union[str, date, datetime, None]
+
+
+def url_hash(url: str) -> int:
+    return int.from_bytes(hashlib.blake2b(normalize_url(url).encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _to_datetime(value: DateLike, end_of_day: bool = False) -> Optional[datetime]:
+    """ISO 字符串 / date / datetime → UTC datetime；仅给出日期时按当天起点（或终点）处理"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        text = value.strip()
+        if len(text) == 10:
+            value = date.fromisoformat(text)
+        else:
+            value = datetime.fromisoformat(text.replace("Z", "+00:00"))
+    if not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day, tzinfo=timezone.utc)
+        if end_of_day:
+            value += timedelta(days=1, microseconds=-1)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _published_datetime(article: NewsArticle) -> Optional[datetime]:
+    """解析文章发布时间；格式无法识别时记录警告并返回 None（该条跳过，不影响同批其余文章）"""
+    try:
+        return _to_datetime(article.published_at)
+    except (TypeError, ValueError) as e:
+        logger.warning(f"⚠️ 发布时间无法解析，跳过写入时间线：{article.url}（{article.published_at!r}：{e}）")
+        return None
+
+
+def _matches(article: NewsArticle, terms: List[str]) -> bool:
+    text = unicodedata.normalize("NFKC", f"{article.title or ''}\n{article.core_content}").lower()
+    return all(term in text for term in terms)
+
+
+def _file_version(path: str) -> Tuple[int, int, int]:
+    # 追加改变大小，compact 的原子替换改变 inode：任一变化都需要重新映射
+    st = os.stat(path)
+    return st.st_size, st.st_ino, st.st_mtime_ns
+
+
+def _write_url_hashes(hsh_path: str, hashes: np.ndarray) -> None:
+    tmp_path = hsh_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(np.sort(hashes).astype("<u8").tobytes())
+    os.replace(tmp_path, hsh_path)
+
+
+class _Segment:
+    """单日段的只读视图：索引、排序的 URL 哈希与数据均为内存映射，不占用常驻内存"""
+
+    def __init__(self, idx_path: str, dat_path: str, hsh_path: str):
+        self.version = _file_version(idx_path)
+        rows = self.version[0] // IDX_DTYPE.itemsize  # 忽略写了一半的索引行
+        self.index = np.memmap(idx_path, dtype=IDX_DTYPE, mode="r", shape=(rows,)) if rows else np.zeros(0, IDX_DTYPE)
+        if not os.path.exists(hsh_path) or os.path.getsize(hsh_path) != rows * 8:
+            _write_url_hashes(hsh_path, self.index["url_hash"])
+        self.url_hashes = np.memmap(hsh_path, dtype="<u8", mode="r", shape=(rows,)) if rows else np.zeros(0, "<u8")
+        self._file = open(dat_path, "rb")
+        self.data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(dat_path) else b""
+        ts = self.index["ts"]
+        # 已整理（按时间升序）的段直接二分查找；追加中的段按需排序
+        self.order = None if rows < 2 or bool(np.all(ts[:-1] <= ts[1:])) else np.argsort(ts, kind="stable")
+        self.sorted_ts = ts if self.order is None else ts[self.order]
+
+    def has_urls(self, hashes: np.ndarray) -> np.ndarray:
+        """hashes 中哪些已在本段（在排序的 url_hash 列上二分查找）"""
+        if not len(self.url_hashes):
+            return np.zeros(len(hashes), dtype=bool)
+        positions = np.minimum(np.searchsorted(self.url_hashes, hashes), len(self.url_hashes) - 1)
+        return self.url_hashes[positions] == hashes
+
+    def record(self, row) -> Dict:
+        offset, length = int(row["offset"]), int(row["length"])
+        return json.loads(zlib.decompress(self.data[offset:offset + length]))
+
+    def rows_between(self, start_ts: int, end_ts: int) -> np.ndarray:
+        """返回时间在 [start_ts, end_ts] 内的索引行，按时间降序"""
+        lo = np.searchsorted(self.sorted_ts, start_ts, side="left")
+        hi = np.searchsorted(self.sorted_ts, end_ts, side="right")
+        positions = np.arange(hi - 1, lo - 1, -1)
+        return self.index[positions if self.order is None else self.order[positions]]
+
+    def close(self) -> None:
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self._file.close()
+
+
+# ======================== 2. 时间线索引 ========================
+class TimeLineIndex:
+    """
+    按发布日期分区的新闻文章存储（TimeLineIndex）：
+    - 每天一个段，记录紧凑存储（压缩 JSON），索引为定长数组，读取全部走内存映射，旧日期不占内存；
+    - 索引列：发布时间、URL 哈希、来源编号；另存每段排序的 URL 哈希，跨段去重 / 点查逐段二分查找，
+      不在内存中维护全量 URL 集合；
+    - scan() 按时间范围从新到旧扫描，可叠加来源与关键词过滤，无需再次调用 NewsAPI。
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or os.path.join(os.getcwd(), "data", "store", "timeline")
+        os.makedirs(self.root, exist_ok=True)
+        self._lock = threading.RLock()
+        self._segments: Dict[str, _Segment] = {}
+        self._sources_path = os.path.join(self.root, "sources.json")
+        self._sources: Dict[str, int] = {}
+        if os.path.exists(self._sources_path):
+            with open(self._sources_path, "r", encoding="utf-8") as f:
+                self._sources = json.load(f)
+
+    # ---------- 段文件 ----------
+    def _paths(self, day: str) -> Tuple[str, str]:
+        return os.path.join(self.root, f"{day}.idx"), os.path.join(self.root, f"{day}.dat")
+
+    def _hash_path(self, day: str) -> str:
+        return os.path.join(self.root, f"{day}.hsh")
+
+    def days(self) -> List[str]:
+        """已有数据的日期（升序）"""
+        return sorted(name[:-4] for name in os.listdir(self.root) if name.endswith(".idx"))
+
+    def _segment(self, day: str) -> Optional[_Segment]:
+        idx_path, dat_path = self._paths(day)
+        if not os.path.exists(idx_path):
+            return None
+        with self._lock:
+            segment = self._segments.get(day)
+            if segment is None or segment.version != _file_version(idx_path):
+                # 旧视图可能仍被进行中的 scan 使用，不主动关闭，由引用计数回收
+                segment = self._segments[day] = _Segment(idx_path, dat_path, self._hash_path(day))
+            return segment
+
+    def _source_id(self, source: Optional[str]) -> int:
+        if not source:
+            return UNKNOWN_SOURCE
+        if source not in self._sources:
+            self._sources[source] = len(self._sources) + 1
+            tmp_path = self._sources_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._sources, f, ensure_ascii=False)
+            os.replace(tmp_path, self._sources_path)
+        return self._sources[source]
+
+    def _known_urls(self, hashes: np.ndarray) -> np.ndarray:
+        """hashes 中哪些已入库：逐段在排序的 url_hash 列上二分查找（新日期在前，全部命中即停止）"""
+        known = np.zeros(len(hashes), dtype=bool)
+        for day in reversed(self.days()):
+            if known.all():
+                break
+            known |= self._segment(day).has_urls(hashes)
+        return known
+
+    def _find_day(self, h: int) -> Optional[str]:
+        hashes = np.array([h], dtype=np.uint64)
+        for day in reversed(self.days()):
+            if self._segment(day).has_urls(hashes)[0]:
+                return day
+        return None
+
+    # ---------- 写入 ----------
+    def add(self, articles: Iterable[NewsArticle], extra: Optional[Dict[str, Dict]] = None) -> int:
+        """
+        追加文章（按规范化 URL 去重，缺少或无法解析发布时间的文章跳过），返回新写入条数。
+        :param extra: URL → 附加字段（如总结），随记录保存，读取时放在 NewsArticle.raw_metadata 中
+        """
+        extra = extra or {}
+        by_day: Dict[str, List[Tuple[int, int, int, bytes]]] = {}
+        with self._lock:
+            candidates = [
+                (article, published, url_hash(article.url))
+                for article in articles if article.url and article.published_at
+                for published in [_published_datetime(article)] if published is not None
+            ]
+            known = self._known_urls(np.array([h for _, _, h in candidates], dtype=np.uint64))
+            added = set()  # 本批内去重
+            for (article, published, h), is_known in zip(candidates, known.tolist()):
+                if is_known or h in added:
+                    continue
+                added.add(h)
+                day = published.date().isoformat()
+                payload = article.model_dump(exclude={"raw_metadata"})
+                if article.url in extra:
+                    payload["raw_metadata"] = extra[article.url]
+                blob = zlib.compress(json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+                by_day.setdefault(day, []).append((int(published.timestamp()), h, self._source_id(article.source), blob))
+
+            for day, records in by_day.items():
+                idx_path, dat_path = self._paths(day)
+                with open(dat_path, "ab") as dat:
+                    offset = dat.tell()
+                    rows = np.zeros(len(records), dtype=IDX_DTYPE)
+                    for i, (ts, h, source_id, blob) in enumerate(records):
+                        rows[i] = (ts, h, source_id, len(blob), offset)
+                        dat.write(blob)
+                        offset += len(blob)
+                    dat.flush()
+                    os.fsync(dat.fileno())
+                # 索引文件末尾可能残留写了一半的行：先截到整行再追加
+                with open(idx_path, "ab") as idx:
+                    whole = idx.tell() // IDX_DTYPE.itemsize * IDX_DTYPE.itemsize
+                    idx.truncate(whole)
+                    idx.write(rows.tobytes())
+                # 排序的哈希列整体重写（单日数据量小）；在此之前退出时，下次打开该段会由索引重建
+                _write_url_hashes(self._hash_path(day), np.fromfile(idx_path, dtype=IDX_DTYPE)["url_hash"])
+        return sum(len(records) for records in by_day.values())
+
+    def compact(self) -> int:
+        """把追加中的段的索引按时间排序后原子替换（数据文件不动），返回整理的段数"""
+        compacted = 0
+        with self._lock:
+            for day in self.days():
+                segment = self._segment(day)
+                if segment.order is None:
+                    continue
+                idx_path, _ = self._paths(day)
+                tmp_path = idx_path + ".tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(np.ascontiguousarray(segment.index[segment.order]).tobytes())
+                os.replace(tmp_path, idx_path)
+                compacted += 1
+        return compacted
+
+    # ---------- 查询 ----------
+    def contains(self, url: str) -> bool:
+        with self._lock:
+            return self._find_day(url_hash(url)) is not None
+
+    def contains_many(self, urls: List[str]) -> List[bool]:
+        """批量判断 URL 是否已入库（每段一次向量化二分查找，比逐条 contains 快得多）"""
+        with self._lock:
+            return self._known_urls(np.array([url_hash(u) for u in urls], dtype=np.uint64)).tolist()
+
+    def get(self, url: str) -> Optional[NewsArticle]:
+        h = url_hash(url)
+        with self._lock:
+            day = self._find_day(h)
+        segment = self._segment(day) if day else None
+        if segment is None:
+            return None
+        rows = segment.index[segment.index["url_hash"] == h]
+        return NewsArticle(**segment.record(rows[0])) if len(rows) else None
+
+    def scan(
+        self,
+        start: DateLike = None,
+        end: DateLike = None,
+        source: Optional[str] = None,
+        query: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[NewsArticle]:
+        """
+        按时间范围从新到旧扫描文章。
+        :param start / end: 时间范围（含边界）；只给日期时 end 包含当天全天
+        :param source: 只返回该来源的文章
+        :param query: 空格分隔的关键词，标题或正文须全部包含（不区分大小写）
+        :param limit: 最多返回条数
+        """
+        start_dt, end_dt = _to_datetime(start), _to_datetime(end, end_of_day=True)
+        start_ts = int(start_dt.timestamp()) if start_dt else np.iinfo(np.int64).min
+        end_ts = int(end_dt.timestamp()) if end_dt else np.iinfo(np.int64).max
+        source_id = self._sources.get(source) if source else None
+        if source and source_id is None:
+            return
+        terms = unicodedata.normalize("NFKC", query or "").lower().split()
+
+        produced = 0
+        for day in reversed(self.days()):
+            if (start_dt and day < start_dt.date().isoformat()) or (end_dt and day > end_dt.date().isoformat()):
+                continue
+            segment = self._segment(day)
+            rows = segment.rows_between(start_ts, end_ts)
+            if source_id is not None:
+                rows = rows[rows["source"] == source_id]
+            for row in rows:
+                article = NewsArticle(**segment.record(row))
+                if terms and not _matches(article, terms):
+                    continue
+                yield article
+                produced += 1
+                if limit is not None and produced >= limit:
+                    return
+
+    def stats(self) -> Dict:
+        days = self.days()
+        rows = sum(len(self._segment(day).index) for day in days)
+        size = sum(os.path.getsize(p) for day in days for p in (*self._paths(day), self._hash_path(day))
+                   if os.path.exists(p))
+        return {"days": len(days), "articles": rows, "bytes": size, "sources": len(self._sources)}
+
+    def close(self) -> None:
+        with self._lock:
+            for segment in self._segments.values():
+                segment.close()
+            self._segments.clear()
+
+
+# ======================== 3. 进程级共享实例 ========================
+_default_index: Optional[TimeLineIndex] = None
+_default_index_lock = threading.Lock()
+
+
+def get_timeline_index() -> TimeLineIndex:
+    """获取进程内共享的时间线索引实例（首次调用时创建）"""
+    global _default_index
+    if _default_index is None:
+        with _default_index_lock:
+            if _default_index is None:
+                _default_index = TimeLineIndex()
+    return _default_index
@@ -0,0 +1,492 @@
+import glob
+import json
+import os
+import sqlite3
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from utils.content_cache import normalize_url
+from utils.model import NewsArticle
+from utils.retrieval import EmbedFn, _top_k
+from utils.text_utils import chunk_text
+
+META_NAME = "meta.json"
+
+
+# ======================== 1. 量化与粗聚类 ========================
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def _quantize(residuals: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """逐向量对称 int8 量化：code = round(r / scale)，scale = max|r| / 127"""
+    scales = np.maximum(np.abs(residuals).max(axis=1) / 127.0, 1e-12).astype(np.float32)
+    codes = np.rint(residuals / scales[:, None]).clip(-127, 127).astype(np.int8)
+    return codes, scales
+
+
+def _nearest(vectors: np.ndarray, centroids: np.ndarray, block_rows: int = 65536) -> np.ndarray:
+    """按块计算最近（点积最大）的聚类中心，控制临时矩阵大小"""
+    assign = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), block_rows):
+        assign[start:start + block_rows] = np.argmax(vectors[start:start + block_rows] @ centroids.T, axis=1)
+    return assign
+
+
+def spherical_kmeans(vectors: np.ndarray, k: int, iters: int = 10, seed: int = 0) -> np.ndarray:
+    """球面 k-means（中心保持单位长度，与余弦相似度一致）；空簇用随机样本重新播种"""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=k, replace=False)].copy()
+    for _ in range(iters):
+        assign = _nearest(vectors, centroids)
+        counts = np.bincount(assign, minlength=k)
+        order = np.argsort(assign, kind="stable")
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        nonempty = counts > 0
+        sums = np.zeros_like(centroids)
+        # 按簇排序后 reduceat 分段求和（比 np.add.at 快一个数量级）
+        sums[nonempty] = np.add.reduceat(vectors[order], starts[nonempty], axis=0)
+        empty = ~nonempty
+        if empty.any():
+            sums[empty] = vectors[rng.choice(len(vectors), size=int(empty.sum()), replace=False)]
+        centroids = _normalize(sums)
+    return centroids.astype(np.float32)
+
+
+# ======================== 2. 不可变段 ========================
+@dataclass
+class _Segment:
+    """一次追加（或一次合并）写出的段：行按倒排表排序，offsets[l]:offsets[l+1] 为第 l 个表的行区间"""
+    name: str
+    codes: np.ndarray    # int8 (n, dim)，内存映射
+    scales: np.ndarray   # float32 (n,)，内存映射
+    ids: np.ndarray      # int64 (n,)，内存映射
+    offsets: np.ndarray  # int64 (nlist + 1,)，常驻内存
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+# ======================== 3. 量化向量索引 ========================
+class QuantizedVectorIndex:
+    """
+    磁盘常驻的向量索引（余弦相似度），面向百万级以上的新闻文本块：
+    - 存储：向量按 IVF 倒排表（球面 k-means 粗聚类）分组，保存相对聚类中心的残差 int8 码 + 每向量一个缩放系数，
+      每个向量占 dim + 12 字节（float32 需 4 × dim 字节）；码、缩放系数、ID 均为 .npy 文件并以内存映射方式打开，
+      常驻内存的只有聚类中心与各段的倒排偏移；
+    - 追加：每批写成一个新的不可变段（段内按倒排表排序），已有数据不重建；段数超过 max_segments 时合并最小的若干段；
+    - 删除：墓碑标记（记录在 SQLite 中，查询时过滤），段合并 / compact() 时物理清除；
+    - 查询：查询向量先与聚类中心打分，只扫描最相近的 nprobe 个倒排表，score ≈ q·c + scale × (q·code)；
+    - 向量与 NewsArticle 的 URL（及块序号）绑定，add_articles 按 URL 覆盖更新。
+    向量总数达到 min_train_size 之前不训练聚类（单个倒排表，即平铺扫描，小语料下足够快）；
+    达到后自动训练，并把已有段重编码为 IVF 段（此时数据量不超过 min_train_size 量级，可放入内存）。
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        dim: Optional[int] = None,
+        nlist: Optional[int] = None,
+        nprobe: int = 16,
+        min_train_size: int = 20000,
+        train_size: int = 65536,
+        max_segments: int = 16,
+    ):
+        """
+        :param path: 索引目录，默认 data/store/vectors
+        :param dim: 向量维度；打开已有索引时可省略，新索引省略时在第一次追加时确定
+        :param nlist: 倒排表数量，默认训练时取 4 × sqrt(向量数)（16 ~ 65536）；预期规模远大于训练时的数据量时建议显式指定
+        :param nprobe: 每次查询扫描的倒排表数（召回率与延迟的权衡，见 benchmarks/vector_index_bench.py）
+        :param min_train_size: 向量数达到该值时训练粗聚类
+        :param train_size: 训练 k-means 使用的最大样本数
+        :param max_segments: 段数上限，超过时合并最小的段
+        """
+        self.path = path or os.path.join(os.getcwd(), "data", "store", "vectors")
+        os.makedirs(self.path, exist_ok=True)
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.train_size = train_size
+        self.max_segments = max(2, max_segments)
+        self._lock = threading.RLock()
+
+        self._conn = sqlite3.connect(os.path.join(self.path, "vectors.sqlite"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS vectors (
+                id      INTEGER PRIMARY KEY,
+                url_key TEXT NOT NULL,
+                url     TEXT NOT NULL,
+                chunk   INTEGER NOT NULL,
+                deleted INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_vectors_url ON vectors(url_key);
+            """
+        )
+        self._conn.commit()
+        self._dead = {row[0] for row in self._conn.execute("SELECT id FROM vectors WHERE deleted = 1")}
+        self._dead_array: Optional[np.ndarray] = None
+
+        meta = self._read_meta()
+        if meta:
+            if dim is not None and dim != meta["dim"]:
+                raise ValueError(f"索引维度为 {meta['dim']}，与传入的 {dim} 不一致")
+            self.dim = meta["dim"]
+            self.trained = meta["trained"]
+            self._next_id = meta["next_id"]
+            self._seq = meta["seq"]
+            centroids = (np.load(os.path.join(self.path, "centroids.npy")) if self.trained
+                         else np.zeros((1, self.dim), dtype=np.float32))
+            segments = [self._load_segment(name) for name in meta["segments"]]
+            self._remove_orphans(meta["segments"])
+        else:
+            self.dim = dim
+            self.trained = False
+            self._next_id = 0
+            self._seq = 0
+            centroids = np.zeros((1, dim), dtype=np.float32) if dim else None
+            segments = []
+        # 映射行先于元数据提交：若在两者之间退出，SQLite 中会留下 ID ≥ 元数据 next_id 的行，
+        # 它们不属于任何段，删除后这些 ID 可以重新分配
+        with self._conn:
+            self._conn.execute("DELETE FROM vectors WHERE id >= ?", (self._next_id,))
+        self._dead = {i for i in self._dead if i < self._next_id}
+        # 查询读取的快照：(聚类中心, 段列表) 整体替换，训练 / 合并期间查询不会看到不一致的状态
+        self._state: Tuple[Optional[np.ndarray], List[_Segment]] = (centroids, segments)
+
+    def __len__(self) -> int:
+        return sum(len(seg) for seg in self._state[1]) - len(self._dead)
+
+    # ---------- 持久化 ----------
+    def _read_meta(self) -> Optional[Dict]:
+        try:
+            with open(os.path.join(self.path, META_NAME), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write_meta(self) -> None:
+        path = os.path.join(self.path, META_NAME)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "dim": self.dim, "trained": self.trained, "nlist": len(self._state[0]),
+                "next_id": self._next_id, "seq": self._seq, "segments": [seg.name for seg in self._state[1]],
+            }, f)
+        os.replace(tmp_path, path)  # 原子替换：段文件先写完，元数据最后切换，中途退出不会引用半写的段
+
+    def _segment_file(self, name: str, part: str) -> str:
+        return os.path.join(self.path, f"{name}.{part}.npy")
+
+    def _load_segment(self, name: str) -> _Segment:
+        return _Segment(
+            name=name,
+            codes=np.load(self._segment_file(name, "codes"), mmap_mode="r"),
+            scales=np.load(self._segment_file(name, "scales"), mmap_mode="r"),
+            ids=np.load(self._segment_file(name, "ids"), mmap_mode="r"),
+            offsets=np.load(self._segment_file(name, "offsets")),
+        )
+
+    def _remove_orphans(self, live: Sequence[str]) -> None:
+        """删除未被元数据引用的段文件（上次写段或合并中途退出的残留）"""
+        for path in glob.glob(os.path.join(self.path, "seg_*.npy")):
+            if os.path.basename(path).split(".")[0] not in live:
+                os.remove(path)
+
+    def _delete_segment_files(self, segments: Sequence[_Segment]) -> None:
+        for seg in segments:
+            for part in ("codes", "scales", "ids", "offsets"):
+                try:
+                    os.remove(self._segment_file(seg.name, part))
+                except FileNotFoundError:
+                    pass
+
+    def _dead_ids(self) -> Optional[np.ndarray]:
+        if not self._dead:
+            return None
+        if self._dead_array is None:
+            self._dead_array = np.fromiter(self._dead, dtype=np.int64, count=len(self._dead))
+        return self._dead_array
+
+    # ---------- 写段 ----------
+    def _encode_segment(self, centroids: np.ndarray, vectors: np.ndarray, ids: np.ndarray) -> _Segment:
+        """分配倒排表 → 残差量化 → 按表排序写成新段"""
+        assign = _nearest(vectors, centroids)
+        codes, scales = _quantize(vectors - centroids[assign])
+        order = np.argsort(assign, kind="stable")
+        offsets = np.zeros(len(centroids) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(assign, minlength=len(centroids)))
+        self._seq += 1
+        name = f"seg_{self._seq:06d}"
+        np.save(self._segment_file(name, "codes"), codes[order])
+        np.save(self._segment_file(name, "scales"), scales[order])
+        np.save(self._segment_file(name, "ids"), ids[order])
+        np.save(self._segment_file(name, "offsets"), offsets)
+        return self._load_segment(name)
+
+    def _merge_segments(self, segments: Sequence[_Segment], nlist: int) -> Tuple[_Segment, np.ndarray]:
+        """
+        合并若干段并清除其中的墓碑行：先统计每个倒排表的存活行数，再逐表流式写入预分配的内存映射文件，
+        内存占用与段大小无关。返回 (新段, 被物理清除的 ID)。
+        """
+        dead = self._dead_ids()
+        counts = np.zeros(nlist, dtype=np.int64)
+        purged = []
+        for seg in segments:
+            alive = np.ones(len(seg), dtype=bool) if dead is None else ~np.isin(seg.ids, dead)
+            if dead is not None:
+                purged.append(np.asarray(seg.ids[~alive]))
+            cumulative = np.concatenate([[0], np.cumsum(alive, dtype=np.int64)])
+            counts += cumulative[seg.offsets[1:]] - cumulative[seg.offsets[:-1]]
+        total = int(counts.sum())
+
+        self._seq += 1
+        name = f"seg_{self._seq:06d}"
+        open_memmap = np.lib.format.open_memmap
+        codes = open_memmap(self._segment_file(name, "codes"), mode="w+", dtype=np.int8, shape=(total, self.dim))
+        scales = open_memmap(self._segment_file(name, "scales"), mode="w+", dtype=np.float32, shape=(total,))
+        ids = open_memmap(self._segment_file(name, "ids"), mode="w+", dtype=np.int64, shape=(total,))
+        row = 0
+        for l in range(nlist):
+            for seg in segments:
+                start, end = seg.offsets[l], seg.offsets[l + 1]
+                if start == end:
+                    continue
+                seg_ids = np.asarray(seg.ids[start:end])
+                keep = slice(None) if dead is None else ~np.isin(seg_ids, dead)
+                part_ids = seg_ids[keep]
+                n = len(part_ids)
+                codes[row:row + n] = seg.codes[start:end][keep]
+                scales[row:row + n] = seg.scales[start:end][keep]
+                ids[row:row + n] = part_ids
+                row += n
+        for mm in (codes, scales, ids):
+            mm.flush()
+        del codes, scales, ids
+        offsets = np.zeros(nlist + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(counts)
+        np.save(self._segment_file(name, "offsets"), offsets)
+        purged_ids = np.concatenate(purged) if purged else np.zeros(0, dtype=np.int64)
+        return self._load_segment(name), purged_ids
+
+    def _forget(self, purged_ids: np.ndarray) -> None:
+        """物理清除后删除映射记录，墓碑随之移除"""
+        if not len(purged_ids):
+            return
+        purged = purged_ids.tolist()
+        with self._conn:
+            for start in range(0, len(purged), 500):
+                batch = purged[start:start + 500]
+                self._conn.execute(f"DELETE FROM vectors WHERE id IN ({','.join('?' * len(batch))})", batch)
+        self._dead.difference_update(purged)
+        self._dead_array = None
+
+    def _decode(self, centroids: np.ndarray, segments: Sequence[_Segment]) -> Tuple[np.ndarray, np.ndarray]:
+        """把段解码回 float32 向量（跳过墓碑行），仅用于训练前的小规模数据"""
+        dead = self._dead_ids()
+        vectors, ids = [], []
+        for seg in segments:
+            for l in np.nonzero(np.diff(seg.offsets))[0]:
+                start, end = seg.offsets[l], seg.offsets[l + 1]
+                vectors.append(centroids[l] + np.asarray(seg.codes[start:end], dtype=np.float32)
+                               * np.asarray(seg.scales[start:end])[:, None])
+                ids.append(np.asarray(seg.ids[start:end]))
+        if not ids:
+            return np.zeros((0, self.dim), dtype=np.float32), np.zeros(0, dtype=np.int64)
+        vectors, ids = np.concatenate(vectors), np.concatenate(ids)
+        if dead is not None:
+            keep = ~np.isin(ids, dead)
+            vectors, ids = vectors[keep], ids[keep]
+        return _normalize(vectors).astype(np.float32), ids
+
+    def _maybe_train(self) -> None:
+        centroids, segments = self._state
+        if self.trained or sum(len(seg) for seg in segments) - len(self._dead) < self.min_train_size:
+            return
+        vectors, ids = self._decode(centroids, segments)
+        rng = np.random.default_rng(0)
+        sample = vectors[rng.choice(len(vectors), size=min(len(vectors), self.train_size), replace=False)]
+        nlist = self.nlist or int(np.clip(4 * np.sqrt(len(vectors)), 16, 65536))
+        new_centroids = spherical_kmeans(sample, min(nlist, len(sample)))
+        np.save(os.path.join(self.path, "centroids.npy"), new_centroids)
+        segment = self._encode_segment(new_centroids, vectors, ids)
+        dead_in_old = [seg.ids for seg in segments]
+        self.trained = True
+        self._state = (new_centroids, [segment])
+        self._write_meta()
+        self._delete_segment_files(segments)
+        dead = self._dead_ids()
+        if dead is not None:
+            self._forget(np.intersect1d(np.concatenate(dead_in_old), dead))
+
+    def _maybe_merge(self) -> None:
+        centroids, segments = self._state
+        if len(segments) <= self.max_segments:
+            return
+        # 分层合并：只合并最小的一半，大段很少被重写，追加的摊销成本保持平稳
+        smallest = sorted(segments, key=len)[:self.max_segments // 2 + 1]
+        merged, purged = self._merge_segments(smallest, len(centroids))
+        self._state = (centroids, [seg for seg in segments if seg not in smallest] + [merged])
+        self._write_meta()
+        self._delete_segment_files(smallest)
+        self._forget(purged)
+
+    # ---------- 写入 ----------
+    def add(self, urls: Sequence[str], vectors: np.ndarray, chunks: Optional[Sequence[int]] = None) -> np.ndarray:
+        """
+        追加一批向量（自动归一化），每个向量对应一个 (URL, 块序号)；返回分配的向量 ID。
+        同一 URL 重复追加不会覆盖旧向量，需要覆盖时先 delete（add_articles 已处理）。
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or len(vectors) != len(urls):
+            raise ValueError("vectors 形状应为 (len(urls), dim)")
+        if chunks is None:
+            chunks = [0] * len(urls)
+        if not len(vectors):
+            return np.zeros(0, dtype=np.int64)
+        with self._lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+                self._state = (np.zeros((1, self.dim), dtype=np.float32), [])
+            if vectors.shape[1] != self.dim:
+                raise ValueError(f"向量维度 {vectors.shape[1]} 与索引维度 {self.dim} 不一致")
+            centroids, segments = self._state
+            ids = np.arange(self._next_id, self._next_id + len(vectors), dtype=np.int64)
+            segment = self._encode_segment(centroids, _normalize(vectors), ids)
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT INTO vectors (id, url_key, url, chunk) VALUES (?, ?, ?, ?)",
+                    [(int(i), normalize_url(u), u, int(c)) for i, u, c in zip(ids, urls, chunks)],
+                )
+            self._next_id += len(vectors)
+            self._state = (centroids, segments + [segment])
+            self._write_meta()
+            self._maybe_train()
+            self._maybe_merge()
+        return ids
+
+    def add_articles(
+        self,
+        articles: Sequence[NewsArticle],
+        embed_fn: EmbedFn,
+        chunk_tokens: int = 300,
+        batch_size: int = 256,
+    ) -> int:
+        """文章按段落 / 句子切块（与 HybridRetriever 相同）后嵌入写入；已存在的 URL 先删除旧向量（覆盖更新）。返回写入的块数"""
+        self.delete([a.url for a in articles if a.url])
+        pending: List[Tuple[str, int, str]] = []
+        for article in articles:
+            if not article.url:
+                continue
+            body = article.core_content or (article.raw_metadata or {}).get("description") or ""
+            for chunk_no, piece in enumerate(chunk_text(body, chunk_tokens) or [""]):
+                pending.append((article.url, chunk_no, f"{article.title or ''}\n{piece}".strip()))
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            self.add([u for u, _, _ in batch], np.asarray(embed_fn([t for _, _, t in batch]), dtype=np.float32),
+                     [c for _, c, _ in batch])
+        return len(pending)
+
+    def delete(self, urls: Sequence[str]) -> int:
+        """按 URL 删除（墓碑标记，查询立即不再返回），返回删除的向量数"""
+        keys = list({normalize_url(u) for u in urls if u})
+        deleted = []
+        with self._lock, self._conn:
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT id FROM vectors WHERE deleted = 0 AND url_key IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                deleted.extend(r[0] for r in rows)
+            for start in range(0, len(deleted), 500):
+                batch = deleted[start:start + 500]
+                self._conn.execute(f"UPDATE vectors SET deleted = 1 WHERE id IN ({','.join('?' * len(batch))})", batch)
+            self._dead.update(deleted)
+            self._dead_array = None
+        return len(deleted)
+
+    def compact(self) -> int:
+        """把所有段合并为一个并物理清除墓碑行（后台维护时调用），返回清除的向量数"""
+        with self._lock:
+            centroids, segments = self._state
+            if not segments or (len(segments) == 1 and not self._dead):
+                return 0
+            merged, purged = self._merge_segments(segments, len(centroids))
+            self._state = (centroids, [merged])
+            self._write_meta()
+            self._delete_segment_files(segments)
+            self._forget(purged)
+            return len(purged)
+
+    # ---------- 查询 ----------
+    def search(self, queries: np.ndarray, k: int = 10, nprobe: Optional[int] = None) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """批量查询：queries 形状 (Q, dim)（单个 1 维向量视为 Q=1），返回每个查询的 (向量 ID, 近似余弦相似度)，与 DenseIndex.search 格式相同"""
+        centroids, segments = self._state
+        queries = _normalize(np.atleast_2d(np.asarray(queries, dtype=np.float32)))
+        empty = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32))
+        if centroids is None or not segments:
+            return [empty for _ in queries]
+        nprobe = min(nprobe or self.nprobe, len(centroids))
+        coarse = queries @ centroids.T  # (Q, nlist)
+        probes = np.argpartition(-coarse, nprobe - 1, axis=1)[:, :nprobe]
+        dead = self._dead_ids()
+
+        # 按倒排表分组：探测同一个表的查询共用一次矩阵乘
+        by_list: Dict[int, List[int]] = {}
+        for q, row in enumerate(probes.tolist()):
+            for l in row:
+                by_list.setdefault(l, []).append(q)
+        best_ids = [[] for _ in queries]
+        best_scores = [[] for _ in queries]
+        for l, qs in by_list.items():
+            qs = np.asarray(qs)
+            qmat, base = queries[qs], coarse[qs, l]
+            for seg in segments:
+                start, end = seg.offsets[l], seg.offsets[l + 1]
+                if start == end:
+                    continue
+                ids = np.asarray(seg.ids[start:end])
+                sims = base[:, None] + (qmat @ np.asarray(seg.codes[start:end], dtype=np.float32).T) \
+                    * np.asarray(seg.scales[start:end])
+                if dead is not None:
+                    alive = ~np.isin(ids, dead)
+                    ids, sims = ids[alive], sims[:, alive]
+                    if not len(ids):
+                        continue
+                kk = min(k, len(ids))
+                part = np.argpartition(-sims, kk - 1, axis=1)[:, :kk]
+                for i, q in enumerate(qs.tolist()):
+                    best_ids[q].append(ids[part[i]])
+                    best_scores[q].append(sims[i, part[i]])
+        return [
+            _top_k(np.concatenate(ids), np.concatenate(scores).astype(np.float32), k) if ids else empty
+            for ids, scores in zip(best_ids, best_scores)
+        ]
+
+    def lookup(self, ids: Sequence[int]) -> Dict[int, Tuple[str, int]]:
+        """向量 ID → (URL, 块序号)（已删除的不返回）"""
+        ids = [int(i) for i in ids]
+        found = {}
+        with self._lock:
+            for start in range(0, len(ids), 500):
+                batch = ids[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT id, url, chunk FROM vectors WHERE deleted = 0 AND id IN ({','.join('?' * len(batch))})",
+                    batch,
+                ).fetchall()
+                found.update((r[0], (r[1], r[2])) for r in rows)
+        return found
+
+    def stats(self) -> Dict:
+        centroids, segments = self._state
+        rows = sum(len(seg) for seg in segments)
+        disk = sum(os.path.getsize(p) for p in glob.glob(os.path.join(self.path, "*.npy")))
+        return {
+            "vectors": rows - len(self._dead), "tombstones": len(self._dead), "segments": len(segments),
+            "nlist": 0 if centroids is None else len(centroids), "trained": self.trained, "dim": self.dim,
+            "disk_bytes": disk, "float32_bytes": rows * (self.dim or 0) * 4,
+        }